@@ -0,0 +1,106 @@
+"""
+Requests/sec through /query with logging at INFO and at DEBUG.
+
+Runs the same workload against the app in-process once per level, with a
+zero-latency stubbed chat model so request handling (and its logging) is
+what gets measured. Log records go through the queued handler to a
+temporary file unless --stdout is given.
+
+    python benchmarks/bench_logging.py --requests 2000 --concurrency 16
+    python benchmarks/bench_logging.py --levels INFO,DEBUG --sql-echo
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+WORK_DIR = tempfile.mkdtemp(prefix="querypilot-logbench-")
+DB_PATH = os.path.join(WORK_DIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+with sqlite3.connect(DB_PATH) as conn:
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT NOT NULL, is_active INTEGER)")
+    conn.executemany(
+        "INSERT INTO users (username, is_active) VALUES (?, ?)",
+        [(f"user{i}", i % 2) for i in range(200)]
+    )
+
+import httpx
+
+import main
+from fake_llm import FakeChatModel
+from logging_config import setup_logging, shutdown_logging
+from result_cache import result_cache
+
+
+async def run_level(level: str, num_requests: int, concurrency: int, sql_echo: bool, stdout: bool) -> float:
+    """Requests/sec for one logging configuration, from a cold SQL and result cache"""
+    label = level + (" + SQL echo" if sql_echo else "")
+    log_path = os.path.join(WORK_DIR, f"{level.lower()}{'-echo' if sql_echo else ''}.log")
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        setup_logging(level=level, stream=None if stdout else log_file, sql_echo=sql_echo)
+        main.llm_service.sql_cache.clear()
+        main.llm_service.sql_template_cache.clear()
+        result_cache.clear()
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(client: httpx.AsyncClient, i: int) -> int:
+            async with semaphore:
+                response = await client.post("/query", json={
+                    "prompt": f"which users are active, report variant {i}",
+                    "database_name": "users",
+                    "execute": True
+                })
+                return response.status_code
+
+        async with httpx.AsyncClient(app=main.app, base_url="http://test", timeout=60) as client:
+            await asyncio.gather(*[one(client, i) for i in range(min(50, num_requests))])
+            start = time.perf_counter()
+            statuses = await asyncio.gather(*[one(client, i) for i in range(num_requests)])
+            elapsed = time.perf_counter() - start
+        # Flush what the listener still holds before measuring the file
+        shutdown_logging()
+
+    failed = sum(1 for status in statuses if status != 200)
+    size = os.path.getsize(log_path)
+    rate = num_requests / elapsed
+    print(f"{label:<18} {rate:>9.1f} req/s   {elapsed:7.3f}s   log {size / 1024:9.1f} KiB   failed={failed}")
+    return rate
+
+
+async def run(levels, num_requests: int, concurrency: int, rounds: int, sql_echo: bool, stdout: bool):
+    main.llm_service.llm = FakeChatModel(latency=0, sql_query="SELECT id, username FROM users WHERE is_active = 1")
+    print(f"Requests: {num_requests}, concurrency: {concurrency}, rounds: {rounds}")
+    configs = [(level, False) for level in levels] + ([("DEBUG", True)] if sql_echo else [])
+    best = {}
+    # Levels alternate within each round so warm-up and drift do not favour one of them
+    for _ in range(rounds):
+        for level, echo in configs:
+            rate = await run_level(level, num_requests, concurrency, sql_echo=echo, stdout=stdout)
+            best[(level, echo)] = max(rate, best.get((level, echo), 0.0))
+
+    print("Best of each:")
+    for (level, echo), rate in best.items():
+        print(f"  {level + (' + SQL echo' if echo else ''):<18} {rate:>9.1f} req/s")
+    if ("INFO", False) in best and ("DEBUG", False) in best:
+        print(f"DEBUG runs at {best[('DEBUG', False)] / best[('INFO', False)] * 100:.1f}% of INFO throughput")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--levels", default="INFO,DEBUG", help="comma-separated log levels to compare")
+    parser.add_argument("--sql-echo", action="store_true", help="also run DEBUG with SQL statements logged")
+    parser.add_argument("--stdout", action="store_true", help="write logs to stdout instead of a temporary file")
+    args = parser.parse_args()
+    asyncio.run(run([level.strip().upper() for level in args.levels.split(",")], args.requests, args.concurrency, args.rounds, args.sql_echo, args.stdout))
@@ -0,0 +1,86 @@
+"""
+Read throughput of the old single shared SQLite connection (StaticPool) versus
+the WAL reader pool from database.create_sqlite_engines, as concurrent clients grow.
+
+    python benchmarks/bench_reader_pool.py --rows 200000 --queries 40
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from database import create_sqlite_engines
+
+QUERY = text("SELECT category, COUNT(*), AVG(price), MAX(stock_quantity) FROM products GROUP BY category")
+
+
+def build_db(path: str, rows: int):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, price REAL, "
+            "stock_quantity INTEGER, category TEXT)"
+        )
+        conn.exec_driver_sql(
+            "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?) "
+            "INSERT INTO products (name, price, stock_quantity, category) "
+            "SELECT 'product ' || n, (n % 1000) * 1.5, n % 97, 'cat' || (n % 25) FROM seq",
+            (rows,)
+        )
+    engine.dispose()
+
+
+def throughput(engine, clients: int, queries_per_client: int) -> float:
+    def client(_):
+        for _ in range(queries_per_client):
+            with engine.connect() as conn:
+                conn.execute(QUERY).fetchall()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    return clients * queries_per_client / (time.perf_counter() - start)
+
+
+def main(rows: int, queries: int, client_counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_db(path, rows)
+
+        static = create_engine(
+            f"sqlite:///{path}",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        _, reader = create_sqlite_engines(
+            f"sqlite:///{path}",
+            reader_pool_size=max(client_counts),
+            echo=False
+        )
+
+        print(f"{rows:,} rows, {queries} queries per client, {os.cpu_count()} cores")
+        print(f"{'clients':>8} {'StaticPool q/s':>16} {'reader pool q/s':>16} {'speedup':>8}")
+        for clients in client_counts:
+            before = throughput(static, clients, queries)
+            after = throughput(reader, clients, queries)
+            print(f"{clients:>8} {before:>16.1f} {after:>16.1f} {after / before:>7.2f}x")
+
+        static.dispose()
+        reader.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    main(args.rows, args.queries, args.clients)
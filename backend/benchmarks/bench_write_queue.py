@@ -0,0 +1,107 @@
+"""
+Modification throughput under concurrent writers: one session and commit per
+statement (the old /execute path) versus the group-committing WriteQueue.
+
+    python benchmarks/bench_write_queue.py --writers 50 --writes 20 --synchronous FULL
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+INSERT = "INSERT INTO audit_log (writer, seq, note) VALUES (:writer, :seq, :note)"
+
+
+def build_engines(path: str):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from database import create_async_engines
+
+    writer, reader = create_async_engines(f"sqlite:///{path}", echo=False)
+    return writer, reader, async_sessionmaker(writer, autoflush=False, expire_on_commit=False)
+
+
+async def create_schema(writer):
+    async with writer.begin() as conn:
+        await conn.exec_driver_sql("DROP TABLE IF EXISTS audit_log")
+        await conn.exec_driver_sql(
+            "CREATE TABLE audit_log (id INTEGER PRIMARY KEY, writer INTEGER, seq INTEGER, note TEXT)"
+        )
+
+
+async def per_statement(session_factory, writers: int, writes: int) -> float:
+    from sqlalchemy import text
+
+    async def client(writer: int):
+        for seq in range(writes):
+            async with session_factory() as session:
+                await session.execute(text(INSERT), {"writer": writer, "seq": seq, "note": "x" * 64})
+                await session.commit()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(writer) for writer in range(writers)])
+    return writers * writes / (time.perf_counter() - start)
+
+
+async def queued(session_factory, writers: int, writes: int, window_ms: float):
+    from write_queue import WriteQueue
+
+    queue = WriteQueue(session_factory, window_ms=window_ms)
+
+    async def client(writer: int):
+        for seq in range(writes):
+            await queue.submit(INSERT, {"writer": writer, "seq": seq, "note": "x" * 64})
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(writer) for writer in range(writers)])
+    return writers * writes / (time.perf_counter() - start), queue.stats()
+
+
+async def count_rows(writer) -> int:
+    async with writer.connect() as conn:
+        return (await conn.exec_driver_sql("SELECT COUNT(*) FROM audit_log")).scalar()
+
+
+async def main(writers: int, writes: int, window_ms: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        writer, reader, session_factory = build_engines(os.path.join(tmp, "bench.db"))
+        expected = writers * writes
+
+        # The app prints per statement/batch; keep that cost but not the noise
+        with contextlib.redirect_stdout(io.StringIO()):
+            await create_schema(writer)
+            before = await per_statement(session_factory, writers, writes)
+            before_rows = await count_rows(writer)
+            await create_schema(writer)
+            after, stats = await queued(session_factory, writers, writes, window_ms)
+            after_rows = await count_rows(writer)
+
+        print(f"{writers} writers x {writes} inserts, synchronous={os.environ['SQLITE_SYNCHRONOUS']}")
+        print(f"{'path':>22} {'writes/s':>10} {'rows':>7}")
+        print(f"{'session per statement':>22} {before:>10.1f} {before_rows:>7}")
+        print(f"{'write queue':>22} {after:>10.1f} {after_rows:>7}")
+        print(f"speedup: {after / before:.2f}x, batches: {stats['batches']}, avg batch: {stats['avg_batch']}")
+        assert before_rows == after_rows == expected
+
+        await writer.dispose()
+        await reader.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=20)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--synchronous", default="NORMAL", help="SQLite synchronous pragma (FULL fsyncs every commit)")
+    args = parser.parse_args()
+
+    # database reads its pragmas at import time
+    os.environ["SQLITE_SYNCHRONOUS"] = args.synchronous
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    asyncio.run(main(args.writers, args.writes, args.window_ms))
@@ -0,0 +1,39 @@
+import asyncio
+import json
+import time
+from typing import Callable, Optional
+
+from langchain_core.messages import AIMessage
+
+
+class FakeChatModel:
+    """Deterministic stand-in for ChatOpenAI with a fixed latency and canned SQL"""
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        sql_query: str = "SELECT * FROM users",
+        explanation: str = "Canned benchmark query",
+        responder: Optional[Callable[[str], str]] = None
+    ):
+        self.latency = latency
+        self.sql_query = sql_query
+        self.explanation = explanation
+        self.responder = responder
+        self.calls = 0
+
+    def _respond(self, prompt: str) -> AIMessage:
+        self.calls += 1
+        sql_query = self.responder(prompt) if self.responder else self.sql_query
+        return AIMessage(content=json.dumps({
+            "sql_query": sql_query,
+            "explanation": self.explanation
+        }))
+
+    def invoke(self, prompt: str) -> AIMessage:
+        time.sleep(self.latency)
+        return self._respond(prompt)
+
+    async def ainvoke(self, prompt: str) -> AIMessage:
+        await asyncio.sleep(self.latency)
+        return self._respond(prompt)
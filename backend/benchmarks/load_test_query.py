@@ -0,0 +1,82 @@
+"""
+Load test for /query with a stubbed chat model.
+
+Fires N concurrent /query requests at the app in-process. With a non-blocking
+generate_sql_statement they should all finish in roughly one LLM latency rather than N.
+
+    python benchmarks/load_test_query.py --requests 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+# Requests use the in-memory database below; keep the app off the bundled company_database.db
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import main
+from database import get_async_db, get_async_read_db
+from fake_llm import FakeChatModel
+
+
+async def build_test_db():
+    """In-memory SQLite database with a small users table"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT NOT NULL, is_active INTEGER)"
+        )
+        await conn.exec_driver_sql(
+            "INSERT INTO users (username, is_active) VALUES ('alice', 1), ('bob', 0)"
+        )
+    return async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+async def run(num_requests: int, latency: float, execute: bool) -> float:
+    TestSession = await build_test_db()
+
+    async def override_get_db():
+        async with TestSession() as db:
+            yield db
+
+    main.app.dependency_overrides[get_async_db] = override_get_db
+    main.app.dependency_overrides[get_async_read_db] = override_get_db
+    main.llm_service.llm = FakeChatModel(latency=latency)
+
+    # Distinct prompts, so the fast path, caches and request coalescing cannot
+    # answer for the model: every request needs its own LLM call
+    payloads = [
+        {"prompt": f"users who signed up in cohort {i}", "database_name": "users", "execute": execute}
+        for i in range(num_requests)
+    ]
+    async with httpx.AsyncClient(app=main.app, base_url="http://test", timeout=60) as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/query", json=payload) for payload in payloads
+        ])
+        elapsed = time.perf_counter() - start
+
+    ok = sum(1 for r in responses if r.status_code == 200 and r.json().get("success"))
+    rejected = sum(1 for r in responses if r.status_code == 503)
+    print(f"Requests:   {num_requests} (ok={ok}, rejected={rejected}, llm_calls={main.llm_service.llm.calls})")
+    print(f"Concurrency limit: {main.llm_service.llm_max_concurrency}")
+    print(f"LLM latency: {latency:.3f}s")
+    print(f"Wall time:  {elapsed:.3f}s ({elapsed / latency:.2f}x one LLM latency)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--execute", action="store_true", help="also execute the generated SQL")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency, args.execute))
@@ -0,0 +1,301 @@
+"""
+Offline benchmark suite: /query, /execute and schema endpoints over synthetic SQLite databases.
+
+For every point of a grid of table, column and row counts, builds (once,
+then reuses) a synthetic database and runs each scenario in a fresh worker
+process against the app in-process, with LLMService.llm replaced by the
+deterministic FakeChatModel. Reports p50/p99 latency, throughput and the
+worker's peak RSS, and saves everything as JSON so runs can be compared
+across commits.
+
+    python benchmarks/suite.py
+    python benchmarks/suite.py --tables 10,100,1000 --rows 1000,1000000,10000000 --latency 0.05
+    python benchmarks/suite.py --compare benchmarks/results/bench-abc1234-20250101-120000.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from synthetic_db import SMALL_TABLE_ROWS, column_names, ensure_database
+
+SCENARIOS = ("query", "execute", "schema")
+DEFAULT_DB_DIR = os.path.join(tempfile.gettempdir(), "querypilot-bench-dbs")
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+_TASK = re.compile(r"Task: bench (query|insert) ([a-z]+) (?:on|into) t(\d+)")
+
+
+def word(number: int) -> str:
+    """Letters-only request tag: numbers in a prompt would let the SQL template cache answer"""
+    letters = ""
+    for _ in range(5):
+        number, digit = divmod(number, 26)
+        letters = chr(ord("a") + digit) + letters
+    return letters
+
+
+def unword(letters: str) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("a")
+    return number
+
+
+def make_responder(rows: int, columns: int):
+    """Canned SQL for the suite's prompts: an id-range SELECT, or an INSERT with a fresh id"""
+    names = column_names(columns)
+
+    def respond(prompt: str) -> str:
+        match = _TASK.search(prompt)
+        if match is None:
+            return "SELECT 1"
+        kind, tag, table = match.group(1), unword(match.group(2)), int(match.group(3))
+        if kind == "insert":
+            values = ", ".join(str(tag % 1000) if j % 3 == 0 else f"'w{tag}'" if j % 3 == 2 else str(tag / 7) for j in range(len(names)))
+            return f"INSERT INTO t0 (id, {', '.join(names)}) VALUES ({rows + tag + 1}, {values})"
+        table_rows = rows if table == 0 else min(rows, SMALL_TABLE_ROWS)
+        return f"SELECT * FROM t{table} WHERE id > {(tag * 97) % table_rows} ORDER BY id LIMIT 50"
+    return respond
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_scenario(config: Dict[str, Any]) -> Dict[str, Any]:
+    import httpx
+    import main
+    from fake_llm import FakeChatModel
+
+    tables, rows = config["tables"], config["rows"]
+    main.llm_service.llm = FakeChatModel(latency=config["latency"], responder=make_responder(rows, config["columns"]))
+    scenario = config["scenario"]
+    cold_ms = None
+
+    def request_for(client: httpx.AsyncClient, i: int):
+        if scenario == "query":
+            return client.post("/query", json={
+                "prompt": f"bench query {word(i)} on t{i % tables}",
+                "database_name": f"t{i % tables}",
+                "execute": True
+            })
+        if scenario == "execute":
+            return client.post("/execute", json={"prompt": f"bench insert {word(i)} into t0", "database_name": "default"})
+        if i % 2:
+            return client.get(f"/tables/t{i % tables}")
+        return client.get("/databases")
+
+    async with httpx.AsyncClient(app=main.app, base_url="http://bench", timeout=600) as client:
+        if scenario == "schema":
+            # First load reads the whole schema; later requests hit the catalog
+            started = time.perf_counter()
+            await client.get("/databases")
+            cold_ms = (time.perf_counter() - started) * 1000
+
+        offset = config["requests"]
+        await asyncio.gather(*[request_for(client, offset + i) for i in range(config["warmup"])])
+
+        semaphore = asyncio.Semaphore(config["concurrency"])
+        latencies: List[float] = []
+        errors = 0
+
+        async def one(i: int):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await request_for(client, i)
+                latencies.append((time.perf_counter() - started) * 1000)
+                body = response.json()
+                if response.status_code != 200 or (isinstance(body, dict) and body.get("success") is False):
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(config["requests"])])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": config["requests"],
+        "concurrency": config["concurrency"],
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "throughput_rps": round(config["requests"] / elapsed, 2) if elapsed else 0.0,
+        "schema_cold_ms": round(cold_ms, 3) if cold_ms is not None else None
+    }
+
+
+def worker(config: Dict[str, Any]):
+    """Run one scenario in this process and write its result; called as a subprocess"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{config['path']}"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("TRACE_EXPORTER", "none")
+    sys.path.insert(0, BENCH_DIR)
+
+    result = asyncio.run(run_scenario(config))
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+
+    if config["scenario"] == "execute":
+        # Leave the cached database as it was built
+        import sqlite3
+        with sqlite3.connect(config["path"]) as conn:
+            conn.execute("DELETE FROM t0 WHERE id > ?", (config["rows"],))
+
+    with open(config["result_file"], "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def run_worker(config: Dict[str, Any]) -> Dict[str, Any]:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_file = f.name
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(dict(config, result_file=result_file))],
+            cwd=BACKEND_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{config['scenario']} worker failed:\n{completed.stderr[-2000:]}")
+        with open(result_file, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(result_file)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result: Dict[str, Any]) -> Tuple[Any, ...]:
+    return result["tables"], result["columns"], result["rows"], result["scenario"]
+
+
+def print_result(result: Dict[str, Any]):
+    cold = f"  cold schema {result['schema_cold_ms']:.1f} ms" if result.get("schema_cold_ms") is not None else ""
+    print(
+        f"t={result['tables']:<5} c={result['columns']:<3} r={result['rows']:<9} {result['scenario']:<8}"
+        f" p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  {result['throughput_rps']:8.1f} req/s"
+        f"  rss {result['peak_rss_mb']:7.1f} MB  errors {result['errors']}{cold}"
+    )
+
+
+def compare(baseline_path: str, results: List[Dict[str, Any]]):
+    """Print each metric's change against a previous run; positive means slower/larger"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {_key(result): result for result in baseline["results"]}
+    print(f"\nCompared with {baseline['meta'].get('commit') or baseline_path}:")
+    for result in results:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        changes = []
+        for field in ("p50_ms", "p99_ms", "throughput_rps", "peak_rss_mb"):
+            if before[field]:
+                changes.append(f"{field} {(result[field] - before[field]) / before[field] * 100:+6.1f}%")
+        tables, columns, rows, scenario = _key(result)
+        print(f"t={tables:<5} c={columns:<3} r={rows:<9} {scenario:<8} " + "  ".join(changes))
+
+
+def _ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tables", type=_ints, default=[10, 100, 1000], help="comma-separated table counts")
+    parser.add_argument("--columns", type=_ints, default=[8], help="comma-separated data column counts")
+    parser.add_argument("--rows", type=_ints, default=[1000, 100000], help="comma-separated row counts of the large table (up to 10000000)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated: query, execute, schema")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM latency in seconds")
+    parser.add_argument("--db-dir", default=DEFAULT_DB_DIR, help="where synthetic databases are built and reused")
+    parser.add_argument("--output", help="results JSON (default: benchmarks/results/bench-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(json.loads(args.worker))
+        return
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    commit = git_commit()
+    results = []
+    for tables, columns, rows in itertools.product(args.tables, args.columns, args.rows):
+        path, build_seconds = ensure_database(args.db_dir, tables, columns, rows)
+        if build_seconds:
+            print(f"Built {os.path.basename(path)} in {build_seconds:.1f}s")
+        for scenario in scenarios:
+            config = {
+                "path": path, "tables": tables, "columns": columns, "rows": rows, "scenario": scenario,
+                "requests": args.requests, "concurrency": args.concurrency, "warmup": args.warmup, "latency": args.latency
+            }
+            result = dict(tables=tables, columns=columns, rows=rows, scenario=scenario, **run_worker(config))
+            result["db_build_seconds"] = round(build_seconds, 2)
+            result["db_bytes"] = os.path.getsize(path)
+            print_result(result)
+            results.append(result)
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"bench-{commit or 'nocommit'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": {key: value for key, value in vars(args).items() if key != "worker"}
+            },
+            "results": results
+        }, f, indent=2)
+    print(f"\nSaved {len(results)} results to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import time
+from typing import List, Tuple
+
+# Data column types, cycled: integer, real, text
+COLUMN_TYPES = ("INTEGER", "REAL", "TEXT")
+
+# Every table but the first gets at most this many rows; the first table gets the full row count
+SMALL_TABLE_ROWS = 100
+
+
+def column_names(columns: int) -> List[str]:
+    return [f"c{j}" for j in range(1, columns + 1)]
+
+
+def _value_sql(column: int, counter: str) -> str:
+    """Deterministic value expression for data column ``column`` at row ``counter``"""
+    kind = COLUMN_TYPES[(column - 1) % len(COLUMN_TYPES)]
+    if kind == "INTEGER":
+        return f"({counter} * {7919 + column}) % 1000"
+    if kind == "REAL":
+        return f"(({counter} * {31 + column}) % 10000) / 100.0"
+    return f"'v' || (({counter} * {131 + column}) % 997)"
+
+
+def database_path(directory: str, tables: int, columns: int, rows: int) -> str:
+    return os.path.join(directory, f"synthetic_t{tables}_c{columns}_r{rows}.db")
+
+
+def build_database(path: str, tables: int, columns: int, rows: int) -> float:
+    """Create a synthetic SQLite database and return the seconds it took.
+
+    Tables t0..t{tables-1} each have an id, a parent_id referencing the
+    previous table (so the schema has a join graph) and ``columns`` data
+    columns. t0 holds ``rows`` rows; the others hold up to SMALL_TABLE_ROWS.
+    Values are computed from the row number, so the same arguments always
+    produce the same database. Rows are generated inside SQLite, which keeps
+    10M-row tables practical.
+    """
+    started = time.perf_counter()
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    conn = sqlite3.connect(partial)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    names = column_names(columns)
+    data_columns = ", ".join(
+        f"{name} {COLUMN_TYPES[j % len(COLUMN_TYPES)]}" for j, name in enumerate(names)
+    )
+    for t in range(tables):
+        parent = f", parent_id INTEGER REFERENCES t{t - 1}(id)" if t else ""
+        conn.execute(f"CREATE TABLE t{t} (id INTEGER PRIMARY KEY{parent}, {data_columns})")
+
+        count = rows if t == 0 else min(rows, SMALL_TABLE_ROWS)
+        parent_value = f", (x % {min(rows, SMALL_TABLE_ROWS) if t > 1 else rows}) + 1" if t else ""
+        values = ", ".join(_value_sql(j, "x") for j in range(1, columns + 1))
+        conn.execute(
+            f"WITH RECURSIVE seq(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM seq WHERE x < {count}) "
+            f"INSERT INTO t{t} (id{', parent_id' if t else ''}, {', '.join(names)}) "
+            f"SELECT x{parent_value}, {values} FROM seq"
+        )
+    conn.commit()
+    conn.close()
+
+    # The app opens the database in WAL mode; switch now so the first request does not pay for it
+    conn = sqlite3.connect(partial)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+    os.replace(partial, path)
+    return time.perf_counter() - started
+
+
+def ensure_database(directory: str, tables: int, columns: int, rows: int) -> Tuple[str, float]:
+    """Path of the synthetic database for these parameters, built on first use"""
+    os.makedirs(directory, exist_ok=True)
+    path = database_path(directory, tables, columns, rows)
+    if os.path.exists(path):
+        return path, 0.0
+    return path, build_database(path, tables, columns, rows)
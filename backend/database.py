@@ -1,81 +1,706 @@
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import create_engine, text, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import StaticPool, AsyncAdaptedQueuePool
+import asyncio
+import json
+import logging
 import os
+import threading
+import time
+from pathlib import Path
 from dotenv import load_dotenv
-from langsmith import traceable
+from fastapi import HTTPException, Request
+from typing import Awaitable, Callable, List, Dict, Any, NamedTuple, Optional, Tuple, TypeVar
+from tracing import traced
+from schema_catalog import schema_catalog, database_key
+from write_queue import WriteQueue
 
 load_dotenv()
 
-DATABASE_URL = r"sqlite:///C:/Users/Kartik joshi/company_database.db"
+logger = logging.getLogger(__name__)
 
-# If DATABASE_URL is not set, use default path
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# If DATABASE_URL is not set, use the company_database.db next to this file
 if not DATABASE_URL:
-    # Get the directory where this file is located
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     db_path = os.path.join(BASE_DIR, "company_database.db")
     DATABASE_URL = f"sqlite:///{db_path}"
 
-print(f"🗄️ Database URL: {DATABASE_URL}")
+logger.info("🗄️ Database URL: %s", make_url(DATABASE_URL).render_as_string(hide_password=True))
+
+# Per-connection SQLite tuning, applied at connect time
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+READER_POOL_SIZE = int(os.getenv("DB_READER_POOL_SIZE", str(os.cpu_count() or 4)))
+
+# Default per-request SQL execution deadline, and how many SQLite VM steps run between deadline checks
+SQL_TIMEOUT_SECONDS = float(os.getenv("SQL_TIMEOUT_SECONDS", "30"))
+SQLITE_PROGRESS_STEPS = int(os.getenv("SQLITE_PROGRESS_STEPS", "10000"))
+
+T = TypeVar("T")
+
+
+class QueryTimeoutError(Exception):
+    """SQL execution ran past its deadline and was interrupted"""
+
+    def __init__(self, message: str, elapsed: float):
+        super().__init__(message)
+        self.elapsed = elapsed
+
+
+def _sqlite_pragmas(writer: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if writer:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+    return on_connect
+
+
+def _sqlite_driver_autocommit(dbapi_connection, connection_record):
+    # Stop the driver from issuing its own BEGIN/COMMIT; _sqlite_begin_immediate takes over
+    dbapi_connection.isolation_level = None
+
 
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
+def _sqlite_begin_immediate(conn):
+    """Start writer transactions with BEGIN IMMEDIATE, so SAVEPOINTs nest inside one transaction"""
+    if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def create_sqlite_engines(url: str, reader_pool_size: int = READER_POOL_SIZE, echo: bool = False) -> Tuple[Engine, Engine]:
+    """Create (writer, reader) engines for a SQLite file.
+    
+    The writer is a single dedicated connection in WAL mode, so writes queue in
+    the pool instead of fighting over the file lock. Readers are a pool of
+    read-only (mode=ro) connections that never take the write lock and, under
+    WAL, never wait for the writer.
+
+    ``echo=True`` makes SQLAlchemy print every statement synchronously; set
+    SQL_ECHO instead to log them through the queued handler.
+    """
+    db_path = make_url(url).database
+    in_memory = not db_path or db_path == ":memory:" or "mode=memory" in url
+    
+    if in_memory:
+        # Every connection to :memory: is a separate database; keep the one shared connection
+        shared = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=echo
+        )
+        return shared, shared
+    
+    writer = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=30,
+        echo=echo
+    )
+    event.listen(writer, "connect", _sqlite_pragmas(writer=True))
+    
+    # Open the writer once so the file exists and is in WAL mode before readers attach
+    try:
+        with writer.connect():
+            pass
+    except Exception as e:
+        logger.warning("⚠️ Could not open SQLite database yet: %s", e)
+    
+    reader = create_engine(
+        f"sqlite:///{Path(os.path.abspath(db_path)).as_uri()}?mode=ro&uri=true",
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        echo=True  # This will print SQL queries for debugging
+        pool_size=reader_pool_size,
+        max_overflow=0,
+        pool_timeout=30,
+        echo=echo
+    )
+    event.listen(reader, "connect", _sqlite_pragmas(writer=False))
+    return writer, reader
+
+
+def _sqlite_deadline_handler(dbapi_connection, connection_record):
+    """Install a progress handler that interrupts the running statement once info["deadline"] passes"""
+    info = connection_record.info
+    
+    def past_deadline() -> int:
+        deadline = info.get("deadline")
+        return 1 if deadline is not None and time.monotonic() > deadline else 0
+    
+    driver = dbapi_connection.driver_connection
+    dbapi_connection.await_(driver.set_progress_handler(past_deadline, SQLITE_PROGRESS_STEPS))
+
+
+def _clear_deadline(dbapi_connection, connection_record, reset_state=None):
+    # Runs before the pool's rollback-on-return, which must not be interrupted
+    connection_record.info.pop("deadline", None)
+
+
+def _attach_sqlite_deadlines(engine: AsyncEngine):
+    event.listen(engine.sync_engine, "connect", _sqlite_deadline_handler)
+    event.listen(engine.sync_engine.pool, "reset", _clear_deadline)
+
+
+# Async drivers used by the /query and /execute data path
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql"
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap a database URL's driver for its asyncio equivalent"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def create_async_engines(url: str, reader_pool_size: int = READER_POOL_SIZE, echo: bool = False) -> Tuple[AsyncEngine, AsyncEngine]:
+    """Create (writer, reader) async engines mirroring create_sqlite_engines.
+    
+    Non-SQLite backends get one pooled async engine of ``reader_pool_size``
+    connections used for both roles.
+    """
+    if not url.startswith("sqlite"):
+        shared = create_async_engine(
+            to_async_url(url),
+            pool_size=reader_pool_size,
+            max_overflow=0,
+            pool_pre_ping=True,
+            echo=echo
+        )
+        return shared, shared
+    
+    db_path = make_url(url).database
+    if not db_path or db_path == ":memory:" or "mode=memory" in url:
+        shared = create_async_engine(to_async_url(url), poolclass=StaticPool, echo=echo)
+        _attach_sqlite_deadlines(shared)
+        return shared, shared
+    
+    writer = create_async_engine(
+        to_async_url(url),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=30,
+        echo=echo
+    )
+    event.listen(writer.sync_engine, "connect", _sqlite_pragmas(writer=True))
+    event.listen(writer.sync_engine, "connect", _sqlite_driver_autocommit)
+    event.listen(writer.sync_engine, "begin", _sqlite_begin_immediate)
+    _attach_sqlite_deadlines(writer)
+    
+    reader = create_async_engine(
+        f"sqlite+aiosqlite:///{Path(os.path.abspath(db_path)).as_uri()}?mode=ro&uri=true",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=reader_pool_size,
+        max_overflow=0,
+        pool_timeout=30,
+        echo=echo
     )
-else:
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    event.listen(reader.sync_engine, "connect", _sqlite_pragmas(writer=False))
+    _attach_sqlite_deadlines(reader)
+    return writer, reader
+
+
+# Named databases served besides the default one, as JSON:
+#   {"sales": "sqlite:///sales.db", "warehouse": {"url": "postgresql://...", "pool_size": 4}}
+DEFAULT_DATABASE = "default"
+DATABASES = os.getenv("DATABASES", "")
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "64"))
+ENGINE_IDLE_SECONDS = float(os.getenv("ENGINE_IDLE_SECONDS", "600"))
+
+
+class UnknownDatabaseError(LookupError):
+    """Raised for a database_name that is not configured where no fallback is allowed"""
+
+
+class DatabaseConfig(NamedTuple):
+    name: str
+    url: str
+    pool_size: int
+
+
+def load_database_configs(default_url: str, databases: str = DATABASES) -> Dict[str, DatabaseConfig]:
+    """Configured databases by name; DATABASE_URL is always available as "default" """
+    configs = {DEFAULT_DATABASE: DatabaseConfig(DEFAULT_DATABASE, default_url, READER_POOL_SIZE)}
+    for name, value in (json.loads(databases) if databases.strip() else {}).items():
+        if isinstance(value, str):
+            value = {"url": value}
+        configs[name] = DatabaseConfig(name, value["url"], int(value.get("pool_size", READER_POOL_SIZE)))
+    return configs
+
+
+class DatabaseHandle:
+    """Engines, session factories and writer queue for one configured database.
+    
+    The sync read engine (table browsing) and the async engines (query
+    paths) are each created on first use. The schema catalog and caches key on the database
+    itself, so every handle gets its own entries.
+    """
+
+    def __init__(self, config: DatabaseConfig, pool_size: int, echo: bool = False):
+        self.name = config.name
+        self.url = config.url
+        self.pool_size = pool_size
+        self.echo = echo
+        self._lock = threading.Lock()
+        self._sync: Optional[Engine] = None
+        self._async: Optional[Tuple[AsyncEngine, AsyncEngine]] = None
+        self.last_used = time.monotonic()
+        self.active = 0
+        self.write_queue = WriteQueue(self._writer_session)
+
+    @property
+    def connections(self) -> int:
+        """Connections the engines created so far may hold open"""
+        # SQLite files add a single-connection async writer to the reader pool
+        async_writer = 1 if self.url.startswith("sqlite") else 0
+        return (self.pool_size if self._sync is not None else 0) + (self.pool_size + async_writer if self._async is not None else 0)
+
+    def sync_read_engine(self) -> Engine:
+        with self._lock:
+            if self._sync is None:
+                if self.url.startswith("sqlite"):
+                    writer, self._sync = create_sqlite_engines(self.url, reader_pool_size=self.pool_size, echo=self.echo)
+                    # Writes go through the async writer; this one only made sure the file exists in WAL mode
+                    if writer is not self._sync:
+                        writer.dispose()
+                else:
+                    self._sync = create_engine(self.url, pool_size=self.pool_size, max_overflow=0, pool_pre_ping=True, echo=self.echo)
+                self.ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self._sync)
+            return self._sync
+
+    def async_engines(self) -> Tuple[AsyncEngine, AsyncEngine]:
+        with self._lock:
+            if self._async is None:
+                self._async = create_async_engines(self.url, reader_pool_size=self.pool_size, echo=self.echo)
+                self.AsyncSessionLocal = async_sessionmaker(self._async[0], autoflush=False, expire_on_commit=False)
+                self.AsyncReadSessionLocal = async_sessionmaker(self._async[1], autoflush=False, expire_on_commit=False)
+            return self._async
+
+    def _writer_session(self) -> AsyncSession:
+        self.async_engines()
+        return self.AsyncSessionLocal()
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async def dispose(self):
+        with self._lock:
+            sync_engine, async_engines = self._sync, self._async
+            self._sync = self._async = None
+        if sync_engine is not None:
+            sync_engine.dispose()
+        for bind in set(async_engines or ()):
+            await bind.dispose()
+        logger.info("🧹 Disposed engines for database '%s'", self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "connections": self.connections,
+            "active_sessions": self.active,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+            "write_queue": self.write_queue.stats()
+        }
+
+
+class EngineRegistry:
+    """Lazily created engines for every configured database, looked up by name.
+    
+    On read paths, names that are not configured resolve to the default
+    database: the frontend sends the selected table as database_name.
+    Paths that may write take ``strict`` lookups, which reject unknown
+    names rather than write to the wrong database. Handles unused for
+    ``idle_seconds`` (and not serving a request) are disposed, the default
+    one excepted. Before a new handle opens, idle handles are evicted
+    oldest first to keep the total under ``max_connections``; if that is
+    not enough the new handle gets a smaller pool.
+    """
+
+    def __init__(
+        self,
+        configs: Dict[str, DatabaseConfig],
+        max_connections: int = DB_MAX_CONNECTIONS,
+        idle_seconds: float = ENGINE_IDLE_SECONDS,
+        echo: bool = False
+    ):
+        self.configs = configs
+        self.max_connections = max_connections
+        self.idle_seconds = idle_seconds
+        self.echo = echo
+        self._lock = threading.Lock()
+        self._handles: Dict[str, DatabaseHandle] = {}
+        self._retired: List[DatabaseHandle] = []
+        # Write generations outlive evicted handles, so cached results stay invalidated
+        self._generations: Dict[str, int] = {}
+        self.created = 0
+        self.evicted = 0
+
+    def resolve(self, name: Optional[str], strict: bool = False) -> str:
+        if name in self.configs:
+            return name
+        if strict and name is not None:
+            raise UnknownDatabaseError(
+                f"Unknown database '{name}'; configured databases: {', '.join(sorted(self.configs))}"
+            )
+        return DEFAULT_DATABASE
+
+    def _retire(self, handle: DatabaseHandle):
+        del self._handles[handle.name]
+        self._generations[handle.name] = handle.write_queue.generation
+        self._retired.append(handle)
+        self.evicted += 1
+
+    def get(self, name: Optional[str] = None) -> DatabaseHandle:
+        """Handle for ``name`` (or the default database), created on first use"""
+        with self._lock:
+            return self._get(name)
+
+    def acquire(self, name: Optional[str] = None, strict: bool = False) -> DatabaseHandle:
+        """get() for the length of a request: the handle is not evicted until release()"""
+        name = self.resolve(name, strict)
+        with self._lock:
+            handle = self._get(name)
+            handle.active += 1
+            return handle
+
+    def release(self, handle: DatabaseHandle):
+        # Dependencies run on the event loop and in the threadpool; the count decides eviction
+        with self._lock:
+            handle.active -= 1
+
+    def _get(self, name: Optional[str]) -> DatabaseHandle:
+        name = self.resolve(name)
+        handle = self._handles.get(name)
+        if handle is None:
+            config = self.configs[name]
+            # A handle may open a sync read pool and an async pool (plus the SQLite writer)
+            writer = 1 if config.url.startswith("sqlite") else 0
+            needed = 2 * config.pool_size + writer
+            idle = sorted(
+                (h for h in self._handles.values() if h.active == 0 and h.name != DEFAULT_DATABASE),
+                key=lambda h: h.last_used
+            )
+            while idle and self._open_connections() + needed > self.max_connections:
+                self._retire(idle.pop(0))
+            available = self.max_connections - self._open_connections()
+            pool_size = config.pool_size
+            if needed > available:
+                pool_size = max(1, (available - writer) // 2)
+                logger.warning("⚠️ Connection cap reached: database '%s' gets a pool of %d", name, pool_size)
+            handle = DatabaseHandle(config, pool_size, echo=self.echo)
+            handle.write_queue.generation = self._generations.get(name, 0)
+            self._handles[name] = handle
+            self.created += 1
+            logger.info("🗄️ Registered database '%s' (engines open on first use): %s", name, make_url(config.url).render_as_string(hide_password=True))
+        handle.last_used = time.monotonic()
+        return handle
+
+    def _open_connections(self) -> int:
+        return sum(handle.connections for handle in self._handles.values())
+
+    def for_bind(self, bind) -> Optional[DatabaseHandle]:
+        """Open handle whose engines point at the same database as ``bind``"""
+        key = database_key(bind)
+        with self._lock:
+            for handle in self._handles.values():
+                engines = (handle._async or ()) + ((handle._sync,) if handle._sync is not None else ())
+                if any(database_key(engine) == key for engine in engines):
+                    return handle
+        return None
+
+    async def evict_idle(self):
+        """Dispose handles idle past idle_seconds, and any retired to make room"""
+        now = time.monotonic()
+        with self._lock:
+            for handle in list(self._handles.values()):
+                if handle.name != DEFAULT_DATABASE and handle.active == 0 and now - handle.last_used > self.idle_seconds:
+                    self._retire(handle)
+            retired, self._retired = self._retired, []
+        for handle in retired:
+            await handle.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "configured": sorted(self.configs),
+                "open": {name: handle.stats() for name, handle in self._handles.items()},
+                "connections": self._open_connections(),
+                "max_connections": self.max_connections,
+                "created": self.created,
+                "evicted": self.evicted
+            }
+
+
+registry = EngineRegistry(load_database_configs(DATABASE_URL))
+
+# The default database's handle; like every handle, its engines open on first use,
+# so importing this module never touches the database file
+default_database = registry.get(DEFAULT_DATABASE)
 Base = declarative_base()
 
-@traceable(
-    name="💾 Database Session",
-    run_type="tool",
-    metadata={"operation": "get_db_session"}
-)
-def get_db():
-    """Get database session with LangSmith tracking"""
-    db = SessionLocal()
+def _named_database(request: Request) -> Optional[str]:
+    # /tables/{database} path, ?database_name= query, or an already parsed JSON body
+    return request.path_params.get("database") or request.query_params.get("database_name")
+
+async def requested_database(request: Request) -> Optional[str]:
+    """database_name the request asks for, from its path, query string or JSON body"""
+    name = _named_database(request)
+    if name is None and request.method == "POST":
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        if isinstance(body, dict):
+            name = body.get("database_name")
+    return name
+
+def get_read_db(request: Request):
+    """Get a session on the requested database's read-only connection pool"""
+    handle = registry.acquire(_named_database(request))
+    try:
+        handle.sync_read_engine()
+        db = handle.ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    finally:
+        registry.release(handle)
+
+def _acquire(name: Optional[str], strict: bool) -> DatabaseHandle:
+    try:
+        return registry.acquire(name, strict)
+    except UnknownDatabaseError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+async def get_async_db(request: Request):
+    """Get an async writer session on the requested database, so SQL waits do not block the event loop"""
+    await registry.evict_idle()
+    handle = _acquire(await requested_database(request), strict=True)
+    try:
+        handle.async_engines()
+        async with handle.AsyncSessionLocal() as db:
+            yield db
+    finally:
+        registry.release(handle)
+
+async def get_async_read_db(request: Request):
+    """Get an async session on the requested database's read-only connection pool"""
+    await registry.evict_idle()
+    handle = _acquire(await requested_database(request), strict=False)
+    try:
+        handle.async_engines()
+        async with handle.AsyncReadSessionLocal() as db:
+            yield db
+    finally:
+        registry.release(handle)
+
+async def get_async_execute_db(request: Request):
+    """get_async_read_db for endpoints that may write: database_name must name a configured database"""
+    await registry.evict_idle()
+    handle = _acquire(await requested_database(request), strict=True)
+    try:
+        handle.async_engines()
+        async with handle.AsyncReadSessionLocal() as db:
+            yield db
+    finally:
+        registry.release(handle)
+
+async def interrupt_connection(conn: AsyncConnection):
+    """Stop the statement running on a SQLite connection right away (sqlite3_interrupt)"""
+    if conn.dialect.name == "sqlite" and not conn.closed:
+        await conn.sync_connection.connection.driver_connection.interrupt()
+
+async def run_interruptible(conn: AsyncConnection, work: Awaitable[T]) -> T:
+    """Await ``work`` running on ``conn``; if cancelled, stop its statement before unwinding.
+    
+    The work is shielded so the cancellation reaches us before SQLAlchemy's own
+    cleanup, which would otherwise queue a rollback behind the running statement.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        if conn.dialect.name == "sqlite":
+            await interrupt_connection(conn)
+        else:
+            # asyncpg and aiomysql cancel the server-side query with the task
+            task.cancel()
+        # Wait without forwarding further cancellations (anyio repeats them) to the task
+        while not task.done():
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                pass
+        if not task.cancelled():
+            task.exception()
+        raise
+
+async def set_deadline(conn: AsyncConnection, deadline: float):
+    """Make the database stop statements on ``conn`` once time.monotonic() passes ``deadline``.
+    
+    SQLite enforces it with the progress handler, PostgreSQL with a
+    transaction-local statement_timeout and MySQL with max_execution_time.
+    """
+    backend = conn.dialect.name
+    remaining_ms = max(1, int((deadline - time.monotonic()) * 1000))
+    if backend == "sqlite":
+        conn.info["deadline"] = deadline
+    elif backend == "postgresql":
+        await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {remaining_ms}")
+    elif backend == "mysql":
+        await conn.exec_driver_sql(f"SET SESSION max_execution_time = {remaining_ms}")
+
+async def clear_deadline(conn: AsyncConnection):
+    """Undo set_deadline before the connection is reused (PostgreSQL's ends with the transaction)"""
+    backend = conn.dialect.name
+    if backend == "sqlite":
+        conn.info.pop("deadline", None)
+    elif backend == "mysql" and not conn.closed:
+        try:
+            await conn.exec_driver_sql("SET SESSION max_execution_time = 0")
+        except Exception:
+            pass
+
+async def run_with_deadline(db: AsyncSession, work: Callable[[], Awaitable[T]], timeout: float = None) -> T:
+    """Run ``work`` on the session's connection under an execution deadline.
+    
+    Waiting for a pooled connection counts against the deadline. If the
+    caller is cancelled (client disconnect) the running statement is
+    interrupted rather than left to finish.
+    """
+    timeout = timeout or SQL_TIMEOUT_SECONDS
+    started = time.monotonic()
+    try:
+        conn = await asyncio.wait_for(db.connection(), timeout)
+    except asyncio.TimeoutError:
+        raise QueryTimeoutError(f"Timed out after {timeout:g}s waiting for a database connection", time.monotonic() - started)
+    
+    await set_deadline(conn, started + timeout)
     try:
-        print("✅ Database session created")
-        yield db
+        return await run_interruptible(conn, work())
+    except Exception as e:
+        elapsed = time.monotonic() - started
+        if elapsed >= timeout:
+            raise QueryTimeoutError(timeout_message(timeout), elapsed) from e
+        raise
     finally:
-        db.close()
-        print("🔒 Database session closed")
+        await clear_deadline(conn)
+
+def timeout_message(timeout: float) -> str:
+    return f"Query exceeded the {timeout:g}s execution limit and was cancelled"
 
-@traceable(
+@traced(
     name="📊 Get Table Info",
     run_type="tool",
     metadata={"operation": "inspect_tables"}
 )
 def get_table_info(db_engine):
-    """Get comprehensive table information with LangSmith tracking"""
+    """Get comprehensive table information from the shared schema catalog"""
     try:
-        inspector = inspect(db_engine)
         tables_info = {}
         
-        for table_name in inspector.get_table_names():
+        for table in schema_catalog.get_tables(db_engine):
             columns = []
-            for column in inspector.get_columns(table_name):
+            for column in table["columns"]:
                 columns.append({
                     "name": column["name"],
-                    "type": str(column["type"]),
+                    "type": column["type"],
                     "nullable": column["nullable"],
-                    "default": column.get("default"),
-                    "primary_key": column.get("primary_key", False)
+                    "default": column["default"],
+                    "primary_key": column["primary_key"]
                 })
             
-            tables_info[table_name] = {
+            tables_info[table["name"]] = {
                 "columns": columns
             }
         
-        print(f"✅ Retrieved info for {len(tables_info)} tables")
+        logger.debug("✅ Retrieved info for %d tables", len(tables_info))
         return tables_info
         
     except Exception as e:
-        print(f"❌ Error getting table info: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error("❌ Error getting table info: %s", e)
+        raise
+
+@traced(
+    name="📖 Browse Table Page",
+    run_type="tool",
+    metadata={"operation": "browse_rows"}
+)
+def fetch_table_page(
+    db,
+    table_name: str,
+    after: Optional[str] = None,
+    limit: int = 100,
+    columns: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Read one page of a table with keyset pagination - no LLM involved.
+    
+    Pages are ordered by the single-column primary key, or by rowid on SQLite
+    tables without one, so each page is an index seek rather than an OFFSET scan.
+    """
+    table = schema_catalog.get_table(db.bind, table_name)
+    if table is None:
+        raise LookupError(f"Table '{table_name}' not found")
+    
+    all_columns = [col["name"] for col in table["columns"]]
+    if columns:
+        unknown = [col for col in columns if col not in all_columns]
+        if unknown:
+            raise ValueError(f"Unknown columns for '{table_name}': {', '.join(unknown)}")
+    else:
+        columns = all_columns
+    
+    quote = db.bind.dialect.identifier_preparer.quote
+    if len(table["primary_key"]) == 1:
+        key_name = table["primary_key"][0]
+        key_expr = quote(key_name)
+        key_type = next(col["type"] for col in table["columns"] if col["name"] == key_name)
+        integer_key = "INT" in key_type.upper()
+    elif db.bind.dialect.name == "sqlite":
+        key_expr = "rowid"
+        integer_key = True
+    else:
+        raise ValueError(f"Table '{table_name}' has no single-column primary key to paginate on")
+    
+    params = {"limit": limit + 1}
+    where = ""
+    if after is not None:
+        where = f" WHERE {key_expr} > :after"
+        try:
+            params["after"] = int(after) if integer_key else after
+        except ValueError:
+            raise ValueError(f"Invalid cursor '{after}'")
+    
+    projection = ", ".join(quote(col) for col in columns)
+    sql = (
+        f"SELECT {key_expr} AS page_key, {projection} FROM {quote(table_name)}"
+        f"{where} ORDER BY {key_expr} LIMIT :limit"
+    )
+    
+    rows = db.execute(text(sql), params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return {
+        "table": table_name,
+        "columns": columns,
+        "results": [dict(zip(columns, row[1:])) for row in rows],
+        "next_cursor": str(rows[-1][0]) if has_more else None,
+        "has_more": has_more
+    }
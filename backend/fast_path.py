@@ -0,0 +1,123 @@
+import re
+from typing import Callable, List, Dict, Any, Optional, Tuple
+
+from schema_index import stem
+from sql_classifier import classify_statement, strip_literals
+
+_SQL_START_PATTERN = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_TABLE_REF_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+([\"`\[]?[\w.]+[\"`\]]?)", re.IGNORECASE)
+_CTE_NAME_PATTERN = re.compile(r"(?:\bWITH|,)\s*(?:RECURSIVE\s+)?([\w]+)\s+AS\s*\(", re.IGNORECASE)
+
+_LIST_PATTERN = re.compile(
+    r"^(?:show|list|get|display|fetch|give)(?:\s+me)?(?:\s+all)?(?:\s+(?:the|of\s+the))?\s+(?P<table>\w+)$"
+)
+_COUNT_PATTERN = re.compile(
+    r"^(?:count(?:\s+(?:all|the))?|how\s+many|number\s+of|total\s+(?:number\s+of\s+)?)\s+(?P<table>\w+)(?:\s+are\s+there)?$"
+)
+_TOP_PATTERN = re.compile(
+    r"^(?:show\s+|list\s+|get\s+)?(?:me\s+)?(?:the\s+)?(?P<dir>top|first|bottom|last)\s+(?P<n>\d+)\s+(?P<table>\w+)"
+    r"(?:\s+(?:by|ordered\s+by|sorted\s+by)\s+(?P<column>\w+))?$"
+)
+
+MAX_TEMPLATE_LIMIT = 1000
+
+
+def _normalize_prompt(prompt: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[?.!]+$", "", prompt.strip().lower())).strip()
+
+
+def _match_name(word: str, names: List[str]) -> Optional[str]:
+    """Exact or plural-folded match of a word against table/column names"""
+    for name in names:
+        if name.lower() == word:
+            return name
+    word_stem = stem(word)
+    for name in names:
+        if stem(name.lower()) == word_stem:
+            return name
+    return None
+
+
+def read_only_sql(prompt: str, tables: List[Dict[str, Any]]) -> Optional[str]:
+    """Return the prompt as SQL if it is a single read-only statement over known tables"""
+    if not _SQL_START_PATTERN.match(prompt):
+        return None
+
+    info = classify_statement(prompt)
+    if not info.is_read or info.is_multi_statement:
+        return None
+
+    sql = prompt.strip().rstrip(";").strip()
+    code = strip_literals(sql)
+
+    known = {table["name"].lower() for table in tables}
+    known.update(name.lower() for name in _CTE_NAME_PATTERN.findall(code))
+    for ref in _TABLE_REF_PATTERN.findall(code):
+        name = ref.strip("\"`[]").split(".")[-1].lower()
+        if name not in known:
+            return None
+    return sql
+
+
+def match_template(
+    prompt: str,
+    tables: List[Dict[str, Any]],
+    quote: Callable[[str], str]
+) -> Optional[Tuple[str, str]]:
+    """Match list/count/top-N intents on a known table (and column); returns (sql, explanation)"""
+    text = _normalize_prompt(prompt)
+    table_names = [table["name"] for table in tables]
+
+    match = _COUNT_PATTERN.match(text)
+    if match:
+        table = _match_name(match.group("table"), table_names)
+        if table:
+            return f"SELECT COUNT(*) AS count FROM {quote(table)}", f"Counts all rows in {table}"
+
+    match = _LIST_PATTERN.match(text)
+    if match:
+        table = _match_name(match.group("table"), table_names)
+        if table:
+            return f"SELECT * FROM {quote(table)}", f"Lists all rows in {table}"
+
+    match = _TOP_PATTERN.match(text)
+    if match:
+        table = _match_name(match.group("table"), table_names)
+        n = int(match.group("n"))
+        if not table or not 0 < n <= MAX_TEMPLATE_LIMIT:
+            return None
+
+        if match.group("column"):
+            columns = next(t["columns"] for t in tables if t["name"] == table)
+            column = _match_name(match.group("column"), [col["name"] for col in columns])
+            if not column:
+                return None
+            direction = "DESC" if match.group("dir") in ("top", "last") else "ASC"
+            return (
+                f"SELECT * FROM {quote(table)} ORDER BY {quote(column)} {direction} LIMIT {n}",
+                f"Returns the {match.group('dir')} {n} rows of {table} by {column}"
+            )
+
+        if match.group("dir") in ("top", "first"):
+            return f"SELECT * FROM {quote(table)} LIMIT {n}", f"Returns the first {n} rows of {table}"
+    return None
+
+
+def classify(
+    prompt: str,
+    tables: List[Dict[str, Any]],
+    quote: Callable[[str], str]
+) -> Optional[Tuple[str, str, str]]:
+    """Local fast path ahead of the LLM: returns (sql, explanation, source) or None.
+
+    source is "fast_path_sql" when the prompt already is read-only SQL and
+    "fast_path_template" when it matched a list/count/top-N intent.
+    """
+    sql = read_only_sql(prompt, tables)
+    if sql is not None:
+        return sql, "SQL provided directly; executed as written", "fast_path_sql"
+
+    templated = match_template(prompt, tables, quote)
+    if templated is not None:
+        return templated[0], templated[1], "fast_path_template"
+    return None
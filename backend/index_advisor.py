@@ -0,0 +1,280 @@
+import math
+import re
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from query_planner import table_aliases
+from sql_classifier import scan_spans, unquote
+from workload import WorkloadRecorder
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+# A key part is ("col", name) or ("lower", name) for an expression index on LOWER(name)
+KeyPart = Tuple[str, str]
+
+_CASE_FUNCTIONS = {"LOWER", "UPPER"}
+_FILTER_CLAUSES = {"WHERE", "ON"}
+_OTHER_CLAUSES = {"SELECT", "FROM", "GROUP", "HAVING", "LIMIT", "OFFSET", "UNION", "EXCEPT", "INTERSECT", "WINDOW"}
+_RANGE_OPERATORS = {"<", ">", "BETWEEN"}
+_INDEX_COLUMNS = re.compile(r"\bON\s+\S+?\s*\((?P<columns>.*)\)\s*(?P<partial>WHERE\b.*)?$", re.IGNORECASE | re.DOTALL)
+
+
+def _column_at(spans, index: int) -> Optional[Tuple[Optional[str], str, int]]:
+    """(qualifier, column, index after it) for a [qualifier.]column reference at ``index``"""
+    if index >= len(spans) or spans[index].kind not in ("word", "ident"):
+        return None
+    if index and spans[index - 1].value in (":", "@", "."):
+        return None
+    if index + 2 < len(spans) and spans[index + 1].value == "." and spans[index + 2].kind in ("word", "ident"):
+        qualifier, column, after = unquote(spans[index].value), unquote(spans[index + 2].value), index + 3
+    else:
+        qualifier, column, after = None, unquote(spans[index].value), index + 1
+    # A function call, not a column
+    if after < len(spans) and spans[after].value == "(":
+        return None
+    return qualifier, column, after
+
+
+def _is_value(spans, index: int) -> bool:
+    """Whether the right-hand side at ``index`` is a value (literal, parameter, function of one) and not a column"""
+    if index >= len(spans):
+        return False
+    if spans[index].kind in ("word", "ident"):
+        return spans[index].value.upper() in ("NULL", "TRUE", "FALSE") or _column_at(spans, index) is None
+    return True
+
+
+def extract_predicates(statement: str) -> Dict[str, Any]:
+    """Indexable predicates of a SELECT, with columns still qualified as written.
+
+    Returns {"eq": [(qualifier, KeyPart)], "range": [...], "order": [...]}:
+    equality and IN filters (including LOWER(col) = ...), range filters and
+    ORDER BY columns. Joins between two columns and LIKE are not indexable
+    lookups and are left out.
+    """
+    spans = scan_spans(statement)
+    clauses: Dict[int, str] = {}
+    found: Dict[str, List[Tuple[Optional[str], KeyPart]]] = {"eq": [], "range": [], "order": []}
+
+    index = 0
+    while index < len(spans):
+        span = spans[index]
+        word = span.value.upper() if span.kind == "word" else None
+        if word in _FILTER_CLAUSES or word in _OTHER_CLAUSES:
+            clauses[span.depth] = word
+            index += 1
+            continue
+
+        if word == "ORDER" and index + 1 < len(spans) and spans[index + 1].value.upper() == "BY":
+            clauses[span.depth] = "ORDER"
+            index += 2
+            keys = []
+            while True:
+                column = _column_at(spans, index)
+                if column is None:
+                    keys = []
+                    break
+                qualifier, name, index = column
+                keys.append((qualifier, ("col", name)))
+                if index < len(spans) and spans[index].value.upper() in ("ASC", "DESC"):
+                    index += 1
+                if index < len(spans) and spans[index].value == ",":
+                    index += 1
+                    continue
+                break
+            found["order"].extend(keys)
+            continue
+
+        if clauses.get(span.depth) not in _FILTER_CLAUSES:
+            index += 1
+            continue
+
+        # LOWER(col) = ... / LOWER(col) IN (...)
+        if word in _CASE_FUNCTIONS and index + 1 < len(spans) and spans[index + 1].value == "(":
+            column = _column_at(spans, index + 2)
+            if column is not None and column[2] < len(spans) and spans[column[2]].value == ")":
+                qualifier, name, after = column
+                operator = spans[after + 1].value.upper() if after + 1 < len(spans) else ""
+                if operator == "IN" or (operator == "=" and _is_value(spans, after + 2)):
+                    kind = "lower" if word == "LOWER" else "upper"
+                    found["eq"].append((qualifier, (kind, name)))
+                index = after + 1
+                continue
+
+        column = _column_at(spans, index) if word not in ("AND", "OR", "NOT") else None
+        if column is not None:
+            qualifier, name, after = column
+            operator = spans[after].value.upper() if after < len(spans) else ""
+            if operator == "IN" or (operator == "=" and _is_value(spans, after + 1)):
+                found["eq"].append((qualifier, ("col", name)))
+            elif operator in _RANGE_OPERATORS:
+                # "<=" and ">=" arrive as two tokens
+                following = after + 1 if after + 1 < len(spans) and spans[after + 1].value == "=" else after
+                if operator == "BETWEEN" or _is_value(spans, following + 1):
+                    found["range"].append((qualifier, ("col", name)))
+            index = after
+            continue
+        index += 1
+    return found
+
+
+def key_sql(part: KeyPart, quote) -> str:
+    kind, column = part
+    return f"{kind.upper()}({quote(column)})" if kind != "col" else quote(column)
+
+
+def _normalize(expression: str) -> str:
+    expression = re.sub(r"[\s\"`\[\]]", "", expression.lower())
+    return re.sub(r"(asc|desc)$", "", expression)
+
+
+def _split_columns(columns: str) -> List[str]:
+    parts, depth, current = [], 0, ""
+    for char in columns:
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += (char == "(") - (char == ")")
+        current += char
+    parts.append(current)
+    return [_normalize(part) for part in parts if part.strip()]
+
+
+class IndexAdvisor:
+    """Propose indexes from the recorded workload, ranked by estimated time saved.
+
+    Each recorded SELECT that fully scanned a table contributes the
+    predicates it filtered or sorted that table by: equality columns and
+    LOWER(col) expressions first, then one range column, else the ORDER BY
+    columns. The estimate assumes an indexed lookup reads about log2(n)
+    rows instead of all n, so a query saves nearly all of the time its scan
+    of that table took. Candidates that an existing index already covers
+    are dropped; a candidate that is a prefix of a longer one is folded
+    into it.
+    """
+
+    def __init__(self, recorder: WorkloadRecorder):
+        self.recorder = recorder
+
+    @staticmethod
+    def _resolve(qualifier: Optional[str], column: str, aliases: Dict[str, str], columns: Dict[str, Set[str]]) -> Optional[str]:
+        if qualifier is not None:
+            return aliases.get(qualifier)
+        owners = [table for table in set(aliases.values()) if column in columns.get(table, ())]
+        return owners[0] if len(owners) == 1 else None
+
+    def _candidates(self, record: Dict[str, Any], columns: Dict[str, Set[str]]) -> List[Tuple[str, Tuple[KeyPart, ...], float]]:
+        """(table, key, estimated ms saved) for one recorded execution"""
+        plan = record.get("plan") or {}
+        scans = {scan["table"]: scan.get("rows") for scan in plan.get("full_scans") or [] if scan.get("table") in columns}
+        if not scans:
+            return []
+
+        aliases = table_aliases(record["statement"])
+        predicates = extract_predicates(record["statement"])
+        by_table: Dict[str, Dict[str, List[KeyPart]]] = {}
+        order_tables = set()
+        for kind, parts in predicates.items():
+            for qualifier, part in parts:
+                table = self._resolve(qualifier, part[1], aliases, columns)
+                if kind == "order":
+                    order_tables.add(table)
+                if table in scans:
+                    keys = by_table.setdefault(table, {"eq": [], "range": [], "order": []})[kind]
+                    if part not in keys:
+                        keys.append(part)
+
+        sizes = {table: rows or 0 for table, rows in scans.items()}
+        total_rows = sum(sizes.values())
+        candidates = []
+        for table, parts in by_table.items():
+            key = list(parts["eq"])
+            if parts["range"]:
+                key.append(parts["range"][0])
+            elif order_tables == {table}:
+                # Only an ORDER BY entirely on this table can be served by its index
+                key.extend(part for part in parts["order"] if part not in key)
+            if not key:
+                continue
+
+            rows = sizes[table]
+            share = rows / total_rows if total_rows else 1.0 / len(scans)
+            fraction = 1 - (math.log2(rows) + 1) / rows if rows > 1 else 0.0
+            candidates.append((table, tuple(key), record["duration_ms"] * share * fraction))
+        return candidates
+
+    async def _existing_indexes(self, conn: AsyncConnection, table: str) -> List[List[str]]:
+        """Normalized key list of every full (non-partial) index on ``table``"""
+        if conn.dialect.name == "sqlite":
+            rows = await conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+                {"table": table}
+            )
+            keys = []
+            for (sql,) in rows:
+                match = _INDEX_COLUMNS.search(sql)
+                if match and not match.group("partial"):
+                    keys.append(_split_columns(match.group("columns")))
+            return keys
+
+        def load(sync_conn):
+            return inspect(sync_conn).get_indexes(table)
+
+        keys = []
+        for index in await conn.run_sync(load):
+            expressions = index.get("expressions") or index.get("column_names") or []
+            keys.append([_normalize(str(expression)) for expression in expressions if expression is not None])
+        return keys
+
+    async def recommend(self, conn: AsyncConnection, entry: Dict[str, Any], database: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Ranked index proposals for ``database`` from its recorded workload"""
+        columns = {table["name"]: {column["name"] for column in table["columns"]} for table in entry["tables"]}
+        totals: Dict[Tuple[str, Tuple[KeyPart, ...]], Dict[str, Any]] = {}
+        for record in self.recorder.records(database):
+            for table, key, saved in self._candidates(record, columns):
+                total = totals.setdefault((table, key), {"queries": 0, "total_ms": 0.0, "saved_ms": 0.0, "examples": []})
+                total["queries"] += 1
+                total["total_ms"] += record["duration_ms"]
+                total["saved_ms"] += saved
+                if record["statement"] not in total["examples"] and len(total["examples"]) < 3:
+                    total["examples"].append(record["statement"])
+
+        # (a) is served by an index on (a, b): fold shorter keys into longer ones
+        for table, key in sorted(totals, key=lambda item: len(item[1])):
+            longer = [other for other in totals if other[0] == table and len(other[1]) > len(key) and other[1][:len(key)] == key]
+            if longer:
+                target = max(longer, key=lambda other: totals[other]["saved_ms"])
+                for field in ("queries", "total_ms", "saved_ms"):
+                    totals[target][field] += totals[(table, key)][field]
+                del totals[(table, key)]
+
+        quote = conn.dialect.identifier_preparer.quote
+        mysql = conn.dialect.name in ("mysql", "mariadb")
+        existing: Dict[str, List[List[str]]] = {}
+        proposals = []
+        for (table, key), total in sorted(totals.items(), key=lambda item: item[1]["saved_ms"], reverse=True):
+            if table not in existing:
+                existing[table] = await self._existing_indexes(conn, table)
+            wanted = [_normalize(key_sql(part, lambda name: name)) for part in key]
+            if any(index[:len(wanted)] == wanted for index in existing[table]):
+                continue
+
+            name = "ix_" + "_".join([table] + [part[1] if part[0] == "col" else f"{part[0]}_{part[1]}" for part in key])
+            name = re.sub(r"\W", "_", name)[:60]
+            key_list = ", ".join(
+                # MySQL functional key parts need their own parentheses
+                f"({key_sql(part, quote)})" if part[0] != "col" and mysql else key_sql(part, quote)
+                for part in key
+            )
+            proposals.append({
+                "name": name,
+                "table": table,
+                "columns": [key_sql(part, lambda name: name) for part in key],
+                "ddl": f"CREATE INDEX {'' if mysql else 'IF NOT EXISTS '}{quote(name)} ON {quote(table)} ({key_list})",
+                "queries": total["queries"],
+                "total_ms": round(total["total_ms"], 3),
+                "estimated_saved_ms": round(total["saved_ms"], 3),
+                "examples": total["examples"]
+            })
+            if len(proposals) >= limit:
+                break
+        return proposals
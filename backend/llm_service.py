@@ -1,35 +1,61 @@
 from langchain_openai import ChatOpenAI
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import PromptTemplate
 from sqlalchemy.orm import Session
-from sqlalchemy import text, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
 import json
-from typing import List, Dict, Any, Tuple
-from langsmith import Client, traceable
-from langsmith.run_helpers import get_current_run_tree
+from typing import List, Dict, Any, Tuple, AsyncIterator, NamedTuple, Optional, Union
+from tracing import traced, current_span
+from metrics import stage, LLM_TOKENS
+from schema_catalog import schema_catalog
+from sql_cache import SQLCache
+from sql_template_cache import SQLTemplateCache, render_sql
+import fast_path
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class LLMOverloadedError(Exception):
+    """Raised when too many LLM calls are already waiting for a slot"""
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Counts the tokens the API reports for each chat completion.
+    
+    ChatOpenAI puts them in the LLMResult's llm_output; the message returned
+    by ainvoke does not carry them in the pinned langchain-openai.
+    """
+    
+    run_inline = True
+    
+    def on_llm_end(self, response, **kwargs: Any):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        LLM_TOKENS.inc(usage.get("prompt_tokens") or 0, kind="prompt")
+        LLM_TOKENS.inc(usage.get("completion_tokens") or 0, kind="completion")
+
+
+class GeneratedSQL(NamedTuple):
+    """SQL produced for a prompt"""
+    sql_query: str            # SQL with literals inlined, for display
+    explanation: str
+    statement: str            # SQL to execute; uses :name placeholders when params is non-empty
+    params: Dict[str, Any]
+    source: str               # "fast_path_sql", "fast_path_template", "template", "cache" or "llm"
+
+
 class LLMService:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
-        # Initialize LangSmith Client
-        self.langsmith_api_key = os.getenv("LANGSMITH_API_KEY")
-        if self.langsmith_api_key:
-            os.environ["LANGCHAIN_TRACING_V2"] = "true"
-            os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
-            os.environ["LANGCHAIN_API_KEY"] = self.langsmith_api_key
-            os.environ["LANGCHAIN_PROJECT"] = os.getenv("LANGCHAIN_PROJECT", "DB-QueryPilot-AI")
-            self.langsmith_client = Client(api_key=self.langsmith_api_key)
-            print("✅ LangSmith tracking enabled - Project: DB-QueryPilot-AI")
-        else:
-            print("⚠️ LangSmith API key not found. Tracking disabled.")
-            self.langsmith_client = None
-        
         # Initialize OpenAI with faster model and optimized settings
         self.llm = ChatOpenAI(
             model="gpt-3.5-turbo", 
@@ -37,10 +63,33 @@ class LLMService:
             openai_api_key=self.api_key,
             max_tokens=500,
             request_timeout=10,
-            # Enable callbacks for better tracing
-            callbacks=None
+            callbacks=[TokenUsageHandler()]
+        )
+        
+        # Bound outstanding LLM calls; requests beyond the queue limit are rejected
+        self.llm_max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.llm_max_queue = int(os.getenv("LLM_MAX_QUEUE", "32"))
+        self._llm_semaphore = None
+        self._llm_pending = 0
+        
+        # Prompt -> SQL cache; set SQL_CACHE_PATH to persist it across restarts and workers
+        self.sql_cache = SQLCache(
+            max_entries=int(os.getenv("SQL_CACHE_SIZE", "1000")),
+            ttl_seconds=float(os.getenv("SQL_CACHE_TTL", "86400")),
+            path=os.getenv("SQL_CACHE_PATH") or None
+        )
+        
+        # Prompt shape -> parameterized SQL, so only the literals differ between hits
+        self.sql_template_cache = SQLTemplateCache(
+            max_entries=int(os.getenv("SQL_TEMPLATE_CACHE_SIZE", "1000"))
         )
         
+        # Rows per fetchmany() batch when streaming results
+        self.stream_batch_size = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+        
+        # Prompts carry at most this many retrieved tables (plus the tables needed to join them)
+        self.schema_top_k = int(os.getenv("SCHEMA_TOP_K", "8"))
+        
         # Optimized SQL Generation Prompt
         self.sql_prompt_template = """You are a SQL expert. Generate complete and valid SQL queries.
 
@@ -60,54 +109,124 @@ IMPORTANT RULES:
 Return ONLY this JSON format (no markdown, no backticks):
 {{"sql_query": "your SQL here", "explanation": "brief description"}}"""
     
-    @traceable(
+    @traced(name="🧠 Chat Model Call", run_type="llm", metadata={"model": "gpt-3.5-turbo"})
+    async def _ainvoke_llm(self, full_prompt: str):
+        """Await the chat model without blocking the event loop, with bounded concurrency"""
+        if self._llm_pending >= self.llm_max_concurrency + self.llm_max_queue:
+            raise LLMOverloadedError(
+                f"LLM busy: {self._llm_pending} requests pending, try again shortly"
+            )
+        
+        # Created lazily so the semaphore binds to the server's running loop
+        if self._llm_semaphore is None:
+            self._llm_semaphore = asyncio.Semaphore(self.llm_max_concurrency)
+        
+        self._llm_pending += 1
+        try:
+            with stage("llm_queue"):
+                await self._llm_semaphore.acquire()
+            try:
+                with stage("llm"):
+                    response = await self.llm.ainvoke(full_prompt)
+            finally:
+                self._llm_semaphore.release()
+        finally:
+            self._llm_pending -= 1
+        return response
+    
+    @traced(
         name="🔍 Get Available Tables",
         run_type="tool"
     )
     def get_databases(self, db: Session) -> List[str]:
         """Get list of databases/tables"""
         try:
-            inspector = inspect(db.bind)
-            tables = inspector.get_table_names()
+            tables = schema_catalog.get_table_names(db.bind)
             result = tables if tables else ["default"]
-            print(f"📊 Found tables: {result}")
+            logger.debug("📊 Found tables: %s", result)
             return result
         except Exception as e:
-            print(f"❌ Error getting tables: {str(e)}")
+            logger.error("❌ Error getting tables: %s", e)
             return ["default"]
     
-    @traceable(
+    @traced(
         name="📋 Get Table Schema",
         run_type="tool",
         metadata={"purpose": "fetch_schema"}
     )
     def get_table_schemas(self, db: Session, database_name: str = None) -> List[Dict[str, Any]]:
-        """Get schema information - cached for performance"""
+        """Get schema information from the shared schema catalog"""
         try:
-            inspector = inspect(db.bind)
-            tables_info = []
-            
-            for table_name in inspector.get_table_names():
-                columns = []
-                for column in inspector.get_columns(table_name):
-                    columns.append({
-                        "name": column["name"],
-                        "type": str(column["type"]),
-                        "nullable": column["nullable"]
-                    })
-                
-                tables_info.append({
-                    "name": table_name,
-                    "columns": columns
-                })
+            tables_info = [
+                {
+                    "name": table["name"],
+                    "columns": [
+                        {
+                            "name": col["name"],
+                            "type": col["type"],
+                            "nullable": col["nullable"]
+                        }
+                        for col in table["columns"]
+                    ]
+                }
+                for table in schema_catalog.get_tables(db.bind)
+            ]
             
-            print(f"📋 Retrieved schema for {len(tables_info)} tables")
+            logger.debug("📋 Retrieved schema for %d tables", len(tables_info))
             return tables_info
         except Exception as e:
-            print(f"❌ Error getting schema: {str(e)}")
+            logger.error("❌ Error getting schema: %s", e)
             return []
     
-    @traceable(name="🔧 Format Schema for Prompt")
+    def prune_tables(self, entry: Dict[str, Any], prompt: str, database_name: str = None) -> List[Dict[str, Any]]:
+        """BM25 top-k tables for the prompt, the requested table, and the tables joining them"""
+        tables = entry["tables"]
+        if len(tables) <= self.schema_top_k:
+            return tables
+        
+        index = entry["index"]
+        selected = [name for name, _ in index.search(prompt, self.schema_top_k)]
+        
+        # The client sends the table it is looking at as database_name
+        if database_name and database_name in index.graph and database_name not in selected:
+            selected.insert(0, database_name)
+        
+        if not selected:
+            logger.debug("🧭 No table matched the prompt; using full schema")
+            return tables
+        
+        selected += index.join_tables(selected)
+        wanted = set(selected)
+        pruned = [table for table in tables if table["name"] in wanted]
+        logger.debug("🧭 Selected %d of %d tables: %s", len(pruned), len(tables), selected)
+        return pruned
+    
+    def schema_prompt(self, entry: Dict[str, Any], table_schemas: List[Dict[str, Any]]) -> str:
+        """Formatted schema for a table selection, memoized on the catalog entry until the schema changes"""
+        memo = entry.setdefault("schema_prompts", {})
+        key = tuple(table["name"] for table in table_schemas)
+        schema_str = memo.get(key)
+        if schema_str is None:
+            if len(memo) >= 256:
+                memo.clear()
+            schema_str = memo[key] = self._format_schema_for_prompt(table_schemas)
+        return schema_str
+    
+    def try_fast_path(self, prompt: str, tables: List[Dict[str, Any]], dialect) -> Optional[GeneratedSQL]:
+        """Answer raw read-only SQL and trivial list/count/top-N prompts without the LLM"""
+        try:
+            matched = fast_path.classify(prompt, tables, dialect.identifier_preparer.quote)
+        except Exception as e:
+            logger.warning("⚠️ Fast path skipped: %s", e)
+            return None
+        
+        if matched is None:
+            return None
+        
+        sql_query, explanation, source = matched
+        logger.debug("🏎️ Fast path (%s): %s", source, sql_query)
+        return GeneratedSQL(sql_query, explanation, sql_query, {}, source)
+    
     def _format_schema_for_prompt(self, table_schemas: List[Dict[str, Any]]) -> str:
         """Schema format with nullable info for better SQL generation"""
         schema_str = ""
@@ -116,9 +235,14 @@ Return ONLY this JSON format (no markdown, no backticks):
             for col in table['columns']:
                 nullable = "NULL" if col['nullable'] else "NOT NULL (Required)"
                 schema_str += f"  - {col['name']} ({col['type']}) {nullable}\n"
+            for fk in table.get('foreign_keys', []):
+                schema_str += (
+                    f"  FK: {', '.join(fk['columns'])} -> "
+                    f"{fk['referred_table']}({', '.join(fk['referred_columns'])})\n"
+                )
         return schema_str
     
-    @traceable(
+    @traced(
         name="🤖 Generate SQL from Natural Language",
         run_type="llm",
         metadata={
@@ -127,185 +251,218 @@ Return ONLY this JSON format (no markdown, no backticks):
             "temperature": 0
         }
     )
-    async def generate_sql(
+    async def generate_sql_statement(
         self, 
         prompt: str, 
         table_schemas: List[Dict[str, Any]],
         user_id: str = None,
-        session_id: str = None
-    ) -> Tuple[str, str]:
-        """Generate SQL query - optimized for speed with comprehensive LangSmith tracking"""
+        session_id: str = None,
+        schema_str: str = None
+    ) -> GeneratedSQL:
+        """Generate SQL for a prompt, using the template and exact caches before the LLM.
+        
+        The returned statement carries the prompt's literals as bind parameters
+        whenever the SQL could be templated, so repeated shapes reuse one
+        prepared statement. Pass ``schema_str`` when the schema is already formatted.
+        """
         
         # Add metadata to current run
-        current_run = get_current_run_tree()
-        if current_run:
-            current_run.metadata.update({
+        span = current_span()
+        if span:
+            span.metadata.update({
                 "user_prompt": prompt,
                 "num_tables": len(table_schemas),
                 "table_names": [t['name'] for t in table_schemas]
             })
             if user_id:
-                current_run.metadata["user_id"] = user_id
+                span.metadata["user_id"] = user_id
             if session_id:
-                current_run.metadata["session_id"] = session_id
+                span.metadata["session_id"] = session_id
         
         try:
-            schema_str = self._format_schema_for_prompt(table_schemas)
+            if schema_str is None:
+                schema_str = self._format_schema_for_prompt(table_schemas)
+            
+            # Same question shape with different literals: bind them into the cached template
+            templated, template_key, literals = self.sql_template_cache.lookup(prompt, table_schemas, schema_str)
+            if templated is not None:
+                statement, explanation, params = templated
+                sql_query = render_sql(statement, params)
+                logger.debug("⚡ SQL template hit: %s %s", statement, params)
+                if span:
+                    span.outputs = {
+                        "sql_query": sql_query,
+                        "explanation": explanation,
+                        "success": True,
+                        "cache_hit": "template"
+                    }
+                return GeneratedSQL(sql_query, explanation, statement, params, "template")
+            
+            cache_key = self.sql_cache.make_key(prompt, schema_str)
+            cached = self.sql_cache.get(cache_key)
+            if cached is not None:
+                sql_query, explanation = cached
+                logger.debug("⚡ SQL cache hit: %s", sql_query)
+                if span:
+                    span.outputs = {
+                        "sql_query": sql_query,
+                        "explanation": explanation,
+                        "success": True,
+                        "cache_hit": "exact"
+                    }
+                return GeneratedSQL(sql_query, explanation, sql_query, {}, "cache")
             
             full_prompt = self.sql_prompt_template.format(
                 schema=schema_str,
                 prompt=prompt
             )
             
-            print(f"💬 User Query: {prompt}")
-            print(f"📝 Generating SQL...")
+            logger.debug("📝 Generating SQL for: %s", prompt)
             
             # LLM invocation (automatically tracked by LangChain)
-            response = self.llm.invoke(full_prompt)
+            response = await self._ainvoke_llm(full_prompt)
             response_text = response.content.strip()
             
-            print(f"✅ LLM Response received")
+            logger.debug("✅ LLM Response received")
             
             # Parse JSON response
             try:
-                # Remove markdown if present
-                if response_text.startswith("```"):
-                    response_text = response_text.split("```")[1]
-                    if response_text.startswith("json"):
-                        response_text = response_text[4:]
-                
-                response_text = response_text.strip()
-                result = json.loads(response_text)
+                with stage("parse"):
+                    # Remove markdown if present
+                    if response_text.startswith("```"):
+                        response_text = response_text.split("```")[1]
+                        if response_text.startswith("json"):
+                            response_text = response_text[4:]
+                    
+                    response_text = response_text.strip()
+                    result = json.loads(response_text)
                 
                 sql_query = result.get("sql_query", "").strip()
                 explanation = result.get("explanation", "Query generated")
                 
-                print(f"✅ Generated SQL: {sql_query}")
+                logger.info("✅ Generated SQL: %s", sql_query)
+                
+                statement, params = sql_query, {}
+                if sql_query:
+                    self.sql_cache.put(cache_key, sql_query, explanation)
+                    stored = self.sql_template_cache.store(template_key, literals, sql_query, explanation)
+                    if stored is not None:
+                        statement, params = stored
                 
                 # Add output to trace
-                if current_run:
-                    current_run.outputs = {
+                if span:
+                    span.outputs = {
                         "sql_query": sql_query,
                         "explanation": explanation,
                         "success": True
                     }
                 
-                return sql_query, explanation
+                return GeneratedSQL(sql_query, explanation, statement, params, "llm")
                 
             except json.JSONDecodeError as e:
-                print(f"⚠️ JSON Parse Error: {str(e)}")
+                logger.warning("⚠️ JSON Parse Error: %s", e)
                 # Fallback: extract SQL manually
                 if "SELECT" in response_text.upper() or "INSERT" in response_text.upper():
-                    return response_text, "Generated SQL query (parsed from text)"
+                    explanation = "Generated SQL query (parsed from text)"
+                    return GeneratedSQL(response_text, explanation, response_text, {}, "llm")
                 raise Exception("Could not parse SQL from response")
                 
+        except LLMOverloadedError:
+            logger.warning("⏳ LLM queue full (%d pending)", self._llm_pending)
+            raise
         except Exception as e:
             error_msg = f"Error generating SQL: {str(e)}"
-            print(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             
             # Log error to trace
-            if current_run:
-                current_run.error = error_msg
-                current_run.outputs = {"success": False, "error": str(e)}
+            if span:
+                span.error = error_msg
+                span.outputs = {"success": False, "error": str(e)}
             
             raise Exception(error_msg)
     
-    @traceable(
-        name="📊 Execute SELECT Query",
+    @traced(
+        name="📊 Execute SELECT Query (async)",
         run_type="tool",
         metadata={"operation": "read"}
     )
-    def execute_query(self, db: Session, sql_query: str) -> List[Dict[str, Any]]:
-        """Execute SELECT query - optimized with tracking"""
-        
-        current_run = get_current_run_tree()
-        if current_run:
-            current_run.metadata["sql_query"] = sql_query
-        
+    async def execute_query_rows_async(self, db: AsyncSession, sql_query: str, params: Dict[str, Any] = None) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+        """Execute SELECT query and return column names plus positional row tuples"""
         try:
-            print(f"🔍 Executing query: {sql_query[:100]}...")
-            
-            result = db.execute(text(sql_query))
-            columns = result.keys()
-            rows = result.fetchall()
-            
-            # Fast list comprehension
-            results = [
-                {col: row[i] for i, col in enumerate(columns)}
-                for row in rows
-            ]
-            
-            print(f"✅ Query executed: {len(results)} rows returned")
+            logger.debug("🔍 Executing query: %.100s", sql_query)
             
-            # Add to trace
-            if current_run:
-                current_run.outputs = {
-                    "rows_returned": len(results),
-                    "columns": list(columns),
-                    "success": True
-                }
+            result = await db.execute(text(sql_query), params or {})
+            columns = list(result.keys())
+            rows = [tuple(row) for row in result.fetchall()]
             
-            return results
+            logger.debug("✅ Query executed: %d rows returned", len(rows))
+            return columns, rows
             
         except Exception as e:
             error_msg = f"Error executing query: {str(e)}"
-            print(f"❌ {error_msg}")
-            
-            if current_run:
-                current_run.error = error_msg
-                current_run.outputs = {"success": False, "error": str(e)}
-            
+            logger.error("❌ %s", error_msg)
+            raise Exception(error_msg)
+    
+    async def stream_query_async(self, db: AsyncSession, sql_query: str, params: Dict[str, Any] = None, batch_size: int = None) -> Tuple[List[str], AsyncIterator[List[List[Any]]]]:
+        """Execute SELECT query and return its columns plus a lazy async iterator of row batches.
+        
+        Rows are pulled a batch at a time as the iterator is consumed, so memory stays
+        bounded by one batch no matter how many rows the query returns.
+        """
+        batch_size = batch_size or self.stream_batch_size
+        logger.debug("🌊 Streaming query: %.100s", sql_query)
+        
+        try:
+            result = await db.stream(text(sql_query), params or {})
+        except Exception as e:
+            error_msg = f"Error executing query: {str(e)}"
+            logger.error("❌ %s", error_msg)
             raise Exception(error_msg)
+        
+        columns = list(result.keys())
+        
+        async def batches() -> AsyncIterator[List[List[Any]]]:
+            try:
+                async for rows in result.partitions(batch_size):
+                    yield [list(row) for row in rows]
+            finally:
+                await result.close()
+        
+        return columns, batches()
     
-    @traceable(
-        name="✏️ Execute Modification Query",
+    @traced(
+        name="✏️ Execute Modification Batch",
         run_type="tool",
         metadata={"operation": "write"}
     )
-    def execute_modification(self, db: Session, sql_query: str) -> int:
-        """Execute INSERT/UPDATE/DELETE - optimized with tracking"""
-        
-        current_run = get_current_run_tree()
-        if current_run:
-            current_run.metadata["sql_query"] = sql_query
-            # Detect operation type
-            if "INSERT" in sql_query.upper():
-                current_run.metadata["operation_type"] = "INSERT"
-            elif "UPDATE" in sql_query.upper():
-                current_run.metadata["operation_type"] = "UPDATE"
-            elif "DELETE" in sql_query.upper():
-                current_run.metadata["operation_type"] = "DELETE"
+    async def execute_modification_batch_async(
+        self,
+        db: AsyncSession,
+        statements: List[Tuple[str, Union[Dict[str, Any], List[Dict[str, Any]]]]]
+    ) -> List[Union[int, Exception]]:
+        """Run several modifications in one transaction; each item returns its rowcount or its error.
         
+        A list of params runs that statement as executemany. Every item sits in
+        its own SAVEPOINT, so a failing item rolls back only its own rows.
+        """
+        outcomes: List[Union[int, Exception]] = []
         try:
-            print(f"✏️ Executing modification: {sql_query[:100]}...")
-            
-            result = db.execute(text(sql_query))
-            db.commit()
-            affected = result.rowcount
-            
-            print(f"✅ Modification executed: {affected} rows affected")
-            
-            # Add to trace
-            if current_run:
-                current_run.outputs = {
-                    "rows_affected": affected,
-                    "success": True,
-                    "committed": True
-                }
-            
-            return affected
-            
+            for sql_query, params in statements:
+                rows = len(params) if isinstance(params, list) else 1
+                logger.debug("✏️ Executing modification (%d rows): %.100s", rows, sql_query)
+                try:
+                    async with db.begin_nested():
+                        result = await db.execute(text(sql_query), params or {})
+                    outcomes.append(result.rowcount)
+                except Exception as e:
+                    logger.error("❌ Batch item failed: %s", e)
+                    outcomes.append(Exception(f"Error: {str(e)}"))
+            await db.commit()
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             error_msg = f"Error: {str(e)}"
-            print(f"❌ {error_msg}")
-            
-            if current_run:
-                current_run.error = error_msg
-                current_run.outputs = {
-                    "success": False,
-                    "error": str(e),
-                    "rolled_back": True
-                }
-            
-            raise Exception(error_msg)
\ No newline at end of file
+            logger.error("❌ %s", error_msg)
+            raise Exception(error_msg)
+        
+        logger.debug("✅ Modification batch committed: %d statements", len(statements))
+        return outcomes
@@ -1,15 +1,42 @@
-from fastapi import FastAPI, HTTPException, Depends
+# Logging is configured before the modules below log at import time
+from logging_config import setup_logging
+setup_logging()
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Literal, Tuple, TypeVar
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from database import get_db, engine
-from llm_service import LLMService
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import (
+    get_read_db, get_async_read_db, get_async_execute_db, fetch_table_page, registry, default_database,
+    run_with_deadline, run_interruptible, set_deadline, clear_deadline, timeout_message,
+    QueryTimeoutError, SQL_TIMEOUT_SECONDS
+)
+from llm_service import LLMService, LLMOverloadedError, GeneratedSQL
+from schema_catalog import schema_catalog, database_key
+from sql_classifier import classify_statement, normalize_sql
+from query_planner import query_planner, QueryRejectedError
+from workload import workload_recorder
+from result_cache import result_cache, data_versions
+from index_advisor import IndexAdvisor
+from result_encoding import encode_results
+from singleflight import SingleFlight
+from write_queue import WriteQueue
+import anyio
+import asyncio
+import json
 import logging
-from langsmith import traceable
+import os
+import time
+from tracing import traced, tracer
+from metrics import (
+    registry as metrics_registry, ServerTimingMiddleware, stage, timed_handler,
+    count_error, count_rows, SQL_SOURCES
+)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI
@@ -24,14 +51,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-stage timings: Prometheus histograms on /metrics and a Server-Timing header per response
+app.add_middleware(ServerTimingMiddleware)
+
 # Initialize LLM Service
 llm_service = LLMService()
 
+# Identical concurrent requests share one generation and one SELECT execution
+generation_flights = SingleFlight("generation")
+execution_flights = SingleFlight("execution")
+
+# Concurrent generations per /query/batch request
+QUERY_BATCH_CONCURRENCY = int(os.getenv("QUERY_BATCH_CONCURRENCY", str(llm_service.llm_max_concurrency)))
+
+# Executed SELECTs are recorded for the index advisor behind /admin/indexes
+index_advisor = IndexAdvisor(workload_recorder)
+
 # Pydantic models
 class QueryRequest(BaseModel):
     prompt: str
     database_name: str
     execute: bool = False
+    stream: bool = False
+    # records = list of row dicts; rows/columns = compact JSON; arrow = Arrow IPC stream
+    result_format: Literal["records", "rows", "columns", "arrow"] = "records"
+    # SQL execution deadline in seconds, capped at SQL_TIMEOUT_SECONDS
+    timeout_seconds: Optional[float] = None
+
+class BatchQueryRequest(BaseModel):
+    prompts: List[str]
+    database_name: str
+    execute: bool = True
+    timeout_seconds: Optional[float] = None
+
+class ApplyIndexesRequest(BaseModel):
+    # Names from GET /admin/indexes
+    names: List[str]
 
 class QueryResponse(BaseModel):
     sql_query: str
@@ -39,10 +94,310 @@ class QueryResponse(BaseModel):
     results: Optional[List[Dict[str, Any]]] = None
     success: bool
     message: str
+    # How the SQL was produced: fast_path_sql, fast_path_template, template, cache or llm
+    source: Optional[str] = None
+    # Planner summary for executed SELECTs: full scans, row estimate, LIMIT applied, warnings
+    plan: Optional[Dict[str, Any]] = None
+
+class ModificationItem(BaseModel):
+    # Exactly one of prompt (natural language) or sql
+    prompt: Optional[str] = None
+    sql: Optional[str] = None
+    # Parameter rows for one templated statement, run with executemany
+    rows: Optional[List[Dict[str, Any]]] = None
+
+class BatchModificationRequest(BaseModel):
+    database_name: str
+    items: List[ModificationItem]
+
+class BatchItemResult(BaseModel):
+    index: int
+    sql_query: str
+    source: Optional[str] = None
+    rows: int
+    affected_rows: Optional[int] = None
+    success: bool
+    message: str
+
+class BatchModificationResponse(BaseModel):
+    results: List[BatchItemResult]
+    affected_rows: int
+    success: bool
+    message: str
+    # generation, execution and total wall time
+    timings_ms: Dict[str, float]
 
 class TableInfo(BaseModel):
     name: str
-    columns: List[Dict[str, str]]
+    columns: List[Dict[str, Any]]
+
+class TablePage(BaseModel):
+    table: str
+    columns: List[str]
+    results: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+T = TypeVar("T")
+
+def _ndjson_line(payload: Dict[str, Any]) -> bytes:
+    return (json.dumps(payload, default=str) + "\n").encode("utf-8")
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+def execution_timeout(requested: Optional[float]) -> float:
+    """Per-request SQL deadline: the client may shorten SQL_TIMEOUT_SECONDS, never extend it"""
+    if requested and requested > 0:
+        return min(requested, SQL_TIMEOUT_SECONDS)
+    return SQL_TIMEOUT_SECONDS
+
+def timeout_response(e: QueryTimeoutError, timeout: float, timings: Dict[str, float]) -> HTTPException:
+    timings = dict(timings, execution=_ms(e.elapsed))
+    logger.warning("⏱️ %s (%s)", e, timings)
+    return HTTPException(
+        status_code=504,
+        detail={"message": str(e), "timeout_seconds": timeout, "timings_ms": timings}
+    )
+
+def rejection_response(e: QueryRejectedError) -> HTTPException:
+    logger.warning("🛑 %s", e)
+    return HTTPException(status_code=422, detail={"message": str(e), "plan": e.plan})
+
+def executed_message(row_count: int, plan: Dict[str, Any]) -> str:
+    message = f"Query executed successfully. {row_count} rows returned."
+    limit = plan.get("limit")
+    if limit and row_count >= limit["applied"]:
+        message += f" Results capped at {limit['applied']} rows."
+    return message
+
+async def _wait_for_disconnect(http_request: Request):
+    # The body is already read, so the next message only arrives on disconnect (or response end)
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def cancel_on_disconnect(http_request: Request, work: Awaitable[T]) -> T:
+    """Run a handler's work, cancelling it (pending LLM call and running SQL) if the client goes away"""
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(http_request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    
+    if not task.done():
+        task.cancel()
+        logger.warning("🔌 Client disconnected; cancelled its request")
+        # Nobody is listening; 499 is the conventional "client closed request" status
+        return Response(status_code=499)
+    return task.result()
+
+def require_read_only(generated: GeneratedSQL):
+    """Reject writes before they reach a read-only connection"""
+    if not classify_statement(generated.statement).is_read:
+        raise ValueError("Only read-only statements run on the query path; use /execute for modifications")
+
+async def anext_or_none(iterator: AsyncIterator[T]) -> Optional[T]:
+    """Next item of an async iterator, or None when it is exhausted"""
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+async def stream_query_response(db: AsyncSession, generated: GeneratedSQL, timeout: float = None) -> StreamingResponse:
+    """Stream SELECT results as NDJSON: a header line, row batches, then an end line.
+    
+    The stream runs on its own session because it outlives the request handler.
+    The execution deadline covers the whole stream; if it passes mid-stream the
+    query is stopped and an error line ends the body.
+    """
+    require_read_only(generated)
+    timeout = timeout or SQL_TIMEOUT_SECONDS
+    started = time.monotonic()
+    deadline = started + timeout
+    stream_db = AsyncSession(bind=db.bind)
+    conn = None
+    try:
+        try:
+            conn = await asyncio.wait_for(stream_db.connection(), timeout)
+        except asyncio.TimeoutError:
+            raise QueryTimeoutError(f"Timed out after {timeout:g}s waiting for a database connection", time.monotonic() - started)
+        await set_deadline(conn, deadline)
+        # Streams exist for large results: checked for full scans but never capped
+        with stage("plan"):
+            statement, params, plan = await run_interruptible(
+                conn,
+                query_planner.plan(conn, generated.statement, generated.params, cap_rows=False)
+            )
+        columns, batches = await run_interruptible(
+            conn,
+            llm_service.stream_query_async(stream_db, statement, params)
+        )
+    except BaseException as e:
+        with anyio.CancelScope(shield=True):
+            if conn is not None:
+                await clear_deadline(conn)
+            await stream_db.close()
+        if isinstance(e, Exception) and time.monotonic() >= deadline and not isinstance(e, QueryTimeoutError):
+            raise QueryTimeoutError(timeout_message(timeout), time.monotonic() - started) from e
+        raise
+    
+    async def body() -> AsyncIterator[bytes]:
+        row_count = 0
+        try:
+            yield _ndjson_line({
+                "type": "header",
+                "sql_query": generated.sql_query,
+                "explanation": generated.explanation,
+                "source": generated.source,
+                "columns": columns,
+                "plan": plan
+            })
+            # A disconnect cancels the body; interrupt the fetch instead of waiting it out
+            while True:
+                batch = await run_interruptible(conn, anext_or_none(batches))
+                if batch is None:
+                    break
+                row_count += len(batch)
+                yield _ndjson_line({"type": "rows", "rows": batch})
+            yield _ndjson_line({
+                "type": "end",
+                "success": True,
+                "row_count": row_count,
+                "message": f"Query executed successfully. {row_count} rows returned."
+            })
+            logger.info("✅ Streamed %d rows", row_count, extra={"rows": row_count})
+        except Exception as e:
+            if time.monotonic() >= deadline:
+                count_error("timeout")
+                logger.warning("⏱️ Stream stopped after %d rows: %s", row_count, timeout_message(timeout))
+                yield _ndjson_line({
+                    "type": "error",
+                    "success": False,
+                    "timeout": True,
+                    "row_count": row_count,
+                    "message": f"Error: {timeout_message(timeout)}"
+                })
+            else:
+                count_error("error")
+                logger.error("❌ Error while streaming results: %s", e)
+                yield _ndjson_line({"type": "error", "success": False, "row_count": row_count, "message": f"Error: {str(e)}"})
+        finally:
+            # Shielded: on disconnect the server cancels this body, and the connection must still go back to the pool
+            with anyio.CancelScope(shield=True):
+                await batches.aclose()
+                await clear_deadline(conn)
+                await stream_db.close()
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+async def generate_for_request(db: AsyncSession, request: QueryRequest, entry: Dict[str, Any] = None) -> GeneratedSQL:
+    """Retrieve relevant tables and generate SQL, coalescing identical in-flight requests.
+    
+    Callers that already hold the schema catalog entry pass it as ``entry``.
+    """
+    if entry is None:
+        with stage("schema"):
+            entry = await schema_catalog.get_entry_async(db.bind)
+    
+    # Raw read-only SQL and trivial intents never reach the LLM
+    with stage("fast_path"):
+        fast = llm_service.try_fast_path(request.prompt, entry["tables"], db.bind.dialect)
+    if fast is not None:
+        SQL_SOURCES.inc(source=fast.source)
+        return fast
+    
+    async def generate() -> GeneratedSQL:
+        # Retrieve only the tables relevant to this prompt
+        with stage("prompt"):
+            table_schemas = llm_service.prune_tables(entry, request.prompt, request.database_name)
+            schema_str = llm_service.schema_prompt(entry, table_schemas)
+        return await llm_service.generate_sql_statement(
+            prompt=request.prompt,
+            table_schemas=table_schemas,
+            schema_str=schema_str
+        )
+    
+    # The execute flag does not change the generated SQL, so /query and /execute share flights
+    generated = await generation_flights.do((request.prompt, request.database_name), generate)
+    SQL_SOURCES.inc(source=generated.source)
+    return generated
+
+def write_queue_for(db: AsyncSession) -> WriteQueue:
+    """Writer queue of the database a session belongs to.
+    
+    All modifications to a database go through its one writer task, which
+    group-commits concurrent jobs.
+    """
+    handle = registry.for_bind(db.bind)
+    return (handle or default_database).write_queue
+
+def data_version(bind) -> Tuple[int, Optional[int]]:
+    """Changes whenever the database may have changed: our own writes, or (SQLite) anyone's commit"""
+    handle = registry.for_bind(bind)
+    return handle.write_queue.generation if handle else 0, data_versions.get(bind)
+
+async def run_select(db: AsyncSession, generated: GeneratedSQL, timeout: float = None) -> Tuple[List[str], List[Tuple[Any, ...]], Dict[str, Any]]:
+    """Plan and execute a SELECT under a deadline, coalescing identical in-flight statements.
+    
+    Returns columns, rows and the planner summary; the planner may have capped
+    the statement with a LIMIT. Results are cached until the data changes, and
+    a cache hit never touches the database.
+    """
+    require_read_only(generated)
+    timeout = timeout or SQL_TIMEOUT_SECONDS
+    params_key = tuple(sorted(generated.params.items()))
+    cache_key = (database_key(db.bind), normalize_sql(generated.statement), params_key)
+    # Read before executing: a result that races a write is stored under the old version
+    version = data_version(db.bind)
+    cached = result_cache.get(cache_key, version)
+    if cached is not None:
+        return cached
+    
+    async def plan_and_execute(shared_db: AsyncSession):
+        conn = await shared_db.connection()
+        with stage("plan"):
+            statement, params, plan = await query_planner.plan(conn, generated.statement, generated.params)
+        started = time.perf_counter()
+        with stage("sql"):
+            columns, rows = await llm_service.execute_query_rows_async(shared_db, statement, params)
+        workload_recorder.record(str(db.bind.url), statement, plan, (time.perf_counter() - started) * 1000, len(rows))
+        return columns, rows, plan
+    
+    async def shared_execution():
+        # Waiters come and go independently, so the shared work must not borrow any one request's session
+        shared_db = AsyncSession(bind=db.bind)
+        try:
+            return await run_with_deadline(shared_db, lambda: plan_and_execute(shared_db), timeout)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await shared_db.close()
+    
+    key = (str(db.bind.url), generated.statement, params_key, timeout)
+    result = await execution_flights.do(key, shared_execution)
+    result_cache.put(cache_key, version, result)
+    return result
+
+async def compact_query_response(db: AsyncSession, request: QueryRequest, generated: GeneratedSQL):
+    """Execute a SELECT and encode it in the requested compact result format"""
+    columns, rows, plan = await run_select(db, generated, execution_timeout(request.timeout_seconds))
+    count_rows(len(rows))
+    header = {
+        "sql_query": generated.sql_query,
+        "explanation": generated.explanation,
+        "source": generated.source,
+        "success": True,
+        "message": executed_message(len(rows), plan),
+        "plan": plan
+    }
+    logger.info("✅ Query executed: %d rows (%s)", len(rows), request.result_format, extra={"rows": len(rows)})
+    with stage("encode"):
+        return encode_results(header, columns, rows, request.result_format)
 
 @app.get("/")
 async def root():
@@ -52,64 +407,107 @@ async def root():
         "status": "running"
     }
 
+# Table browsing runs sync SQLAlchemy sessions; plain def handlers run in FastAPI's threadpool
 @app.get("/databases", response_model=List[str])
-async def get_databases(db: Session = Depends(get_db)):
+def get_databases(db: Session = Depends(get_read_db)):
     """Get list of all accessible databases/tables"""
     try:
         databases = llm_service.get_databases(db)
         return databases
     except Exception as e:
-        logger.error(f"Error fetching databases: {str(e)}")
+        logger.error("Error fetching databases: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/tables/{database}", response_model=List[TableInfo])
-async def get_tables(database: str, db: Session = Depends(get_db)):
+def get_tables(database: str, db: Session = Depends(get_read_db)):
     """Get all tables with their schema"""
     try:
         tables = llm_service.get_table_schemas(db, database)
         return tables
     except Exception as e:
-        logger.error(f"Error fetching tables: {str(e)}")
+        logger.error("Error fetching tables: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/tables/{name}/rows", response_model=TablePage)
+def get_table_rows(
+    name: str,
+    after: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    columns: Optional[str] = Query(None, description="Comma-separated column projection"),
+    db: Session = Depends(get_read_db)
+):
+    """Browse table rows page by page without going through the LLM"""
+    try:
+        projection = [col.strip() for col in columns.split(",") if col.strip()] if columns else None
+        return fetch_table_page(db, name, after=after, limit=limit, columns=projection)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Error browsing table %s: %s", name, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/query", response_model=QueryResponse)
-@traceable(
+@traced(
     name="🎯 User Query - End to End",
     run_type="chain",
     metadata={"endpoint": "/query", "type": "select"}
 )
-async def generate_query(request: QueryRequest, db: Session = Depends(get_db)):
+@timed_handler
+async def generate_query(request: QueryRequest, http_request: Request, db: AsyncSession = Depends(get_async_read_db)):
     """Generate SQL query from natural language prompt"""
+    return await cancel_on_disconnect(http_request, answer_query(request, db))
+
+async def answer_query(request: QueryRequest, db: AsyncSession):
+    timings: Dict[str, float] = {}
+    timeout = execution_timeout(request.timeout_seconds)
     try:
-        logger.info(f"📥 Received query request: {request.prompt}")
+        logger.info("📥 Received query request: %s", request.prompt)
         
-        # Get table schemas for context
-        table_schemas = llm_service.get_table_schemas(db, request.database_name)
-        
-        # Generate SQL query using LLM
-        sql_query, explanation = await llm_service.generate_sql(
-            prompt=request.prompt,
-            table_schemas=table_schemas
-        )
+        # Generate SQL query using LLM (or the SQL caches)
+        started = time.perf_counter()
+        generated = await generate_for_request(db, request)
+        timings["generation"] = _ms(time.perf_counter() - started)
         
         response = QueryResponse(
-            sql_query=sql_query,
-            explanation=explanation,
+            sql_query=generated.sql_query,
+            explanation=generated.explanation,
+            source=generated.source,
             success=True,
             message="SQL query generated successfully"
         )
         
         # Execute if requested
+        if request.execute and request.stream:
+            return await stream_query_response(db, generated, timeout)
+        if request.execute and request.result_format != "records":
+            return await compact_query_response(db, request, generated)
         if request.execute:
-            results = llm_service.execute_query(db, sql_query)
+            columns, rows, plan = await run_select(db, generated, timeout)
+            with stage("rows"):
+                results = [dict(zip(columns, row)) for row in rows]
+            count_rows(len(results))
             response.results = results
-            response.message = f"Query executed successfully. {len(results)} rows returned."
-            logger.info(f"✅ Query executed: {len(results)} rows")
+            response.plan = plan
+            response.message = executed_message(len(results), plan)
+            logger.info("✅ Query executed: %d rows", len(results), extra={"rows": len(results)})
         
         return response
         
+    except QueryTimeoutError as e:
+        count_error("timeout")
+        raise timeout_response(e, timeout, timings)
+    except QueryRejectedError as e:
+        count_error("rejected")
+        raise rejection_response(e)
+    except LLMOverloadedError as e:
+        count_error("overloaded")
+        logger.warning("⏳ Rejecting query request: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"❌ Error generating query: {str(e)}")
+        count_error("error")
+        logger.error("❌ Error generating query: %s", e)
         return QueryResponse(
             sql_query="",
             explanation="",
@@ -117,56 +515,176 @@ async def generate_query(request: QueryRequest, db: Session = Depends(get_db)):
             message=f"Error: {str(e)}"
         )
 
+@app.post("/query/batch")
+async def query_batch(request: BatchQueryRequest, read_db: AsyncSession = Depends(get_async_read_db)):
+    """Answer many prompts at once, streaming one NDJSON line per prompt as it completes.
+    
+    The schema is loaded and formatted once for the whole batch; generations
+    run concurrently up to QUERY_BATCH_CONCURRENCY and each SELECT runs on its
+    own reader connection.
+    """
+    logger.info("📥 Received batch query request: %d prompts", len(request.prompts))
+    entry = await schema_catalog.get_entry_async(read_db.bind)
+    bind = read_db.bind
+    generation_limit = asyncio.Semaphore(QUERY_BATCH_CONCURRENCY)
+    timeout = execution_timeout(request.timeout_seconds)
+    
+    async def answer(index: int, prompt: str) -> Dict[str, Any]:
+        item: Dict[str, Any] = {"type": "item", "index": index, "prompt": prompt}
+        timings: Dict[str, float] = {}
+        try:
+            started = time.perf_counter()
+            async with generation_limit:
+                generated = await generate_for_request(
+                    read_db,
+                    QueryRequest(prompt=prompt, database_name=request.database_name),
+                    entry
+                )
+            timings["generation"] = _ms(time.perf_counter() - started)
+            item.update(sql_query=generated.sql_query, explanation=generated.explanation, source=generated.source)
+            
+            if request.execute:
+                # Sessions are not safe to share between tasks: one reader session per item
+                async with AsyncSession(bind=bind) as item_db:
+                    columns, rows, plan = await run_select(item_db, generated, timeout)
+                count_rows(len(rows))
+                item["results"] = [dict(zip(columns, row)) for row in rows]
+                item["plan"] = plan
+                item["message"] = executed_message(len(rows), plan)
+            else:
+                item["message"] = "SQL query generated successfully"
+            item["success"] = True
+        except QueryTimeoutError as e:
+            count_error("timeout")
+            item.update(
+                success=False,
+                timed_out=True,
+                message=f"Error: {str(e)}",
+                timings_ms=dict(timings, execution=_ms(e.elapsed))
+            )
+        except QueryRejectedError as e:
+            count_error("rejected")
+            item.update(success=False, rejected=True, message=f"Error: {str(e)}", plan=e.plan)
+        except Exception as e:
+            count_error("error")
+            logger.error("❌ Batch item %d failed: %s", index, e)
+            item.update(success=False, message=f"Error: {str(e)}")
+        return item
+    
+    async def body() -> AsyncIterator[bytes]:
+        tasks = [asyncio.ensure_future(answer(index, prompt)) for index, prompt in enumerate(request.prompts)]
+        succeeded = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                succeeded += item["success"]
+                yield _ndjson_line(item)
+            yield _ndjson_line({
+                "type": "end",
+                "count": len(tasks),
+                "succeeded": succeeded,
+                "success": succeeded == len(tasks)
+            })
+            logger.info("✅ Batch answered: %d/%d prompts", succeeded, len(tasks))
+        finally:
+            # Client went away: stop generating for it
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
 @app.post("/execute")
-@traceable(
+@traced(
     name="✏️ Database Modification - End to End",
     run_type="chain",
     metadata={"endpoint": "/execute", "type": "modification"}
 )
-async def execute_query(request: QueryRequest, db: Session = Depends(get_db)):
+@timed_handler
+async def execute_query(request: QueryRequest, http_request: Request, read_db: AsyncSession = Depends(get_async_execute_db)):
     """Execute SQL query directly (for modifications)"""
+    return await cancel_on_disconnect(http_request, answer_execute(request, read_db))
+
+async def answer_execute(request: QueryRequest, read_db: AsyncSession):
+    timings: Dict[str, float] = {}
+    timeout = execution_timeout(request.timeout_seconds)
     try:
-        logger.info(f"📥 Received modification request: {request.prompt}")
-        
-        # Get table schemas for context
-        table_schemas = llm_service.get_table_schemas(db, request.database_name)
+        logger.info("📥 Received modification request: %s", request.prompt)
         
         # Generate SQL query
-        sql_query, explanation = await llm_service.generate_sql(
-            prompt=request.prompt,
-            table_schemas=table_schemas
-        )
+        started = time.perf_counter()
+        generated = await generate_for_request(read_db, request)
+        timings["generation"] = _ms(time.perf_counter() - started)
+        sql_query, explanation = generated.sql_query, generated.explanation
         
-        logger.info(f"Generated SQL for modification: {sql_query}")
+        logger.info("Generated SQL for modification: %s", sql_query)
         
-        # Check if query is a modification query
-        is_modification = any(keyword in sql_query.upper() for keyword in ['INSERT', 'UPDATE', 'DELETE'])
+        # Writes go to the single writer; reads stay on the read-only pool and never take the write lock
+        statement_info = classify_statement(generated.statement)
+        if statement_info.kind == "empty":
+            raise ValueError("No SQL statement to execute")
+        if statement_info.is_multi_statement:
+            # The drivers run one statement per call; send several modifications to /execute/batch
+            raise ValueError(
+                f"Only one SQL statement can run per request, got {len(statement_info.statement_types)} "
+                f"({', '.join(statement_info.statement_types)}); use /execute/batch for several modifications"
+            )
         
-        if is_modification:
-            # Execute modification
-            affected_rows = llm_service.execute_modification(db, sql_query)
-            logger.info(f"✅ Modification executed. Rows affected: {affected_rows}")
+        if statement_info.is_write:
+            # Execute modification; DDL and other non-DML statements run alone, outside a batch
+            with stage("write"):
+                affected_rows = await write_queue_for(read_db).submit(
+                    generated.statement,
+                    generated.params,
+                    exclusive=statement_info.kind != "write"
+                )
+            logger.info("✅ Modification executed. Rows affected: %s", affected_rows, extra={"rows": affected_rows})
+            
+            # Schema changed: drop the cached catalog so the next request reloads it
+            if statement_info.is_ddl:
+                schema_catalog.invalidate(read_db.bind)
+                query_planner.invalidate()
             
             return {
                 "sql_query": sql_query,
                 "explanation": explanation,
                 "affected_rows": affected_rows,
+                "source": generated.source,
                 "success": True,
                 "message": f"✅ Query executed successfully. {affected_rows} rows affected."
             }
+        elif request.stream:
+            return await stream_query_response(read_db, generated, timeout)
+        elif request.result_format != "records":
+            return await compact_query_response(read_db, request, generated)
         else:
             # Execute select query
-            results = llm_service.execute_query(db, sql_query)
+            columns, rows, plan = await run_select(read_db, generated, timeout)
+            with stage("rows"):
+                results = [dict(zip(columns, row)) for row in rows]
+            count_rows(len(results))
             return {
                 "sql_query": sql_query,
                 "explanation": explanation,
                 "results": results,
+                "source": generated.source,
+                "plan": plan,
                 "success": True,
-                "message": f"Query executed successfully. {len(results)} rows returned."
+                "message": executed_message(len(results), plan)
             }
             
+    except QueryTimeoutError as e:
+        count_error("timeout")
+        raise timeout_response(e, timeout, timings)
+    except QueryRejectedError as e:
+        count_error("rejected")
+        raise rejection_response(e)
+    except LLMOverloadedError as e:
+        count_error("overloaded")
+        logger.warning("⏳ Rejecting modification request: %s", e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"❌ Error executing query: {str(e)}")
+        count_error("error")
+        logger.error("❌ Error executing query: %s", e)
         return {
             "sql_query": "",
             "explanation": "",
@@ -174,6 +692,203 @@ async def execute_query(request: QueryRequest, db: Session = Depends(get_db)):
             "message": f"Error: {str(e)}"
         }
 
+def _template_key(item: ModificationItem) -> Tuple[Any, ...]:
+    row_keys = tuple(sorted(item.rows[0])) if item.rows else ()
+    return (item.prompt, item.sql, row_keys)
+
+async def prepare_modification(read_db: AsyncSession, database_name: str, item: ModificationItem) -> GeneratedSQL:
+    """SQL for one batch item: given directly, or generated with bind parameters for its rows"""
+    if (item.prompt is None) == (item.sql is None):
+        raise ValueError("Provide exactly one of prompt or sql")
+    if item.sql is not None:
+        return GeneratedSQL(item.sql, "SQL provided directly; executed as written", item.sql, {}, "sql")
+    
+    prompt = item.prompt
+    if item.rows:
+        placeholders = ", ".join(f":{key}" for key in sorted(item.rows[0]))
+        prompt += f"\nWrite a single statement using the named bind parameters {placeholders} for the row values."
+    return await generate_for_request(read_db, QueryRequest(prompt=prompt, database_name=database_name))
+
+def bind_rows(generated: GeneratedSQL, item: ModificationItem) -> Any:
+    """Params for one batch item: one dict, or a list of dicts for executemany"""
+    if not item.rows:
+        return generated.params
+    
+    names = set(text(generated.statement).compile().params) - set(generated.params)
+    for number, row in enumerate(item.rows):
+        missing = names - set(row)
+        if missing:
+            raise ValueError(f"Row {number} is missing parameters: {', '.join(sorted(missing))}")
+    return [{**generated.params, **row} for row in item.rows]
+
+@app.post("/execute/batch", response_model=BatchModificationResponse)
+@traced(
+    name="✏️ Batch Modification - End to End",
+    run_type="chain",
+    metadata={"endpoint": "/execute/batch", "type": "modification"}
+)
+async def execute_batch(request: BatchModificationRequest, read_db: AsyncSession = Depends(get_async_execute_db)):
+    """Run several modifications, or one templated statement over many rows, in a single transaction"""
+    started = time.perf_counter()
+    logger.info("📥 Received batch modification request: %d items", len(request.items))
+    
+    # Generate once per distinct template, however many items or rows share it
+    keys = [_template_key(item) for item in request.items]
+    distinct = {key: item for key, item in zip(keys, request.items)}
+    prepared = await asyncio.gather(
+        *[prepare_modification(read_db, request.database_name, item) for item in distinct.values()],
+        return_exceptions=True
+    )
+    templates = dict(zip(distinct, prepared))
+    generated_at = time.perf_counter()
+    
+    results: List[BatchItemResult] = []
+    runnable: List[Tuple[int, str, Any]] = []
+    has_ddl = False
+    for index, (key, item) in enumerate(zip(keys, request.items)):
+        generated = templates[key]
+        result = BatchItemResult(
+            index=index,
+            sql_query=getattr(generated, "sql_query", ""),
+            source=getattr(generated, "source", None),
+            rows=len(item.rows) if item.rows else 1,
+            success=False,
+            message=""
+        )
+        results.append(result)
+        try:
+            if isinstance(generated, Exception):
+                raise generated
+            statement_info = classify_statement(generated.statement)
+            if statement_info.kind not in ("write", "ddl") or statement_info.is_multi_statement:
+                raise ValueError("Each batch item must be a single INSERT, UPDATE, DELETE or DDL statement")
+            has_ddl = has_ddl or statement_info.is_ddl
+            runnable.append((index, generated.statement, bind_rows(generated, item)))
+        except Exception as e:
+            result.message = f"Error: {str(e)}"
+    
+    if runnable:
+        try:
+            outcomes = await write_queue_for(read_db).run(
+                lambda session: llm_service.execute_modification_batch_async(
+                    session,
+                    [(statement, params) for _, statement, params in runnable]
+                )
+            )
+        except Exception as e:
+            outcomes = [e] * len(runnable)
+        
+        for (index, _, _), outcome in zip(runnable, outcomes):
+            if isinstance(outcome, Exception):
+                results[index].message = str(outcome)
+            else:
+                results[index].affected_rows = outcome
+                results[index].success = True
+                results[index].message = f"{outcome} rows affected"
+        
+        if has_ddl:
+            schema_catalog.invalidate(read_db.bind)
+            query_planner.invalidate()
+    finished = time.perf_counter()
+    
+    succeeded = sum(1 for result in results if result.success)
+    affected = sum(result.affected_rows or 0 for result in results)
+    logger.info("✅ Batch executed: %d/%d items, %d rows affected", succeeded, len(results), affected)
+    return BatchModificationResponse(
+        results=results,
+        affected_rows=affected,
+        success=succeeded == len(results),
+        message=f"{succeeded}/{len(results)} items succeeded. {affected} rows affected.",
+        timings_ms={
+            "generation": round((generated_at - started) * 1000, 2),
+            "execution": round((finished - generated_at) * 1000, 2),
+            "total": round((finished - started) * 1000, 2)
+        }
+    )
+
+@app.get("/admin/indexes")
+async def recommend_indexes(
+    limit: int = Query(10, ge=1, le=100),
+    read_db: AsyncSession = Depends(get_async_read_db)
+):
+    """Index proposals from the recorded SELECT workload, largest estimated saving first"""
+    entry = await schema_catalog.get_entry_async(read_db.bind)
+    conn = await read_db.connection()
+    recommendations = await index_advisor.recommend(conn, entry, str(read_db.bind.url), limit)
+    return {"recommendations": recommendations, "workload": workload_recorder.stats()}
+
+@app.post("/admin/indexes")
+async def apply_indexes(request: ApplyIndexesRequest, read_db: AsyncSession = Depends(get_async_execute_db)):
+    """Create proposed indexes, by name, through the writer"""
+    entry = await schema_catalog.get_entry_async(read_db.bind)
+    conn = await read_db.connection()
+    proposals = {
+        proposal["name"]: proposal
+        for proposal in await index_advisor.recommend(conn, entry, str(read_db.bind.url), limit=1000)
+    }
+    # Release the reader before the writer takes its lock
+    queue = write_queue_for(read_db)
+    await read_db.close()
+    
+    unknown = [name for name in request.names if name not in proposals]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Not a current recommendation: {', '.join(unknown)}")
+    
+    applied = []
+    for name in request.names:
+        logger.info("🗂️ Creating index: %s", proposals[name]["ddl"])
+        await queue.submit(proposals[name]["ddl"], exclusive=True)
+        applied.append(proposals[name])
+    
+    schema_catalog.invalidate(read_db.bind)
+    query_planner.invalidate()
+    return {"applied": applied, "success": True, "message": f"{len(applied)} indexes created"}
+
+@app.get("/stats")
+async def get_stats():
+    """Cache, request-coalescing, planner, workload, engine registry (with write queues) and tracing counters"""
+    return {
+        "sql_cache": llm_service.sql_cache.stats(),
+        "sql_template_cache": llm_service.sql_template_cache.stats(),
+        "singleflight": {
+            "generation": generation_flights.stats(),
+            "execution": execution_flights.stats()
+        },
+        "query_planner": query_planner.stats(),
+        "workload": workload_recorder.stats(),
+        "result_cache": result_cache.stats(),
+        "databases": registry.stats(),
+        "tracing": tracer.stats()
+    }
+
+def cache_metrics():
+    """Cache and coalescing counters kept by the components themselves, read at scrape time"""
+    caches = {
+        "sql": llm_service.sql_cache.stats(),
+        "sql_template": llm_service.sql_template_cache.stats(),
+        "result": result_cache.stats()
+    }
+    flights = {"generation": generation_flights.stats(), "execution": execution_flights.stats()}
+    return [
+        ("querypilot_cache_hits_total", "counter", "Cache hits (memory and disk)",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("querypilot_cache_disk_hits_total", "counter", "Cache hits served from the persistent store (included in hits)",
+         [({"cache": name}, stats["disk_hits"]) for name, stats in caches.items() if "disk_hits" in stats]),
+        ("querypilot_cache_misses_total", "counter", "Cache misses",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("querypilot_singleflight_deduplicated_total", "counter", "Requests that joined an identical in-flight call",
+         [({"flight": name}, stats["deduplicated"]) for name, stats in flights.items()]),
+        ("querypilot_tracing_dropped_spans_total", "counter", "Spans dropped because the export buffer was full",
+         [({}, tracer.stats()["dropped"])])
+    ]
+
+metrics_registry.register_collector(cache_metrics)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: request and per-stage latency histograms, cache, row, token and error counters"""
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -0,0 +1,259 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; wide enough for a cached SELECT (sub-millisecond) and a slow LLM call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_INF = 'le="+Inf"'
+
+# A collector returns (name, type, help, [(labels, value)]) for values read at scrape time
+Collector = Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # Per label set: [per-bucket counts (last one is +Inf only), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, _INF)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {repr(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics rendered together in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Collector] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter("querypilot_requests_total", "HTTP requests by route, method and status", ("endpoint", "method", "status"))
+REQUEST_SECONDS = registry.histogram("querypilot_request_duration_seconds", "HTTP request latency, including streamed bodies", ("endpoint",))
+STAGE_SECONDS = registry.histogram("querypilot_stage_duration_seconds", "Time spent in each pipeline stage", ("endpoint", "stage"))
+SQL_SOURCES = registry.counter("querypilot_sql_source_total", "Where generated SQL came from: fast path, caches or the LLM", ("source",))
+ROWS_RETURNED = registry.counter("querypilot_rows_returned_total", "Rows returned by executed SELECTs", ("endpoint",))
+LLM_TOKENS = registry.counter("querypilot_llm_tokens_total", "Tokens reported by the chat model", ("kind",))
+ERRORS = registry.counter("querypilot_errors_total", "Failed requests by route and error type", ("endpoint", "type"))
+
+
+class RequestTimings:
+    """Stage durations of one HTTP request, summarized in its Server-Timing header"""
+
+    __slots__ = ("scope", "start", "stages", "handler_done")
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.scope = scope
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.handler_done: Optional[float] = None
+
+    @property
+    def endpoint(self) -> str:
+        # Route templates, not raw paths, keep label cardinality bounded
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+    def header(self, now: float) -> str:
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={(now - self.start) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_endpoint() -> str:
+    timings = _timings.get()
+    return timings.endpoint if timings is not None else "background"
+
+
+def record_stage(name: str, seconds: float):
+    timings = _timings.get()
+    if timings is None:
+        STAGE_SECONDS.observe(seconds, endpoint="background", stage=name)
+        return
+    timings.stages[name] = timings.stages.get(name, 0.0) + seconds
+    STAGE_SECONDS.observe(seconds, endpoint=timings.endpoint, stage=name)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as pipeline stage ``name`` of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def count_error(kind: str):
+    ERRORS.inc(endpoint=current_endpoint(), type=kind)
+
+
+def count_rows(rows: int):
+    ROWS_RETURNED.inc(rows, endpoint=current_endpoint())
+
+
+def timed_handler(func):
+    """Time an async endpoint as the "handler" stage.
+
+    The gap before it (request parsing, dependencies) is recorded as
+    "dependencies"; the gap after it, until the response starts, is
+    FastAPI's validation and JSON encoding and becomes "serialize".
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        timings = _timings.get()
+        if timings is not None:
+            record_stage("dependencies", started - timings.start)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            finished = time.perf_counter()
+            record_stage("handler", finished - started)
+            if timings is not None:
+                timings.handler_done = finished
+    return wrapper
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware: per-request timings, request metrics and the Server-Timing header.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware, so streamed
+    bodies and disconnect detection pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(scope)
+        token = _timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                if timings.handler_done is not None:
+                    record_stage("serialize", now - timings.handler_done)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header(now).encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            endpoint = timings.endpoint
+            REQUESTS.inc(endpoint=endpoint, method=scope["method"], status=status)
+            REQUEST_SECONDS.observe(time.perf_counter() - timings.start, endpoint=endpoint)
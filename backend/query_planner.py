@@ -0,0 +1,401 @@
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sql_classifier import classify_statement, scan_spans, unquote
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUERY_MAX_ROWS = int(os.getenv("QUERY_MAX_ROWS", "1000"))
+FULL_SCAN_MAX_ROWS = int(os.getenv("FULL_SCAN_MAX_ROWS", "100000"))
+FULL_SCAN_POLICY = os.getenv("FULL_SCAN_POLICY", "warn")  # "warn" or "reject"
+ROW_COUNT_TTL = float(os.getenv("ROW_COUNT_TTL", "300"))
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "512"))
+
+# Dialects that understand a trailing LIMIT n
+_LIMIT_DIALECTS = ("sqlite", "postgresql", "mysql", "mariadb")
+
+# SQLite: "SCAN orders", "SCAN TABLE orders AS o", "SEARCH users USING INDEX ..."; not
+# "SCAN CONSTANT ROW", "SCAN SUBQUERY 1" or "SCAN (subquery-1)", which read no table
+_SQLITE_STEP = re.compile(
+    r"^(?P<op>SCAN|SEARCH)\s+(?!CONSTANT ROW$|SUBQUERY \d|\()(?:TABLE\s+)?(?P<table>\S+)(?:\s+AS\s+\S+)?(?P<rest>.*)$"
+)
+# SQLite: "MATERIALIZE recent", "CO-ROUTINE recent" name a subquery or CTE, later scanned like a table
+_SQLITE_DERIVED = re.compile(r"^(?:MATERIALIZE|CO-ROUTINE)\s+(?P<name>\S+)")
+# PostgreSQL: "Seq Scan on orders o  (cost=0.00..35.50 rows=2550 width=4)"
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (?P<table>\S+)")
+_POSTGRES_ROWS = re.compile(r"rows=(?P<rows>\d+)")
+
+_LIMIT_LITERAL = re.compile(r"^\s*(?:(?P<offset>\d+)\s*,\s*)?(?P<count>\d+)\s*$")
+_LIMIT_PARAM = re.compile(r"^\s*:(?P<name>\w+)\s*$")
+
+# Aggregates that fold a whole ungrouped SELECT into one row
+_AGGREGATES = {"COUNT", "SUM", "AVG", "MIN", "MAX", "TOTAL", "GROUP_CONCAT", "STRING_AGG"}
+# Top-level keywords after which a SELECT may return more than one row
+_MULTI_ROW = {"GROUP", "UNION", "EXCEPT", "INTERSECT", "OVER", "WINDOW"}
+
+
+# Keywords that end a FROM item, so the word after a table is not an alias
+_NOT_ALIASES = {
+    "WHERE", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "EXCEPT", "INTERSECT", "WINDOW",
+    "OFFSET", "ON", "USING", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL",
+    "OUTER", "INDEXED", "NOT", "FOR"
+}
+
+
+class QueryRejectedError(Exception):
+    """Raised when the planner refuses to run a query; carries the plan summary"""
+
+    def __init__(self, message: str, plan: Dict[str, Any]):
+        super().__init__(message)
+        self.plan = plan
+
+
+def _top_level_words(spans) -> List[int]:
+    """Indexes of keywords outside parentheses, skipping :name bind parameters and qualified names"""
+    return [
+        index for index, span in enumerate(spans)
+        if span.depth == 0 and span.kind == "word"
+        and not (index and spans[index - 1].value in (":", "@", "."))
+    ]
+
+
+def _is_ungrouped_aggregate(spans, words: List[int], keywords: List[str]) -> bool:
+    """Whether the top-level SELECT aggregates without GROUP BY, so it returns exactly one row"""
+    if _MULTI_ROW.intersection(keywords) or "SELECT" not in keywords:
+        return False
+    start = keywords.index("SELECT")
+    end = keywords.index("FROM", start) if "FROM" in keywords[start:] else len(keywords)
+    return any(
+        keywords[position] in _AGGREGATES
+        and words[position] + 1 < len(spans) and spans[words[position] + 1].value == "("
+        for position in range(start + 1, end)
+    )
+
+
+def apply_row_limit(
+    statement: str,
+    params: Dict[str, Any],
+    max_rows: int
+) -> Tuple[str, Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Add or tighten the LIMIT of a single SELECT so it returns at most ``max_rows`` rows.
+
+    Returns (statement, params, limit) where limit describes the change
+    ({"original": n or None, "applied": max_rows}) or is None if the
+    statement was left alone.
+    """
+    info = classify_statement(statement)
+    if not info.is_read or info.is_multi_statement or info.statement_types[0] != "SELECT":
+        return statement, params, None
+
+    spans = scan_spans(statement)
+    words = _top_level_words(spans)
+    keywords = [spans[index].value.upper() for index in words]
+    if "FETCH" in keywords or "TOP" in keywords:
+        return statement, params, None
+    # COUNT(*) and friends return one row, a LIMIT would only be noise in the plan
+    if _is_ungrouped_aggregate(spans, words, keywords):
+        return statement, params, None
+
+    if "LIMIT" in keywords:
+        position = len(keywords) - 1 - keywords[::-1].index("LIMIT")
+        keyword = spans[words[position]]
+        following = words[position + 1:]
+        clause_end = spans[following[0]].start if following else len(statement.rstrip().rstrip(";"))
+        clause = statement[keyword.end:clause_end]
+
+        literal = _LIMIT_LITERAL.match(clause)
+        if literal:
+            original = int(literal.group("count"))
+            if original <= max_rows:
+                return statement, params, None
+            start = keyword.end + literal.start("count")
+            statement = statement[:start] + str(max_rows) + statement[keyword.end + literal.end("count"):]
+            return statement, params, {"original": original, "applied": max_rows}
+
+        param = _LIMIT_PARAM.match(clause)
+        value = params.get(param.group("name")) if param else None
+        if isinstance(value, int) and not isinstance(value, bool):
+            if value <= max_rows:
+                return statement, params, None
+            return statement, dict(params, **{param.group("name"): max_rows}), {"original": value, "applied": max_rows}
+
+        # An expression we cannot evaluate: the author bounded it, leave it be
+        return statement, params, None
+
+    # No LIMIT: it goes before OFFSET / FOR UPDATE, or after the last token
+    tail = [spans[index] for index in words if spans[index].value.upper() in ("OFFSET", "FOR")]
+    position = tail[0].start if tail else [span for span in spans if span.value != ";"][-1].end
+    rest = statement[position:].strip().rstrip(";").rstrip()
+    statement = f"{statement[:position].rstrip()} LIMIT {max_rows}" + (f" {rest}" if rest else "")
+    return statement, params, {"original": None, "applied": max_rows}
+
+
+def table_aliases(statement: str) -> Dict[str, str]:
+    """Map the names a query gives its FROM and JOIN tables (aliases and bare table names) to table names"""
+    spans = scan_spans(statement)
+    aliases: Dict[str, str] = {}
+    expecting = in_from = False
+    index = 0
+    while index < len(spans):
+        span = spans[index]
+        word = span.value.upper() if span.kind == "word" else None
+        if word in ("FROM", "JOIN"):
+            expecting = in_from = True
+        elif word in _NOT_ALIASES:
+            in_from = False
+        elif span.value == "," and in_from:
+            expecting = True
+        elif expecting and span.kind in ("word", "ident"):
+            expecting = False
+            # schema.table: keep the table part
+            while index + 2 < len(spans) and spans[index + 1].value == ".":
+                index += 2
+            table = unquote(spans[index].value)
+            aliases.setdefault(table, table)
+            following = spans[index + 1] if index + 1 < len(spans) else None
+            if following is not None and following.kind == "word" and following.value.upper() == "AS":
+                index += 1
+                following = spans[index + 1] if index + 1 < len(spans) else None
+            if following is not None and following.kind in ("word", "ident") and following.value.upper() not in _NOT_ALIASES:
+                aliases[unquote(following.value)] = table
+                index += 1
+        else:
+            expecting = False
+        index += 1
+    return aliases
+
+
+class QueryPlanner:
+    """Pre-execution check of SELECTs: plan, estimate cost, cap the result size.
+
+    The backend's EXPLAIN output is reduced to the tables it scans in full;
+    their sizes come from cached row counts (``ROW_COUNT_TTL``), so the
+    estimate costs one EXPLAIN round trip. Full scans of tables larger than
+    ``full_scan_max_rows`` are reported as warnings or, with the "reject"
+    policy, refused. Unbounded reads get a LIMIT. Plans are cached per
+    statement for the same TTL as the row counts.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = QUERY_MAX_ROWS,
+        full_scan_max_rows: int = FULL_SCAN_MAX_ROWS,
+        policy: str = FULL_SCAN_POLICY,
+        row_count_ttl: float = ROW_COUNT_TTL,
+        cache_size: int = PLAN_CACHE_SIZE
+    ):
+        if policy not in ("warn", "reject"):
+            raise ValueError(f"FULL_SCAN_POLICY must be 'warn' or 'reject', got {policy!r}")
+        self.max_rows = max_rows
+        self.full_scan_max_rows = full_scan_max_rows
+        self.policy = policy
+        self.row_count_ttl = row_count_ttl
+        self.cache_size = cache_size
+        self._row_counts: Dict[Tuple[str, str], Tuple[Optional[int], float]] = {}
+        self._plans: "OrderedDict[Tuple[Any, ...], Tuple[Tuple[str, Dict[str, Any], Dict[str, Any]], float]]" = OrderedDict()
+        self.planned = 0
+        self.cache_hits = 0
+        self.limited = 0
+        self.warned = 0
+        self.rejected = 0
+
+    async def _explain(self, conn: AsyncConnection, statement: str, params: Dict[str, Any]) -> Tuple[List[str], List[str], Optional[int]]:
+        """(plan steps, fully scanned tables, estimated output rows) from the backend's EXPLAIN"""
+        dialect = conn.dialect.name
+        if dialect == "sqlite":
+            rows = (await conn.execute(text(f"EXPLAIN QUERY PLAN {statement}"), params)).fetchall()
+            steps = [str(row[-1]) for row in rows]
+            derived = {match.group("name") for match in map(_SQLITE_DERIVED.match, steps) if match}
+            aliases = table_aliases(statement) if derived else {}
+            scans = []
+            for step in steps:
+                match = _SQLITE_STEP.match(step)
+                # A covering-index scan still reads every entry; SEARCH uses an index lookup
+                if match and match.group("op") == "SCAN":
+                    table = match.group("table")
+                    if table not in derived and aliases.get(table) not in derived:
+                        scans.append(table)
+            return steps, scans, None
+
+        result = await conn.execute(text(f"EXPLAIN {statement}"), params)
+        if dialect in ("mysql", "mariadb"):
+            rows = [dict(row._mapping) for row in result.fetchall()]
+            steps = [f"{row.get('select_type')} {row.get('table')} type={row.get('type')} rows={row.get('rows')}" for row in rows]
+            scans = [row["table"] for row in rows if row.get("type") == "ALL" and row.get("table")]
+            return steps, scans, None
+
+        steps = [str(row[0]) for row in result.fetchall()]
+        scans = [match.group("table") for step in steps for match in _POSTGRES_SCAN.finditer(step)]
+        estimate = _POSTGRES_ROWS.search(steps[0]) if steps else None
+        return steps, scans, int(estimate.group("rows")) if estimate else None
+
+    async def _sqlite_row_estimate(self, conn: AsyncConnection, table: str) -> Optional[int]:
+        """ANALYZE's row count from sqlite_stat1 if present, else max(rowid); never a COUNT(*) scan"""
+        # Plan steps can name CTEs and subqueries too; only real tables are estimated
+        found = await conn.execute(
+            text("SELECT sql, (SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1') FROM sqlite_master WHERE type = 'table' AND name = :table"),
+            {"table": table}
+        )
+        row = found.first()
+        if row is None:
+            return None
+        ddl, has_stats = row
+        if has_stats:
+            stat = (await conn.execute(
+                text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table ORDER BY idx IS NOT NULL LIMIT 1"),
+                {"table": table}
+            )).scalar()
+            if stat:
+                return int(stat.split()[0])
+        if ddl and "WITHOUT ROWID" in ddl.upper():
+            return None
+        # A rowid b-tree lookup: exact until rows are deleted, an overestimate after
+        quoted = table.replace('"', '""')
+        highest = (await conn.execute(text(f'SELECT max(rowid) FROM "{quoted}"'))).scalar()
+        return int(highest) if highest is not None else 0
+
+    async def _count_rows(self, conn: AsyncConnection, table: str) -> Optional[int]:
+        """Estimated row count of a table from statistics or cheap lookups, or None if unknown"""
+        dialect = conn.dialect.name
+        try:
+            if dialect == "postgresql":
+                query = "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"
+            elif dialect in ("mysql", "mariadb"):
+                query = "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = :table"
+            elif dialect == "sqlite":
+                return await self._sqlite_row_estimate(conn, table)
+            else:
+                return None
+            count = (await conn.execute(text(query), {"table": table})).scalar()
+            return int(count) if count is not None and count >= 0 else None
+        except Exception as e:
+            logger.warning("⚠️ Could not count rows of %s: %s", table, e)
+            return None
+
+    async def row_count(self, conn: AsyncConnection, table: str) -> Optional[int]:
+        """Cached row count of ``table``, refreshed after ``row_count_ttl`` seconds"""
+        key = (str(conn.engine.url), table)
+        cached = self._row_counts.get(key)
+        now = time.monotonic()
+        if cached is not None and now - cached[1] < self.row_count_ttl:
+            return cached[0]
+        count = await self._count_rows(conn, table)
+        self._row_counts[key] = (count, now)
+        return count
+
+    async def _plan(
+        self,
+        conn: AsyncConnection,
+        statement: str,
+        params: Dict[str, Any],
+        max_rows: Optional[int]
+    ) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        limit = None
+        if max_rows and conn.dialect.name in _LIMIT_DIALECTS:
+            statement, params, limit = apply_row_limit(statement, params, max_rows)
+
+        try:
+            steps, scans, estimated_rows = await self._explain(conn, statement, params)
+        except Exception as e:
+            # No plan is not a reason to refuse the query; execution reports real errors
+            logger.warning("⚠️ Could not plan query: %s", e)
+            return statement, params, {
+                "steps": [],
+                "full_scans": [],
+                "estimated_rows_scanned": None,
+                "limit": limit,
+                "warnings": [f"No plan available: {str(e)}"]
+            }
+
+        aliases = table_aliases(statement)
+        full_scans = []
+        for table in dict.fromkeys(aliases.get(scan, scan) for scan in scans):
+            rows = await self.row_count(conn, table)
+            full_scans.append({"table": table, "rows": rows})
+
+        warnings = [
+            f"Full scan of {scan['table']} ({scan['rows']:,} rows)"
+            for scan in full_scans
+            if scan["rows"] is not None and scan["rows"] > self.full_scan_max_rows
+        ]
+        known = [scan["rows"] for scan in full_scans if scan["rows"] is not None]
+        summary = {
+            "steps": steps,
+            "full_scans": full_scans,
+            "estimated_rows_scanned": sum(known) if known else None,
+            "limit": limit,
+            "warnings": warnings
+        }
+        if estimated_rows is not None:
+            summary["estimated_rows"] = estimated_rows
+        return statement, params, summary
+
+    async def plan(
+        self,
+        conn: AsyncConnection,
+        statement: str,
+        params: Dict[str, Any] = None,
+        cap_rows: bool = True
+    ) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        """Plan a read before it runs; returns (statement, params, plan summary).
+
+        With ``cap_rows`` the statement may come back with a LIMIT added or
+        tightened to ``max_rows``; streams pass False. Raises
+        QueryRejectedError for oversized full scans under the "reject" policy.
+        """
+        params = params or {}
+        max_rows = self.max_rows if cap_rows else None
+
+        key = (str(conn.engine.url), statement, tuple(sorted(params.items())), max_rows)
+        cached = self._plans.get(key)
+        now = time.monotonic()
+        if cached is not None and now - cached[1] < self.row_count_ttl:
+            self._plans.move_to_end(key)
+            self.cache_hits += 1
+            planned = cached[0]
+        else:
+            planned = await self._plan(conn, statement, params, max_rows)
+            self.planned += 1
+            self._plans[key] = (planned, now)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.cache_size:
+                self._plans.popitem(last=False)
+
+        statement, params, summary = planned
+        if summary["limit"] is not None:
+            self.limited += 1
+        if summary["warnings"]:
+            if self.policy == "reject":
+                self.rejected += 1
+                raise QueryRejectedError(
+                    f"Query rejected: {'; '.join(summary['warnings'])} exceeds the {self.full_scan_max_rows:,} row full-scan limit",
+                    summary
+                )
+            self.warned += 1
+            logger.warning("⚠️ Expensive query: %s", "; ".join(summary["warnings"]))
+        return statement, params, summary
+
+    def invalidate(self):
+        """Forget cached plans and row counts, e.g. after DDL or new indexes"""
+        self._plans.clear()
+        self._row_counts.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "planned": self.planned,
+            "cache_hits": self.cache_hits,
+            "limited": self.limited,
+            "warned": self.warned,
+            "rejected": self.rejected,
+            "max_rows": self.max_rows,
+            "full_scan_max_rows": self.full_scan_max_rows,
+            "policy": self.policy
+        }
+
+
+query_planner = QueryPlanner()
@@ -0,0 +1,202 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Hashable, Optional, Tuple
+
+import orjson
+
+from result_encoding import dumps
+from schema_catalog import sqlite_path
+
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_SPILL_BYTES = int(os.getenv("RESULT_CACHE_SPILL_BYTES", str(1024 * 1024)))
+RESULT_CACHE_DISK_BYTES = int(os.getenv("RESULT_CACHE_DISK_BYTES", "0"))  # 0 = never spill
+DATA_VERSION_CHECK_MS = float(os.getenv("DATA_VERSION_CHECK_MS", "100"))
+
+
+class DataVersions:
+    """Detect commits to file-backed SQLite databases from any connection or process.
+
+    ``PRAGMA data_version`` on a private read-only connection changes
+    whenever another connection commits. The value is re-read at most every
+    ``check_ms`` milliseconds, so lookups in between touch no database.
+    """
+
+    def __init__(self, check_ms: float = DATA_VERSION_CHECK_MS):
+        self.check = check_ms / 1000.0
+        self._lock = threading.Lock()
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._versions: Dict[str, Tuple[int, float]] = {}
+
+    def get(self, bind) -> Optional[int]:
+        """Current data version of ``bind``'s database, or None if it has no SQLite file"""
+        path = sqlite_path(bind)
+        if path is None:
+            return None
+        with self._lock:
+            cached = self._versions.get(path)
+            now = time.monotonic()
+            if cached is not None and now - cached[1] < self.check:
+                return cached[0]
+            conn = self._connections.get(path)
+            if conn is None:
+                conn = sqlite3.connect(f"{Path(path).as_uri()}?mode=ro", uri=True, check_same_thread=False)
+                self._connections[path] = conn
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            self._versions[path] = (version, now)
+            return version
+
+
+class _Entry:
+    __slots__ = ("version", "size", "value", "path")
+
+    def __init__(self, version: Hashable, size: int, value: Any = None, path: Optional[str] = None):
+        self.version = version
+        self.size = size
+        self.value = value
+        self.path = path
+
+
+class ResultCache:
+    """LRU cache of SELECT results, bounded in bytes and validated by data version.
+
+    Callers pass the version they read *before* executing, so a result that
+    raced a write is stored under the old version and never served. Entry
+    sizes are their JSON-encoded size. Entries above ``spill_bytes`` go to
+    files under ``spill_dir`` when a disk budget is set, otherwise they are
+    not cached.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        spill_bytes: int = RESULT_CACHE_SPILL_BYTES,
+        disk_bytes: int = RESULT_CACHE_DISK_BYTES,
+        spill_dir: Optional[str] = None
+    ):
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.disk_bytes = disk_bytes
+        self.spill_dir = spill_dir
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.memory_used = 0
+        self.disk_used = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.too_large = 0
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key)
+        if entry.path is None:
+            self.memory_used -= entry.size
+            return
+        self.disk_used -= entry.size
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.version != version:
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.path is None:
+                self.hits += 1
+                return entry.value
+            path = entry.path
+
+        try:
+            with open(path, "rb") as f:
+                value = orjson.loads(f.read())
+        except OSError:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            # Like SQLCache: hits counts every hit, disk_hits the ones read back from disk
+            self.hits += 1
+            self.disk_hits += 1
+        return value
+
+    def put(self, key: Hashable, version: Hashable, value: Any):
+        if self.max_bytes <= 0:
+            return
+        encoded = dumps(value)
+        size = len(encoded)
+        spill = size > self.spill_bytes
+        if spill and (self.disk_bytes <= 0 or size > self.disk_bytes):
+            with self._lock:
+                self.too_large += 1
+            return
+
+        path = None
+        if spill:
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix="querypilot-results-")
+            path = os.path.join(self.spill_dir, f"{uuid.uuid4().hex}.json")
+            with open(path, "wb") as f:
+                f.write(encoded)
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(version, size, None if spill else value, path)
+            if spill:
+                self.disk_used += size
+            else:
+                self.memory_used += size
+
+            # Evict least recently used entries of whichever budget overflowed
+            for candidate in list(self._entries):
+                if self.memory_used <= self.max_bytes and self.disk_used <= self.disk_bytes:
+                    break
+                on_disk = self._entries[candidate].path is not None
+                if (on_disk and self.disk_used > self.disk_bytes) or (not on_disk and self.memory_used > self.max_bytes):
+                    self._drop(candidate)
+                    self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self.memory_used,
+                "max_bytes": self.max_bytes,
+                "disk_bytes": self.disk_used,
+                "max_disk_bytes": self.disk_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "too_large": self.too_large,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+data_versions = DataVersions()
+result_cache = ResultCache(spill_dir=os.getenv("RESULT_CACHE_DIR") or None)
@@ -0,0 +1,76 @@
+from fastapi.responses import Response
+from decimal import Decimal
+from typing import List, Dict, Any, Sequence
+import orjson
+
+# records: list of row dicts (QueryResponse, the default)
+# rows:    column names once, then one array per row
+# columns: column names once, then one array per column, in the same order
+# arrow:   Apache Arrow IPC stream (requires pyarrow)
+RESULT_FORMATS = ("records", "rows", "columns", "arrow")
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _orjson_default(value: Any) -> Any:
+    """Fallback for values orjson does not know (Decimal, bytes, ...)"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def dumps(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=_orjson_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _encode_arrow(header: Dict[str, Any], columns: List[str], rows: Sequence[Sequence[Any]]) -> Response:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("result_format 'arrow' requires the optional pyarrow package")
+
+    column_data = list(zip(*rows)) if rows else [() for _ in columns]
+    # from_arrays keeps duplicate column names (SELECT a.id, b.id); header values are JSON
+    table = pa.Table.from_arrays(
+        [pa.array(list(values)) for values in column_data],
+        names=list(columns),
+        metadata={key: dumps(value) for key, value in header.items()}
+    )
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+
+def encode_results(
+    header: Dict[str, Any],
+    columns: List[str],
+    rows: Sequence[Sequence[Any]],
+    result_format: str
+) -> Response:
+    """Serialize a result set in a compact format, bypassing per-row Pydantic validation.
+
+    ``header`` carries the non-row fields (sql_query, explanation, success,
+    message); ``rows`` are positional tuples in ``columns`` order.
+    """
+    if result_format == "arrow":
+        return _encode_arrow(header, columns, rows)
+
+    payload = dict(header)
+    payload["format"] = result_format
+    payload["columns"] = columns
+    payload["row_count"] = len(rows)
+
+    if result_format == "rows":
+        payload["rows"] = [tuple(row) for row in rows]
+    elif result_format == "columns":
+        column_data = list(zip(*rows)) if rows else [() for _ in columns]
+        # A list, not a dict keyed by name: duplicate column names must not collapse
+        payload["data"] = column_data
+    else:
+        raise ValueError(f"Unsupported result_format '{result_format}'")
+
+    return Response(content=dumps(payload), media_type="application/json")
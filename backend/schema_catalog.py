@@ -0,0 +1,179 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine, Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from schema_index import SchemaIndex
+import asyncio
+import logging
+import os
+import threading
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from typing import List, Dict, Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+def sqlite_path(bind: Union[Engine, AsyncEngine]) -> Optional[str]:
+    """Absolute path of a file-backed SQLite database, None for other backends and :memory:"""
+    url = bind.url
+    if url.get_backend_name() != "sqlite" or not url.database:
+        return None
+    path = url.database
+    if path.startswith("file:"):
+        path = url2pathname(urlparse(path).path)
+    return os.path.abspath(path) if path != ":memory:" else None
+
+
+def database_key(bind: Union[Engine, AsyncEngine]) -> str:
+    """Identify the database, so writer and read-only engines share cache entries"""
+    path = sqlite_path(bind)
+    if path is not None:
+        return f"sqlite:{path}"
+    return str(bind.url)
+
+
+class SchemaCatalog:
+    """In-process cache of table metadata, shared by every request.
+
+    Each engine's schema is introspected once and reused until it changes,
+    together with the ``SchemaIndex`` used to pick tables for a prompt.
+    On SQLite the cached copy is checked against ``PRAGMA schema_version``
+    (a single integer read); other backends keep their copy until
+    ``invalidate`` is called, e.g. after DDL runs through ``/execute``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._async_lock = None
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _schema_version(conn: Connection) -> Optional[int]:
+        """Current schema version, or None if the backend does not expose one"""
+        if conn.dialect.name != "sqlite":
+            return None
+        return conn.execute(text("PRAGMA schema_version")).scalar()
+
+    @staticmethod
+    def _load(conn: Connection) -> List[Dict[str, Any]]:
+        """Introspect every table: columns, primary key and foreign keys"""
+        inspector = inspect(conn)
+        tables = []
+
+        for table_name in inspector.get_table_names():
+            primary_key = inspector.get_pk_constraint(table_name).get("constrained_columns") or []
+            columns = []
+            for column in inspector.get_columns(table_name):
+                columns.append({
+                    "name": column["name"],
+                    "type": str(column["type"]),
+                    "nullable": column["nullable"],
+                    "default": column.get("default"),
+                    "primary_key": column["name"] in primary_key
+                })
+
+            foreign_keys = [
+                {
+                    "columns": fk["constrained_columns"],
+                    "referred_table": fk["referred_table"],
+                    "referred_columns": fk["referred_columns"]
+                }
+                for fk in inspector.get_foreign_keys(table_name)
+                if fk.get("referred_table")
+            ]
+
+            tables.append({
+                "name": table_name,
+                "columns": columns,
+                "primary_key": primary_key,
+                "foreign_keys": foreign_keys
+            })
+
+        return tables
+
+    def _fresh(self, key: str, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None and not entry["stale"] and entry["version"] == version:
+            return entry
+        return None
+
+    def _store(self, key: str, version: Optional[int], tables: List[Dict[str, Any]]) -> Dict[str, Any]:
+        entry = {
+            "version": version,
+            "stale": False,
+            "tables": tables,
+            "by_name": {table["name"]: table for table in tables},
+            "index": SchemaIndex(tables)
+        }
+        self._entries[key] = entry
+        logger.info("📚 Schema catalog loaded: %d tables (version %s)", len(tables), version)
+        return entry
+
+    def _entry(self, bind: Engine) -> Dict[str, Any]:
+        key = database_key(bind)
+        with bind.connect() as conn:
+            version = self._schema_version(conn)
+            entry = self._fresh(key, version)
+            if entry is not None:
+                return entry
+
+            with self._lock:
+                # Another request may have reloaded while we waited for the lock
+                entry = self._fresh(key, version)
+                if entry is not None:
+                    return entry
+                return self._store(key, version, self._load(conn))
+
+    async def get_entry_async(self, bind: AsyncEngine) -> Dict[str, Any]:
+        """Catalog entry (tables, by_name, index) for an async engine.
+        
+        Uses an asyncio lock rather than the thread lock, which must never be
+        held across an await on the event loop thread.
+        """
+        key = database_key(bind)
+        async with bind.connect() as conn:
+            version = await conn.run_sync(self._schema_version)
+            entry = self._fresh(key, version)
+            if entry is not None:
+                return entry
+
+            if self._async_lock is None:
+                self._async_lock = asyncio.Lock()
+            async with self._async_lock:
+                entry = self._fresh(key, version)
+                if entry is not None:
+                    return entry
+                tables = await conn.run_sync(self._load)
+                with self._lock:
+                    return self._store(key, version, tables)
+
+    def get_entry(self, bind: Engine) -> Dict[str, Any]:
+        """Catalog entry (tables, by_name, index) for a sync engine"""
+        return self._entry(bind)
+
+    def get_tables(self, bind: Engine) -> List[Dict[str, Any]]:
+        """All tables with full column metadata, in inspector order"""
+        return self._entry(bind)["tables"]
+
+    def get_table(self, bind: Engine, table_name: str) -> Optional[Dict[str, Any]]:
+        """Metadata for one table, or None if it does not exist"""
+        return self._entry(bind)["by_name"].get(table_name)
+
+    def get_table_names(self, bind: Engine) -> List[str]:
+        return [table["name"] for table in self.get_tables(bind)]
+
+    def get_index(self, bind: Engine) -> SchemaIndex:
+        """Relevance index over the current schema, rebuilt whenever the schema reloads"""
+        return self._entry(bind)["index"]
+
+    def invalidate(self, bind: Union[Engine, AsyncEngine, None] = None):
+        """Force a reload on next access, for one engine or all of them"""
+        with self._lock:
+            if bind is None:
+                for entry in self._entries.values():
+                    entry["stale"] = True
+            elif database_key(bind) in self._entries:
+                self._entries[database_key(bind)]["stale"] = True
+
+
+schema_catalog = SchemaCatalog()
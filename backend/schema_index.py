@@ -0,0 +1,127 @@
+import re
+from collections import deque
+from typing import List, Dict, Any, Set, Tuple
+
+import numpy as np
+
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9]+")
+_CAMEL_PATTERN = re.compile(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])")
+
+# Field weights: a table's own name says more about it than any one column
+TABLE_NAME_WEIGHT = 3
+COLUMN_WEIGHT = 1
+NEIGHBOUR_WEIGHT = 1
+
+
+def stem(token: str) -> str:
+    """Crude plural folding so 'products' matches 'product' and 'categories' matches 'category'"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed word pieces, splitting snake_case and camelCase identifiers"""
+    tokens = []
+    for word in _WORD_PATTERN.findall(text or ""):
+        for piece in _CAMEL_PATTERN.findall(word) or [word]:
+            tokens.append(stem(piece.lower()))
+    return tokens
+
+
+class SchemaIndex:
+    """BM25 index over tables, built from table names, column names and foreign-key neighbours.
+
+    One document per table. Scores are computed with a dense NumPy weight
+    matrix (tables x vocabulary), so a query is a column gather and a sum.
+    """
+
+    def __init__(self, tables: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.table_names = [table["name"] for table in tables]
+        self.graph: Dict[str, Set[str]] = {name: set() for name in self.table_names}
+
+        for table in tables:
+            for fk in table.get("foreign_keys", []):
+                referred = fk["referred_table"]
+                if referred in self.graph and referred != table["name"]:
+                    self.graph[table["name"]].add(referred)
+                    self.graph[referred].add(table["name"])
+
+        documents = []
+        for table in tables:
+            terms = tokenize(table["name"]) * TABLE_NAME_WEIGHT
+            for col in table["columns"]:
+                terms += tokenize(col["name"]) * COLUMN_WEIGHT
+            for neighbour in sorted(self.graph[table["name"]]):
+                terms += tokenize(neighbour) * NEIGHBOUR_WEIGHT
+            documents.append(terms)
+
+        self.vocabulary: Dict[str, int] = {}
+        for terms in documents:
+            for term in terms:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+
+        tf = np.zeros((len(documents), max(len(self.vocabulary), 1)), dtype=np.float32)
+        for row, terms in enumerate(documents):
+            for term in terms:
+                tf[row, self.vocabulary[term]] += 1
+
+        doc_len = tf.sum(axis=1, keepdims=True)
+        avg_len = float(doc_len.mean()) if len(documents) else 0.0
+        df = (tf > 0).sum(axis=0)
+        n_docs = len(documents)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        norm = k1 * (1.0 - b + b * doc_len / max(avg_len, 1e-9))
+        self.weights = idf * (tf * (k1 + 1.0)) / (tf + norm)
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """Tables ranked by BM25 score against the query, best first; zero scores dropped"""
+        ids = [self.vocabulary[term] for term in tokenize(query) if term in self.vocabulary]
+        if not ids or not self.table_names:
+            return []
+
+        scores = self.weights[:, ids].sum(axis=1)
+        k = min(top_k, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.table_names[i], float(scores[i])) for i in ranked if scores[i] > 0]
+
+    def _shortest_path(self, sources: Set[str], target: str) -> List[str]:
+        """Tables on the shortest foreign-key path from any source to target (exclusive of the source)"""
+        parents = {source: None for source in sources}
+        queue = deque(sources)
+        while queue:
+            current = queue.popleft()
+            if current == target:
+                path = []
+                while parents[current] is not None:
+                    path.append(current)
+                    current = parents[current]
+                return path
+            for neighbour in self.graph.get(current, ()):
+                if neighbour not in parents:
+                    parents[neighbour] = current
+                    queue.append(neighbour)
+        return []
+
+    def join_tables(self, selected: List[str]) -> List[str]:
+        """Extra tables needed to connect the selected tables through foreign keys"""
+        selected = [name for name in selected if name in self.graph]
+        if len(selected) < 2:
+            return []
+
+        connected = {selected[0]}
+        extra = []
+        for target in selected[1:]:
+            if target in connected:
+                continue
+            for name in self._shortest_path(connected, target):
+                if name not in connected:
+                    connected.add(name)
+                    if name not in selected:
+                        extra.append(name)
+            connected.add(target)
+        return extra
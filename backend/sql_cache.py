@@ -0,0 +1,141 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+_QUOTED_PATTERN = re.compile(r"('[^']*'|\"[^\"]*\")")
+# Sentence punctuation only: comparison operators and quotes change the meaning
+_PUNCTUATION_PATTERN = re.compile(r"[.,!?;:]+(?=\s|$)")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold case, trailing punctuation and whitespace; quoted values are kept verbatim"""
+    parts = []
+    for i, part in enumerate(_QUOTED_PATTERN.split(prompt or "")):
+        if i % 2:
+            parts.append(part)
+        else:
+            part = _PUNCTUATION_PATTERN.sub(" ", part.lower())
+            parts.append(part)
+    return _WHITESPACE_PATTERN.sub(" ", "".join(parts)).strip()
+
+
+def schema_fingerprint(schema_str: str) -> str:
+    return hashlib.sha256(schema_str.encode("utf-8")).hexdigest()
+
+
+class SQLCache:
+    """Prompt -> (sql_query, explanation) cache in front of the LLM.
+
+    Keys combine the normalized prompt with a fingerprint of the formatted
+    schema sent to the model, so any schema change misses naturally. Entries
+    live in an in-memory LRU with a TTL; when ``path`` is set they are also
+    written to a SQLite file that survives restarts and is shared by workers.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 86400, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self._disk = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS nl_sql_cache ("
+                "cache_key TEXT PRIMARY KEY, sql_query TEXT NOT NULL, "
+                "explanation TEXT, created_at REAL NOT NULL)"
+            )
+            self._disk.commit()
+
+    @staticmethod
+    def make_key(prompt: str, schema_str: str) -> str:
+        material = normalize_prompt(prompt) + "\x00" + schema_fingerprint(schema_str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, entry: Tuple[float, str, str]):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._memory[key]
+                entry = None
+
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT created_at, sql_query, explanation FROM nl_sql_cache WHERE cache_key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[0]):
+                    self._remember(key, row)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[1], row[2]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, sql_query: str, explanation: str):
+        entry = (time.time(), sql_query, explanation)
+        with self._lock:
+            self._remember(key, entry)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO nl_sql_cache (cache_key, sql_query, explanation, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, sql_query, explanation, entry[0])
+                )
+                if self.ttl_seconds > 0:
+                    self._disk.execute(
+                        "DELETE FROM nl_sql_cache WHERE created_at < ?",
+                        (entry[0] - self.ttl_seconds,)
+                    )
+                self._disk.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM nl_sql_cache")
+                self._disk.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self._disk is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,173 @@
+import re
+from typing import Iterator, List, NamedTuple, Tuple
+
+# One alternative per token class; strings, quoted identifiers and comments are
+# consumed whole so keywords inside them are never seen
+_TOKEN_PATTERN = re.compile(
+    r"(?P<ws>\s+)"
+    r"|(?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))"
+    r"|(?P<string>'(?:[^']|'')*(?:'|\Z)|\$(?P<tag>\w*)\$.*?(?:\$(?P=tag)\$|\Z))"
+    r"|(?P<ident>\"(?:[^\"]|\"\")*(?:\"|\Z)|`(?:[^`]|``)*(?:`|\Z)|\[[^\]]*(?:\]|\Z))"
+    r"|(?P<word>[A-Za-z_][\w$]*)"
+    r"|(?P<other>.)",
+    re.DOTALL
+)
+
+DDL_KEYWORDS = {"CREATE", "ALTER", "DROP", "RENAME", "TRUNCATE"}
+WRITE_KEYWORDS = {"INSERT", "UPDATE", "DELETE", "REPLACE", "MERGE", "UPSERT"}
+READ_KEYWORDS = {"SELECT", "VALUES", "WITH", "EXPLAIN", "SHOW", "DESCRIBE"}
+
+# Most restrictive kind wins when a batch mixes statements
+_KIND_RANK = {"read": 0, "write": 1, "other": 2, "ddl": 3}
+
+
+class Token(NamedTuple):
+    kind: str
+    value: str
+
+
+class Span(NamedTuple):
+    kind: str
+    value: str
+    start: int
+    end: int
+    depth: int
+
+
+class StatementInfo(NamedTuple):
+    """Classification of a SQL string.
+
+    kind is "read", "write", "ddl", "other" (PRAGMA, ATTACH, BEGIN, GRANT, ...)
+    or "empty"; statement_types holds the leading keyword of each statement.
+    """
+    kind: str
+    statement_types: Tuple[str, ...]
+
+    @property
+    def is_read(self) -> bool:
+        return self.kind == "read"
+
+    @property
+    def is_write(self) -> bool:
+        return self.kind in ("write", "ddl", "other")
+
+    @property
+    def is_ddl(self) -> bool:
+        return self.kind == "ddl"
+
+    @property
+    def is_multi_statement(self) -> bool:
+        return len(self.statement_types) > 1
+
+
+def _scan(sql: str) -> Iterator[Token]:
+    for match in _TOKEN_PATTERN.finditer(sql or ""):
+        kind = match.lastgroup
+        yield Token("string" if kind == "tag" else kind, match.group(0))
+
+
+def strip_literals(sql: str) -> str:
+    """SQL with string literals and comments blanked out, for keyword and name scans"""
+    return "".join(" " if token.kind in ("string", "comment") else token.value for token in _scan(sql))
+
+
+def scan_spans(sql: str) -> List[Span]:
+    """Tokens other than whitespace and comments, with their offsets and parenthesis depth.
+    
+    For rewriting SQL in place: a span's offsets index into ``sql``.
+    """
+    spans: List[Span] = []
+    depth = 0
+    for match in _TOKEN_PATTERN.finditer(sql or ""):
+        kind = match.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+        value = match.group(0)
+        if value == ")":
+            depth = max(0, depth - 1)
+        spans.append(Span("string" if kind == "tag" else kind, value, match.start(), match.end(), depth))
+        if value == "(":
+            depth += 1
+    return spans
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL with comments dropped and whitespace collapsed, literals untouched, for cache keys"""
+    return " ".join(token.value for token in _scan(sql) if token.kind not in ("ws", "comment")).rstrip(" ;")
+
+
+def unquote(name: str) -> str:
+    """Identifier without its quotes ("x", `x` or [x])"""
+    if name[:1] in ('"', "`", "["):
+        return name[1:-1]
+    return name
+
+
+def split_statements(sql: str) -> List[List[Token]]:
+    """Split into statements on top-level semicolons; empty statements are dropped"""
+    statements: List[List[Token]] = [[]]
+    for token in _scan(sql):
+        if token.kind in ("ws", "comment", "string"):
+            continue
+        if token.kind == "other" and token.value == ";":
+            statements.append([])
+        else:
+            statements[-1].append(token)
+    return [statement for statement in statements if statement]
+
+
+def _main_keyword(tokens: List[Token]) -> str:
+    """Keyword of the statement a WITH clause introduces (CTE bodies sit inside parentheses)"""
+    depth = 0
+    for token in tokens[1:]:
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+        elif depth == 0 and token.kind == "word":
+            word = token.value.upper()
+            if word in WRITE_KEYWORDS or word in ("SELECT", "VALUES"):
+                return word
+    return "SELECT"
+
+
+def _classify_one(tokens: List[Token]) -> Tuple[str, str]:
+    """(kind, leading keyword) for one statement's tokens"""
+    first = tokens[0].value.upper() if tokens[0].kind == "word" else tokens[0].value
+    if first in DDL_KEYWORDS:
+        return "ddl", first
+    if first in WRITE_KEYWORDS:
+        return "write", first
+    if first not in READ_KEYWORDS:
+        return "other", first
+
+    statement_type = _main_keyword(tokens) if first == "WITH" else first
+    if statement_type in WRITE_KEYWORDS:
+        return "write", statement_type
+
+    # Reads can still hide writes: data-modifying CTEs, EXPLAIN ANALYZE DELETE,
+    # SELECT ... INTO new_table. replace(...) is a function, not the statement.
+    for index, token in enumerate(tokens):
+        if token.kind != "word":
+            continue
+        word = token.value.upper()
+        following = tokens[index + 1].value if index + 1 < len(tokens) else ""
+        if word in DDL_KEYWORDS or (word == "INTO" and statement_type == "SELECT"):
+            return "ddl", statement_type
+        if word in WRITE_KEYWORDS and following != "(":
+            return "write", statement_type
+    return "read", statement_type
+
+
+def classify_statement(sql: str) -> StatementInfo:
+    """Classify SQL as read, write, ddl or other, ignoring literals and comments.
+
+    Multi-statement input takes the most restrictive kind of its statements.
+    """
+    statements = split_statements(sql)
+    if not statements:
+        return StatementInfo("empty", ())
+
+    kinds, types = zip(*(_classify_one(tokens) for tokens in statements))
+    kind = max(kinds, key=_KIND_RANK.__getitem__)
+    return StatementInfo(kind, tuple(types))
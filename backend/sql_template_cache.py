@@ -0,0 +1,259 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Set
+
+from sql_cache import normalize_prompt, schema_fingerprint
+
+# Literal values a user types into a prompt: quoted strings, numbers, emails,
+# and identifier-like entity values such as john_doe or sku42
+_PROMPT_LITERAL_PATTERN = re.compile(
+    r"'(?P<sq>[^']*)'"
+    r"|\"(?P<dq>[^\"]*)\""
+    r"|(?P<email>\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b)"
+    r"|(?<![\w.])(?P<num>-?\d+(?:\.\d+)?)(?![\w.])"
+    r"|\b(?P<entity>[A-Za-z]+_[A-Za-z0-9_]+|[A-Za-z]+\d+[A-Za-z0-9]*)\b"
+)
+
+# Literals in generated SQL: quoted strings ('' escapes) and bare numbers
+_SQL_LITERAL_PATTERN = re.compile(
+    r"'(?P<str>(?:[^']|'')*)'"
+    r"|(?<![\w.:])(?P<num>-?\d+(?:\.\d+)?)(?![\w.])"
+)
+
+
+def extract_literals(prompt: str, identifiers: Set[str]) -> Tuple[str, List[Tuple[str, str]]]:
+    """Split a prompt into a structural skeleton and its literal values.
+
+    Returns (skeleton, [(kind, value), ...]) where kind is "num" or "str".
+    Words that name a table or column are structure, not values.
+    """
+    values: List[Tuple[str, str]] = []
+
+    def replace(match: re.Match) -> str:
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "entity" and value.lower() in identifiers:
+            return value
+        if kind == "num":
+            values.append(("num", value))
+            return " <num> "
+        values.append(("str", value))
+        return " <str> "
+
+    skeleton = _PROMPT_LITERAL_PATTERN.sub(replace, prompt or "")
+    return normalize_prompt(skeleton), values
+
+
+def _to_number(value: str):
+    return float(value) if "." in value else int(value)
+
+
+def _apply_case(value: str, case: str) -> str:
+    if case == "lower":
+        return value.lower()
+    if case == "upper":
+        return value.upper()
+    return value
+
+
+def _quote(value: Any) -> str:
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def render_sql(statement: str, params: Dict[str, Any]) -> str:
+    """Inline bound parameters as SQL literals, for display only"""
+    return re.sub(
+        r"(?<![:\w]):(p\d+)\b",
+        lambda m: _quote(params[m.group(1)]) if m.group(1) in params else m.group(0),
+        statement
+    )
+
+
+def templatize(sql_query: str, values: List[Tuple[str, str]]) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+    """Replace each prompt literal in the SQL with a bind parameter.
+
+    Every value must appear in exactly one SQL literal (possibly wrapped, as in
+    '%value%', or case-folded); anything ambiguous returns None and the query
+    is simply not templated.
+    """
+    if not values or len({value.lower() for _, value in values}) != len(values):
+        return None
+
+    slots: List[Dict[str, Any]] = []
+    found = [0] * len(values)
+    ambiguous = False
+
+    def match_string(content: str) -> Optional[Dict[str, Any]]:
+        matches = []
+        for index, (_, value) in enumerate(values):
+            for case, candidate in (("as_is", value), ("lower", value.lower()), ("upper", value.upper())):
+                pos = content.find(candidate)
+                if pos < 0:
+                    continue
+                before = content[pos - 1] if pos > 0 else ""
+                after = content[pos + len(candidate)] if pos + len(candidate) < len(content) else ""
+                if before.isalnum() or after.isalnum():
+                    continue
+                matches.append({
+                    "index": index,
+                    "kind": "str",
+                    "case": case,
+                    "prefix": content[:pos],
+                    "suffix": content[pos + len(candidate):]
+                })
+                break
+        if len(matches) > 1:
+            # 'john_doe@x.com' contains john_doe too; the value spanning the whole literal wins
+            exact = [m for m in matches if not m["prefix"] and not m["suffix"]]
+            if len(exact) != 1:
+                raise ValueError("literal matches several prompt values")
+            return exact[0]
+        return matches[0] if matches else None
+
+    def replace(match: re.Match) -> str:
+        nonlocal ambiguous
+        if match.group("num") is not None:
+            number = match.group("num")
+            for index, (kind, value) in enumerate(values):
+                if kind == "num" and _to_number(number) == _to_number(value):
+                    slot = {"index": index, "kind": "num"}
+                    break
+            else:
+                return match.group(0)
+        else:
+            try:
+                slot = match_string(match.group("str").replace("''", "'"))
+            except ValueError:
+                ambiguous = True
+                return match.group(0)
+            if slot is None:
+                return match.group(0)
+
+        found[slot["index"]] += 1
+        slot["name"] = f"p{len(slots)}"
+        slots.append(slot)
+        return f":{slot['name']}"
+
+    template = _SQL_LITERAL_PATTERN.sub(replace, sql_query)
+    if ambiguous or any(count != 1 for count in found):
+        return None
+    return template, slots
+
+
+def bind(slots: List[Dict[str, Any]], values: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Bind parameter values for a template from a new prompt's literals"""
+    params = {}
+    for slot in slots:
+        kind, value = values[slot["index"]]
+        if slot["kind"] == "num":
+            params[slot["name"]] = _to_number(value)
+        else:
+            params[slot["name"]] = slot["prefix"] + _apply_case(value, slot["case"]) + slot["suffix"]
+    return params
+
+
+class SQLTemplateCache:
+    """Cache of parameterized SQL keyed by prompt structure.
+
+    "products with price > 100" and "products with price > 250" share the
+    skeleton "products with price > <num>", so the second is answered by
+    binding 250 into the template generated for the first.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.rejected = 0
+
+    @staticmethod
+    def identifiers(table_schemas: List[Dict[str, Any]]) -> Set[str]:
+        names = set()
+        for table in table_schemas:
+            names.add(table["name"].lower())
+            names.update(col["name"].lower() for col in table["columns"])
+        return names
+
+    @staticmethod
+    def _key(skeleton: str, kinds: List[str], schema_str: str) -> str:
+        material = skeleton + "\x00" + ",".join(kinds) + "\x00" + schema_fingerprint(schema_str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def lookup(
+        self,
+        prompt: str,
+        table_schemas: List[Dict[str, Any]],
+        schema_str: str
+    ) -> Tuple[Optional[Tuple[str, str, Dict[str, Any]]], str, List[Tuple[str, str]]]:
+        """Return ((statement, explanation, params) or None, key, values) for a prompt"""
+        skeleton, values = extract_literals(prompt, self.identifiers(table_schemas))
+        if not values:
+            return None, "", values
+
+        key = self._key(skeleton, [kind for kind, _ in values], schema_str)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, key, values
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        params = bind(entry["slots"], values)
+        explanation = entry["explanation"]
+        for index, (_, value) in enumerate(values):
+            explanation = explanation.replace(f"\x00{index}\x00", value)
+        return (entry["statement"], explanation, params), key, values
+
+    def store(self, key: str, values: List[Tuple[str, str]], sql_query: str, explanation: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Templatize freshly generated SQL; returns (statement, params) or None if it cannot be"""
+        if not key:
+            return None
+        templated = templatize(sql_query, values)
+        if templated is None:
+            self.rejected += 1
+            return None
+
+        statement, slots = templated
+        explanation_template = explanation
+        for index, (_, value) in enumerate(values):
+            explanation_template = re.sub(
+                rf"(?<![\w.]){re.escape(value)}(?![\w.])",
+                f"\x00{index}\x00",
+                explanation_template
+            )
+
+        with self._lock:
+            self._entries[key] = {
+                "statement": statement,
+                "explanation": explanation_template,
+                "slots": slots
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stored += 1
+        return statement, bind(slots, values)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stored": self.stored,
+            "rejected": self.rejected,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,64 @@
+import pytest
+
+from fast_path import classify
+
+TABLES = [
+    {"name": "products", "columns": [{"name": "id"}, {"name": "price"}, {"name": "created_at"}]},
+    {"name": "categories", "columns": [{"name": "id"}, {"name": "name"}]},
+]
+
+
+def quote(name):
+    return f'"{name}"'
+
+
+def fast_path(prompt):
+    return classify(prompt, TABLES, quote)
+
+
+@pytest.mark.parametrize("prompt, sql", [
+    ("SELECT * FROM products WHERE price > 10;", "SELECT * FROM products WHERE price > 10"),
+    ("with cheap as (select * from products where price < 5) select * from cheap", None),
+    ("SELECT p.id FROM main.products p JOIN categories c ON c.id = p.id", None),
+    ("SELECT * FROM products WHERE name = 'FROM orders'", None),
+])
+def test_read_only_sql_over_known_tables_runs_as_written(prompt, sql):
+    assert fast_path(prompt) == (sql or prompt, "SQL provided directly; executed as written", "fast_path_sql")
+
+
+@pytest.mark.parametrize("prompt", [
+    "SELECT * FROM orders",
+    "SELECT * FROM products JOIN orders ON orders.id = products.id",
+    "DELETE FROM products",
+    "SELECT 1; DROP TABLE products",
+    "WITH x AS (SELECT 1) DELETE FROM products",
+])
+def test_writes_and_unknown_tables_go_to_the_llm(prompt):
+    assert fast_path(prompt) is None
+
+
+@pytest.mark.parametrize("prompt, sql", [
+    ("show all products", 'SELECT * FROM "products"'),
+    ("List the categories.", 'SELECT * FROM "categories"'),
+    ("how many products are there?", 'SELECT COUNT(*) AS count FROM "products"'),
+    ("count product", 'SELECT COUNT(*) AS count FROM "products"'),
+    ("top 5 products by price", 'SELECT * FROM "products" ORDER BY "price" DESC LIMIT 5'),
+    ("first 3 categories", 'SELECT * FROM "categories" LIMIT 3'),
+    ("bottom 2 products sorted by prices", 'SELECT * FROM "products" ORDER BY "price" ASC LIMIT 2'),
+])
+def test_trivial_intents_match_a_template(prompt, sql):
+    matched = fast_path(prompt)
+    assert matched is not None and matched[0] == sql and matched[2] == "fast_path_template"
+
+
+@pytest.mark.parametrize("prompt", [
+    "show all orders",
+    "top 5 products by rating",
+    "top 0 products",
+    "top 5000 products",
+    "last 5 products",
+    "show all products over 100 dollars",
+    "which products sold best last month",
+])
+def test_other_prompts_go_to_the_llm(prompt):
+    assert fast_path(prompt) is None
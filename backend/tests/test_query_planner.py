@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from query_planner import QueryPlanner
+
+
+async def explain(sql):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, dept TEXT)")
+            await conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER)")
+            return await QueryPlanner()._explain(conn, sql, {})
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.parametrize("sql, scans", [
+    ("SELECT * FROM users", ["users"]),
+    ("SELECT * FROM users u JOIN orders o ON o.id = u.id", ["u"]),
+    ("SELECT * FROM users WHERE id = 1", []),
+    ("SELECT 1", []),
+    ("SELECT (SELECT MAX(id) FROM users)", []),
+    ("SELECT * FROM (SELECT dept FROM users GROUP BY dept)", ["users"]),
+    ("SELECT * FROM (SELECT id FROM users LIMIT 2) s JOIN orders", ["users", "orders"]),
+    ("WITH x AS MATERIALIZED (SELECT id FROM users) SELECT * FROM x JOIN x y", ["users"]),
+])
+def test_reports_full_scans_of_tables_only(sql, scans):
+    steps, full_scans, _ = asyncio.run(explain(sql))
+    assert full_scans == scans, steps
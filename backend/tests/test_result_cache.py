@@ -0,0 +1,70 @@
+import sqlite3
+
+from sqlalchemy import create_engine
+
+from result_cache import DataVersions, ResultCache
+
+RESULT = (["id"], [(1,), (2,)], {"steps": []})
+
+
+def test_a_result_is_served_only_under_the_version_it_was_stored_with():
+    cache = ResultCache()
+    cache.put("q", (0, 7), RESULT)
+    assert cache.get("q", (0, 7)) == RESULT
+    # Our own write bumped the write generation
+    assert cache.get("q", (1, 7)) is None
+    # The stale entry is gone, even for the old version
+    assert cache.get("q", (0, 7)) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stale"], stats["entries"]) == (1, 2, 1, 0)
+
+
+def test_a_commit_from_another_connection_invalidates_results(tmp_path):
+    path = tmp_path / "versions.db"
+    other = sqlite3.connect(path)
+    other.execute("CREATE TABLE users (id INTEGER PRIMARY KEY)")
+    other.commit()
+    engine = create_engine(f"sqlite:///{path}")
+    versions = DataVersions(check_ms=0)
+    cache = ResultCache()
+
+    before = (0, versions.get(engine))
+    cache.put("q", before, RESULT)
+    assert versions.get(engine) == before[1]
+    assert cache.get("q", (0, versions.get(engine))) == RESULT
+
+    other.execute("INSERT INTO users (id) VALUES (1)")
+    other.commit()
+    after = (0, versions.get(engine))
+    assert after != before
+    assert cache.get("q", after) is None
+    assert cache.stats()["stale"] == 1
+    other.close()
+
+
+def test_data_version_is_re_read_at_most_every_check_interval(tmp_path):
+    path = tmp_path / "versions.db"
+    other = sqlite3.connect(path)
+    other.execute("CREATE TABLE users (id INTEGER PRIMARY KEY)")
+    other.commit()
+    engine = create_engine(f"sqlite:///{path}")
+    versions = DataVersions(check_ms=60_000)
+
+    before = versions.get(engine)
+    other.execute("INSERT INTO users (id) VALUES (1)")
+    other.commit()
+    assert versions.get(engine) == before
+    other.close()
+
+
+def test_other_backends_have_no_data_version():
+    assert DataVersions().get(create_engine("sqlite://")) is None
+
+
+def test_spilled_results_count_as_hits(tmp_path):
+    cache = ResultCache(spill_bytes=10, disk_bytes=1024 * 1024, spill_dir=str(tmp_path))
+    cache.put("q", (0, 1), RESULT)
+    assert cache.get("q", (0, 1)) == [["id"], [[1], [2]], {"steps": []}]
+    stats = cache.stats()
+    assert (stats["hits"], stats["disk_hits"], stats["memory_bytes"]) == (1, 1, 0)
+    assert stats["disk_bytes"] > 0
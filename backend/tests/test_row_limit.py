@@ -0,0 +1,114 @@
+import pytest
+
+from query_planner import apply_row_limit
+
+MAX_ROWS = 100
+
+
+def limited(sql, params=None):
+    return apply_row_limit(sql, params or {}, MAX_ROWS)
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM users", "SELECT * FROM users LIMIT 100"),
+    ("SELECT * FROM users;", "SELECT * FROM users LIMIT 100"),
+    ("SELECT * FROM users ORDER BY id", "SELECT * FROM users ORDER BY id LIMIT 100"),
+    ("SELECT * FROM users -- everyone", "SELECT * FROM users LIMIT 100 -- everyone"),
+    ("SELECT * FROM users OFFSET 20", "SELECT * FROM users LIMIT 100 OFFSET 20"),
+    ("SELECT * FROM users FOR SHARE", "SELECT * FROM users LIMIT 100 FOR SHARE"),
+    ("SELECT * FROM (SELECT * FROM users LIMIT 5000) u", "SELECT * FROM (SELECT * FROM users LIMIT 5000) u LIMIT 100"),
+    ("SELECT * FROM users WHERE note = 'LIMIT 5'", "SELECT * FROM users WHERE note = 'LIMIT 5' LIMIT 100"),
+    ("-- LIMIT 5\nSELECT * FROM users", "-- LIMIT 5\nSELECT * FROM users LIMIT 100"),
+])
+def test_adds_a_limit(sql, expected):
+    statement, params, limit = limited(sql)
+    assert statement == expected
+    assert limit == {"original": None, "applied": MAX_ROWS}
+
+
+@pytest.mark.parametrize("sql, expected, original", [
+    ("SELECT * FROM users LIMIT 5000", "SELECT * FROM users LIMIT 100", 5000),
+    ("SELECT * FROM users LIMIT 5000;", "SELECT * FROM users LIMIT 100;", 5000),
+    ("SELECT * FROM users LIMIT 5000 OFFSET 20", "SELECT * FROM users LIMIT 100 OFFSET 20", 5000),
+    ("SELECT * FROM users LIMIT 20, 5000", "SELECT * FROM users LIMIT 20, 100", 5000),
+    ("select * from users limit 101", "select * from users limit 100", 101),
+])
+def test_tightens_a_literal_limit(sql, expected, original):
+    statement, params, limit = limited(sql)
+    assert statement == expected
+    assert limit == {"original": original, "applied": MAX_ROWS}
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM users LIMIT 10",
+    "SELECT * FROM users LIMIT 100",
+    "SELECT * FROM users LIMIT 5000, 10",
+    "SELECT * FROM users LIMIT 10 OFFSET 5000",
+])
+def test_keeps_a_limit_within_bounds(sql):
+    assert limited(sql) == (sql, {}, None)
+
+
+def test_tightens_a_bound_limit_parameter():
+    statement, params, limit = limited("SELECT * FROM users LIMIT :n", {"n": 5000, "name": "a"})
+    assert statement == "SELECT * FROM users LIMIT :n"
+    assert params == {"n": MAX_ROWS, "name": "a"}
+    assert limit == {"original": 5000, "applied": MAX_ROWS}
+
+
+def test_keeps_a_bound_limit_within_bounds():
+    params = {"n": 10}
+    assert limited("SELECT * FROM users LIMIT :n", params) == ("SELECT * FROM users LIMIT :n", params, None)
+
+
+@pytest.mark.parametrize("sql, params", [
+    ("SELECT * FROM users LIMIT 10 + 5000", {}),
+    ("SELECT * FROM users LIMIT :n", {}),
+    ("SELECT * FROM users LIMIT :n", {"n": "5000"}),
+])
+def test_leaves_limits_it_cannot_evaluate(sql, params):
+    assert limited(sql, params) == (sql, params, None)
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM users",
+    "INSERT INTO users (name) VALUES ('a')",
+    "WITH old AS (SELECT 1) DELETE FROM users",
+    "SELECT * INTO backup FROM users",
+    "SELECT 1; SELECT 2",
+    "VALUES (1), (2)",
+    "EXPLAIN SELECT * FROM users",
+    "SELECT TOP 5 * FROM users",
+    "SELECT * FROM users FETCH FIRST 5000 ROWS ONLY",
+])
+def test_leaves_other_statements_alone(sql):
+    assert limited(sql) == (sql, {}, None)
+
+
+def test_limits_the_statement_a_cte_introduces():
+    statement, _, limit = limited("WITH x AS (SELECT * FROM users LIMIT 5000) SELECT * FROM x")
+    assert statement == "WITH x AS (SELECT * FROM users LIMIT 5000) SELECT * FROM x LIMIT 100"
+    assert limit == {"original": None, "applied": MAX_ROWS}
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT COUNT(*) FROM users",
+    "SELECT count(*), max(id) FROM users WHERE is_active = 1",
+    "SELECT COUNT(*) FROM users LIMIT 5000",
+    "WITH x AS (SELECT * FROM users LIMIT 5000) SELECT SUM(id) FROM x",
+])
+def test_leaves_ungrouped_aggregates_alone(sql):
+    assert limited(sql) == (sql, {}, None)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT dept, COUNT(*) FROM users GROUP BY dept",
+    "SELECT COUNT(*) OVER () FROM users",
+    "SELECT (SELECT COUNT(*) FROM orders) FROM users",
+    "SELECT count FROM users",
+    "SELECT COUNT(*) FROM users UNION ALL SELECT COUNT(*) FROM orders",
+])
+def test_limits_selects_that_can_return_many_rows(sql):
+    statement, _, limit = limited(sql)
+    assert statement == f"{sql} LIMIT 100"
+    assert limit == {"original": None, "applied": MAX_ROWS}
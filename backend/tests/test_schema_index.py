@@ -0,0 +1,56 @@
+import pytest
+
+from schema_index import SchemaIndex, tokenize
+
+
+def table(name, *columns, references=()):
+    return {
+        "name": name,
+        "columns": [{"name": column} for column in columns],
+        "foreign_keys": [{"referred_table": referred} for referred in references],
+    }
+
+
+TABLES = [
+    table("customers", "id", "email", "signupDate"),
+    table("orders", "id", "customer_id", "total", references=["customers"]),
+    table("order_items", "id", "order_id", "product_id", "quantity", references=["orders", "products"]),
+    table("products", "id", "name", "price", "category_id", references=["categories"]),
+    table("categories", "id", "name"),
+    table("audit_log", "id", "event", "created_at"),
+]
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("order_items", ["order", "item"]),
+    ("signupDate", ["signup", "date"]),
+    ("Categories", ["category"]),
+    ("address", ["address"]),
+])
+def test_tokenize_splits_identifiers_and_folds_plurals(text, tokens):
+    assert tokenize(text) == tokens
+
+
+def test_search_ranks_the_named_table_first():
+    index = SchemaIndex(TABLES)
+    ranked = [name for name, _ in index.search("price of each product", top_k=3)]
+    assert ranked[0] == "products"
+    assert "audit_log" not in ranked
+
+
+def test_search_drops_tables_that_share_no_terms():
+    index = SchemaIndex(TABLES)
+    assert [name for name, _ in index.search("audit events", top_k=6)] == ["audit_log"]
+    assert index.search("weather tomorrow", top_k=6) == []
+
+
+def test_search_returns_at_most_top_k_tables():
+    index = SchemaIndex(TABLES)
+    assert len(index.search("id", top_k=2)) == 2
+
+
+def test_join_tables_adds_the_tables_connecting_a_selection():
+    index = SchemaIndex(TABLES)
+    assert sorted(index.join_tables(["customers", "products"])) == ["order_items", "orders"]
+    assert index.join_tables(["customers", "orders"]) == []
+    assert index.join_tables(["customers", "audit_log"]) == []
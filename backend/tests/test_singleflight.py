@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight("test")
+        started = []
+
+        async def work():
+            started.append(1)
+            await asyncio.sleep(0.01)
+            return {"rows": 3}
+
+        results = await asyncio.gather(*[flight.do("q", work) for _ in range(5)])
+        return flight, started, results
+
+    flight, started, results = asyncio.run(scenario())
+    assert len(started) == 1
+    assert results == [{"rows": 3}] * 5 and all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 1, "deduplicated": 4, "abandoned": 0, "in_flight": 0}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work(key):
+            calls.append(key)
+            await asyncio.sleep(0)
+            return key
+
+        first = await asyncio.gather(flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b")))
+        # Nothing is cached once the shared task finishes
+        second = await flight.do("a", lambda: work("a"))
+        return flight, calls, first, second
+
+    flight, calls, first, second = asyncio.run(scenario())
+    assert calls == ["a", "b", "a"]
+    assert first == ["a", "b"] and second == "a"
+    assert flight.stats()["calls"] == 3 and flight.stats()["deduplicated"] == 0
+
+
+def test_an_error_reaches_every_waiter():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("no such table: users")
+
+        return flight, await asyncio.gather(*[flight.do("q", work) for _ in range(3)], return_exceptions=True)
+
+    flight, outcomes = asyncio.run(scenario())
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert outcomes[0] is outcomes[1] is outcomes[2]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_work_is_cancelled_only_when_every_waiter_leaves():
+    async def scenario():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+        cancelled = []
+
+        async def work():
+            try:
+                await release.wait()
+                return "done"
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        first = asyncio.ensure_future(flight.do("q", work))
+        second = asyncio.ensure_future(flight.do("q", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not cancelled
+        release.set()
+        assert await second == "done"
+
+        third = asyncio.ensure_future(flight.do("r", asyncio.Event().wait))
+        await asyncio.sleep(0)
+        third.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await third
+        await asyncio.sleep(0)
+        return flight
+
+    flight = asyncio.run(scenario())
+    assert flight.stats()["abandoned"] == 1 and flight.stats()["in_flight"] == 0
@@ -0,0 +1,93 @@
+import pytest
+
+from sql_classifier import classify_statement, normalize_sql, split_statements
+
+
+@pytest.mark.parametrize("sql, kind, types", [
+    ("SELECT * FROM users", "read", ("SELECT",)),
+    ("select id from users where active = 1", "read", ("SELECT",)),
+    ("VALUES (1), (2)", "read", ("VALUES",)),
+    ("EXPLAIN QUERY PLAN SELECT * FROM users", "read", ("EXPLAIN",)),
+    ("INSERT INTO users (name) VALUES ('a')", "write", ("INSERT",)),
+    ("UPDATE users SET name = 'b' WHERE id = 1", "write", ("UPDATE",)),
+    ("DELETE FROM users WHERE id = 1", "write", ("DELETE",)),
+    ("INSERT INTO archive SELECT * FROM users", "write", ("INSERT",)),
+    # Takes row locks, so it stays off the read-only pool
+    ("SELECT * FROM users FOR UPDATE", "write", ("SELECT",)),
+    ("CREATE TABLE t (a INTEGER)", "ddl", ("CREATE",)),
+    ("DROP TABLE users", "ddl", ("DROP",)),
+    ("PRAGMA journal_mode", "other", ("PRAGMA",)),
+    ("ATTACH DATABASE 'other.db' AS other", "other", ("ATTACH",)),
+])
+def test_statement_kinds(sql, kind, types):
+    info = classify_statement(sql)
+    assert info.kind == kind
+    assert info.statement_types == types
+
+
+@pytest.mark.parametrize("sql", [
+    "-- DELETE FROM users\nSELECT * FROM users",
+    "SELECT * FROM users /* DROP TABLE users; */",
+    "/* UPDATE users SET a = 1 */ SELECT 1",
+    "SELECT 'DELETE FROM users' AS s",
+    "SELECT 'it''s; DROP TABLE users' AS s",
+    "SELECT $$DELETE FROM users$$",
+    "SELECT $body$; DROP TABLE users$body$",
+    'SELECT "delete", "update" FROM audit',
+    "SELECT `drop` FROM audit",
+    "SELECT [insert] FROM audit",
+    "SELECT replace(name, 'a', 'b') FROM users",
+])
+def test_keywords_in_comments_literals_and_identifiers_are_ignored(sql):
+    info = classify_statement(sql)
+    assert info.kind == "read"
+    assert not info.is_multi_statement
+
+
+@pytest.mark.parametrize("sql, kind, types", [
+    ("WITH old AS (SELECT id FROM users WHERE active = 0) DELETE FROM users WHERE id IN (SELECT id FROM old)", "write", ("DELETE",)),
+    ("WITH rows AS (SELECT 1 AS a) INSERT INTO t (a) SELECT a FROM rows", "write", ("INSERT",)),
+    ("WITH gone AS (DELETE FROM users RETURNING *) SELECT * FROM gone", "write", ("SELECT",)),
+    ("WITH x AS (SELECT 1) SELECT * FROM x", "read", ("SELECT",)),
+    ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 5) SELECT i FROM n", "read", ("SELECT",)),
+])
+def test_common_table_expressions(sql, kind, types):
+    info = classify_statement(sql)
+    assert info.kind == kind
+    assert info.statement_types == types
+
+
+def test_select_into_creates_a_table():
+    info = classify_statement("SELECT * INTO users_backup FROM users")
+    assert info.kind == "ddl"
+    assert info.is_write
+
+
+def test_explain_analyze_of_a_write_is_a_write():
+    assert classify_statement("EXPLAIN ANALYZE DELETE FROM users").is_write
+
+
+@pytest.mark.parametrize("sql", ["", "   ", ";", "-- nothing here", "/* just a comment */ ;"])
+def test_empty_input(sql):
+    info = classify_statement(sql)
+    assert info.kind == "empty"
+    assert not info.is_read and not info.is_write
+
+
+def test_multiple_statements_take_the_most_restrictive_kind():
+    assert classify_statement("SELECT 1; SELECT 2").kind == "read"
+    assert classify_statement("SELECT 1; DELETE FROM users").kind == "write"
+    assert classify_statement("UPDATE users SET a = 1; DROP TABLE users").kind == "ddl"
+    info = classify_statement("UPDATE a SET x = 1; DELETE FROM b;")
+    assert info.is_multi_statement
+    assert info.statement_types == ("UPDATE", "DELETE")
+
+
+def test_semicolons_inside_literals_and_comments_do_not_split():
+    assert len(split_statements("SELECT 'a;b'; -- c;d\nSELECT 2")) == 2
+    assert len(split_statements("SELECT 1 /* ; */")) == 1
+
+
+def test_normalize_sql_drops_comments_and_collapses_whitespace():
+    assert normalize_sql("SELECT  *\n  FROM users -- all of them\n;") == "SELECT * FROM users"
+    assert normalize_sql("SELECT 'a  b'") == "SELECT 'a  b'"
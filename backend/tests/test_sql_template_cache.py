@@ -0,0 +1,73 @@
+import pytest
+
+from sql_template_cache import SQLTemplateCache, bind, extract_literals, templatize
+
+TABLES = [{"name": "users", "columns": [{"name": "username"}, {"name": "age"}, {"name": "status"}]}]
+SCHEMA = "users(username, age, status)"
+
+
+def test_extract_literals_keeps_identifiers_as_structure():
+    skeleton, values = extract_literals("users named john_doe over 20.5 where status = 'shipped'", {"status"})
+    assert skeleton == "users named <str> over <num> where status = <str>"
+    assert values == [("str", "john_doe"), ("num", "20.5"), ("str", "shipped")]
+
+
+def test_templatize_binds_wrapped_and_case_folded_values():
+    template, slots = templatize("SELECT * FROM users WHERE username LIKE '%bob%' AND status = 'ACTIVE'", [
+        ("str", "bob"), ("str", "active")
+    ])
+    assert template == "SELECT * FROM users WHERE username LIKE :p0 AND status = :p1"
+    assert bind(slots, [("str", "al"), ("str", "closed")]) == {"p0": "%al%", "p1": "CLOSED"}
+
+
+@pytest.mark.parametrize("sql, values", [
+    # A prompt literal the SQL does not use
+    ("SELECT * FROM users WHERE age > 30", [("num", "30"), ("num", "40")]),
+    # A prompt literal the SQL uses twice
+    ("SELECT * FROM users WHERE age > 30 OR age < 30", [("num", "30")]),
+    # Two prompt literals with the same value
+    ("SELECT * FROM users WHERE age BETWEEN 30 AND 30", [("num", "30"), ("num", "30")]),
+])
+def test_templatize_rejects_sql_whose_literals_do_not_match_the_prompt(sql, values):
+    assert templatize(sql, values) is None
+
+
+def test_a_stored_template_answers_prompts_with_other_values():
+    cache = SQLTemplateCache()
+    hit, key, values = cache.lookup("users older than 30 named 'bob'", TABLES, SCHEMA)
+    assert hit is None
+    stored = cache.store(key, values, "SELECT * FROM users WHERE age > 30 AND username = 'bob'", "Users over 30 named bob")
+    assert stored == ("SELECT * FROM users WHERE age > :p0 AND username = :p1", {"p0": 30, "p1": "bob"})
+
+    hit, _, _ = cache.lookup("Users older than 45 named 'alice'?", TABLES, SCHEMA)
+    assert hit == (
+        "SELECT * FROM users WHERE age > :p0 AND username = :p1",
+        "Users over 45 named alice",
+        {"p0": 45, "p1": "alice"},
+    )
+
+
+def test_other_structures_and_schemas_miss():
+    cache = SQLTemplateCache()
+    _, key, values = cache.lookup("users older than 30", TABLES, SCHEMA)
+    cache.store(key, values, "SELECT * FROM users WHERE age > 30", "Users over 30")
+
+    assert cache.lookup("users older than 30 and 40", TABLES, SCHEMA)[0] is None
+    assert cache.lookup("users older than 'thirty'", TABLES, SCHEMA)[0] is None
+    assert cache.lookup("users older than 45", TABLES, "users(username, age)")[0] is None
+    assert cache.lookup("users older than 45", TABLES, SCHEMA)[0] is not None
+
+
+def test_store_rejects_sql_with_a_different_literal_count():
+    cache = SQLTemplateCache()
+    _, key, values = cache.lookup("users aged 30 or 40", TABLES, SCHEMA)
+    assert cache.store(key, values, "SELECT * FROM users WHERE age = 30", "Users aged 30") is None
+    assert cache.lookup("users aged 50 or 60", TABLES, SCHEMA)[0] is None
+    assert cache.stats()["rejected"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_prompts_without_literals_are_not_cached():
+    cache = SQLTemplateCache()
+    hit, key, values = cache.lookup("all users", TABLES, SCHEMA)
+    assert (hit, key, values) == (None, "", [])
+    assert cache.store(key, values, "SELECT * FROM users", "All users") is None
@@ -0,0 +1,50 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import create_async_engines
+from write_queue import WriteQueue
+
+
+async def run_batch(tmp_path, statements):
+    """Submit statements together so they share one group commit; returns (outcomes, rows, stats)"""
+    writer, reader = create_async_engines(f"sqlite:///{tmp_path / 'queue.db'}")
+    try:
+        async with writer.begin() as conn:
+            await conn.exec_driver_sql("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE, qty INTEGER)")
+        queue = WriteQueue(async_sessionmaker(writer, autoflush=False, expire_on_commit=False), window_ms=50)
+        outcomes = await asyncio.gather(
+            *[queue.submit(statement, params) for statement, params in statements],
+            return_exceptions=True
+        )
+        async with reader.connect() as conn:
+            rows = (await conn.exec_driver_sql("SELECT id, name, qty FROM items ORDER BY id")).fetchall()
+        return outcomes, [tuple(row) for row in rows], queue.stats()
+    finally:
+        await writer.dispose()
+        await reader.dispose()
+
+
+def test_a_failing_statement_rolls_back_alone(tmp_path):
+    outcomes, rows, stats = asyncio.run(run_batch(tmp_path, [
+        ("INSERT INTO items (name, qty) VALUES (:name, 1)", {"name": "a"}),
+        ("INSERT INTO items (name, qty) VALUES (:name, 1)", {"name": "a"}),
+        ("INSERT INTO items (name, qty) VALUES (:name, 1)", [{"name": "b"}, {"name": "c"}]),
+    ]))
+    assert outcomes[0] == 1 and outcomes[2] == 2
+    assert isinstance(outcomes[1], Exception) and "UNIQUE" in str(outcomes[1])
+    assert rows == [(1, "a", 1), (2, "b", 1), (3, "c", 1)]
+    assert (stats["batches"], stats["replays"], stats["jobs"], stats["failed"]) == (1, 1, 3, 1)
+
+
+def test_statements_in_a_group_apply_in_submission_order(tmp_path):
+    outcomes, rows, stats = asyncio.run(run_batch(tmp_path, [
+        ("INSERT INTO items (name, qty) VALUES ('a', 1)", None),
+        ("UPDATE items SET qty = qty * 10", None),
+        ("INSERT INTO items (name, qty) VALUES ('b', 1)", None),
+        ("UPDATE items SET qty = qty + 5", None),
+        ("DELETE FROM items WHERE name = 'b' AND qty = 6", None),
+    ]))
+    assert outcomes == [1, 1, 1, 2, 1]
+    assert rows == [(1, "a", 15)]
+    assert stats["batches"] == 1 and stats["largest_batch"] == 5
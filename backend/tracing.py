@@ -0,0 +1,351 @@
+import asyncio
+import atexit
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Fraction of requests traced; the decision is made once per trace, at its root span
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+# langsmith, file, memory or none; defaults to langsmith when an API key is set
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "langsmith" if os.getenv("LANGSMITH_API_KEY") else "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "2048"))
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "100"))
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "2"))
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Span:
+    """One timed operation of a sampled trace"""
+
+    __slots__ = ("name", "run_type", "span_id", "trace_id", "parent_id", "dotted_order",
+                 "start", "end", "metadata", "outputs", "error")
+
+    def __init__(self, name: str, run_type: str, parent: Optional["Span"], metadata: Optional[Dict[str, Any]]):
+        self.name = name
+        self.run_type = run_type
+        self.span_id = str(uuid.uuid4())
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.metadata = dict(metadata) if metadata else {}
+        self.outputs: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        # LangSmith orders runs of a trace by this key: the ancestors' keys, then our own
+        order = datetime.fromtimestamp(self.start, timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + self.span_id
+        if parent is None:
+            self.trace_id, self.parent_id, self.dotted_order = self.span_id, None, order
+        else:
+            self.trace_id, self.parent_id = parent.trace_id, parent.span_id
+            self.dotted_order = f"{parent.dotted_order}.{order}"
+
+    def set(self, **metadata: Any):
+        self.metadata.update(metadata)
+
+    def set_outputs(self, **outputs: Any):
+        self.outputs.update(outputs)
+
+    def record_error(self, error: str):
+        self.error = error
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end is None else round((self.end - self.start) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "run_type": self.run_type,
+            "span_id": self.span_id,
+            "trace_id": self.trace_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": self.duration_ms,
+            "metadata": self.metadata,
+            "outputs": self.outputs,
+            "error": self.error
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span when the current work is not traced; every call is a no-op"""
+
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def set(self, **metadata: Any):
+        pass
+
+    def set_outputs(self, **outputs: Any):
+        pass
+
+    def record_error(self, error: str):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+# The active span, or NOOP_SPAN inside a trace that was not sampled
+_current: ContextVar[Any] = ContextVar("current_span", default=None)
+
+
+def current_span():
+    """The span of the traced function being run, or a no-op span (which is falsy)"""
+    return _current.get() or NOOP_SPAN
+
+
+class InMemoryExporter:
+    """Keeps the most recent exported spans as dicts, for tests and offline inspection"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: "deque[Dict[str, Any]]" = deque(maxlen=max_spans)
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(span.to_dict() for span in spans)
+
+
+class JsonLinesExporter:
+    """Appends spans to a JSON-lines file"""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class LangSmithExporter:
+    """Sends spans to LangSmith as runs of the configured project"""
+
+    def __init__(self, project: Optional[str] = None):
+        from langsmith import Client
+
+        self.client = Client()
+        self.project = project or os.getenv("LANGCHAIN_PROJECT", "DB-QueryPilot-AI")
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            self.client.create_run(
+                span.name,
+                {},
+                span.run_type,
+                project_name=self.project,
+                id=span.span_id,
+                trace_id=span.trace_id,
+                parent_run_id=span.parent_id,
+                dotted_order=span.dotted_order,
+                start_time=datetime.fromtimestamp(span.start, timezone.utc),
+                end_time=datetime.fromtimestamp(span.end, timezone.utc),
+                outputs=span.outputs,
+                error=span.error,
+                extra={"metadata": span.metadata}
+            )
+
+
+_FLUSH = object()
+
+
+class Tracer:
+    """Head-sampled spans, exported in batches from a background thread.
+
+    Whether a trace is recorded is decided when its root span starts; its
+    descendants follow that decision without drawing again. Finished spans
+    go to a bounded buffer that a daemon thread drains in batches of
+    ``batch_size`` (or every ``flush_seconds``); when the buffer is full,
+    spans are dropped rather than making the request wait. With no
+    exporter or a zero sample rate, traced functions call straight through.
+    """
+
+    def __init__(
+        self,
+        exporter=None,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        buffer_size: int = TRACE_BUFFER_SIZE,
+        batch_size: int = TRACE_BATCH_SIZE,
+        flush_seconds: float = TRACE_FLUSH_SECONDS
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue[Any]" = queue.Queue(max(1, buffer_size))
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self.traces = 0
+        self.sampled = 0
+        self.exported = 0
+        self.dropped = 0
+        self.export_errors = 0
+        self.configure(exporter, sample_rate)
+
+    def configure(self, exporter=None, sample_rate: Optional[float] = None):
+        """Swap the exporter and/or sample rate; spans already buffered go to the new exporter"""
+        self.exporter = exporter
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        self.enabled = self.exporter is not None and self.sample_rate > 0
+
+    def start(self, name: str, run_type: str, metadata: Optional[Dict[str, Any]]) -> Tuple[Optional[Span], Any]:
+        """(span or None, context token or None) for a traced call about to run"""
+        parent = _current.get()
+        if parent is NOOP_SPAN:
+            return None, None
+        if parent is None:
+            self.traces += 1
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                # Mark the rest of this trace as unsampled
+                return None, _current.set(NOOP_SPAN)
+            self.sampled += 1
+        span = Span(name, run_type, parent, metadata)
+        return span, _current.set(span)
+
+    def finish(self, span: Optional[Span], token: Any):
+        if token is not None:
+            _current.reset(token)
+        if span is None:
+            return
+        span.end = time.time()
+        if self._worker is None:
+            self._start_worker()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_worker(self):
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size and batch[-1] is not _FLUSH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            spans = [item for item in batch if item is not _FLUSH]
+            exporter = self.exporter
+            if spans and exporter is not None:
+                try:
+                    exporter.export(spans)
+                    self.exported += len(spans)
+                except Exception as e:
+                    self.export_errors += 1
+                    logger.warning("⚠️ Could not export %d spans: %s", len(spans), e)
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Export everything buffered so far; False if that took longer than ``timeout``"""
+        if self._worker is None:
+            return True
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return False
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "exporter": type(self.exporter).__name__ if self.exporter is not None else None,
+            "sample_rate": self.sample_rate,
+            "traces": self.traces,
+            "sampled": self.sampled,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "export_errors": self.export_errors,
+            "buffered": self._queue.qsize()
+        }
+
+
+def make_exporter(kind: str = TRACE_EXPORTER):
+    """Exporter for a TRACE_EXPORTER value; None disables tracing"""
+    if kind == "langsmith":
+        return LangSmithExporter()
+    if kind == "file":
+        return JsonLinesExporter(TRACE_FILE)
+    if kind == "memory":
+        return InMemoryExporter()
+    if kind not in ("none", ""):
+        logger.warning("⚠️ Unknown TRACE_EXPORTER %r; tracing disabled", kind)
+    return None
+
+
+def traced(name: str, run_type: str = "chain", metadata: Optional[Dict[str, Any]] = None) -> Callable[[F], F]:
+    """Record calls of a sync or async function as spans of the current trace.
+
+    Arguments are not captured; the function adds what is worth keeping
+    through current_span().set(...), which costs nothing when the call is
+    not sampled.
+    """
+    def decorator(func: F) -> F:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                span, token = tracer.start(name, run_type, metadata)
+                try:
+                    return await func(*args, **kwargs)
+                except BaseException as e:
+                    if span is not None:
+                        span.record_error(str(e) or type(e).__name__)
+                    raise
+                finally:
+                    tracer.finish(span, token)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            span, token = tracer.start(name, run_type, metadata)
+            try:
+                return func(*args, **kwargs)
+            except BaseException as e:
+                if span is not None:
+                    span.record_error(str(e) or type(e).__name__)
+                raise
+            finally:
+                tracer.finish(span, token)
+        return wrapper
+    return decorator
+
+
+tracer = Tracer(make_exporter())
+if tracer.enabled:
+    logger.info("🔭 Tracing %.2f%% of requests to %s", tracer.sample_rate * 100, type(tracer.exporter).__name__)
+atexit.register(tracer.flush)
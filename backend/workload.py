@@ -0,0 +1,78 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+WORKLOAD_LOG_SIZE = int(os.getenv("WORKLOAD_LOG_SIZE", "5000"))
+
+
+class WorkloadRecorder:
+    """Log of executed SELECTs with their plan and duration, read by the index advisor.
+
+    The most recent ``max_entries`` executions are kept in memory; when
+    ``path`` is set every record is also appended to a JSON-lines file,
+    and the tail of that file is reloaded on start so advice survives
+    restarts.
+    """
+
+    def __init__(self, max_entries: int = WORKLOAD_LOG_SIZE, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: "deque[Dict[str, Any]]" = deque(maxlen=max(1, max_entries))
+        self.recorded = 0
+
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._records.append(json.loads(line))
+                    except ValueError:
+                        continue
+            logger.info("📒 Workload log loaded: %d queries", len(self._records))
+
+    def record(self, database: str, statement: str, plan: Dict[str, Any], duration_ms: float, row_count: int):
+        if self.max_entries <= 0:
+            return
+        entry = {
+            "database": database,
+            "statement": statement,
+            "plan": plan,
+            "duration_ms": round(duration_ms, 3),
+            "row_count": row_count,
+            "recorded_at": time.time()
+        }
+        with self._lock:
+            self._records.append(entry)
+            self.recorded += 1
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+
+    def records(self, database: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recorded executions, oldest first, optionally for one database"""
+        with self._lock:
+            return [entry for entry in self._records if database is None or entry["database"] == database]
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total_ms = sum(entry["duration_ms"] for entry in self._records)
+            return {
+                "recorded": self.recorded,
+                "entries": len(self._records),
+                "max_entries": self.max_entries,
+                "total_duration_ms": round(total_ms, 3),
+                "path": self.path
+            }
+
+
+workload_recorder = WorkloadRecorder(path=os.getenv("WORKLOAD_LOG_PATH") or None)
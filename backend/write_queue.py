@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import Awaitable, Callable, List, Dict, Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", "64"))
+WRITE_BATCH_WINDOW_MS = float(os.getenv("WRITE_BATCH_WINDOW_MS", "2"))
+
+
+class _WriteJob:
+    __slots__ = ("statement", "params", "exclusive", "work", "future")
+
+    def __init__(self, statement: str, params: Any, exclusive: bool, future: "asyncio.Future[Any]", work=None):
+        self.statement = statement
+        self.params = params
+        self.exclusive = exclusive
+        self.work = work
+        self.future = future
+
+
+class WriteQueue:
+    """Single writer task that applies modifications in arrival order.
+
+    Jobs arriving within ``window_ms`` of each other (up to ``max_batch``) are
+    group-committed in one transaction. If any job fails, the batch is replayed
+    with each job in its own SAVEPOINT: the failing job rolls back only itself
+    and its caller gets the error, the others commit and get their own rowcount.
+    Exclusive jobs (DDL, PRAGMA, ...) and whole units of work passed to
+    ``run`` execute alone.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        max_batch: int = WRITE_BATCH_MAX,
+        window_ms: float = WRITE_BATCH_WINDOW_MS
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._carry: Optional[_WriteJob] = None
+        self.jobs = 0
+        self.failed = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.replays = 0
+        # Bumped after every batch, committed or not; readers compare it to invalidate cached results
+        self.generation = 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._carry = None
+            self._worker = loop.create_task(self._run())
+
+    async def submit(
+        self,
+        statement: str,
+        params: Union[Dict[str, Any], List[Dict[str, Any]]] = None,
+        exclusive: bool = False
+    ) -> int:
+        """Queue a modification and wait until it is committed; returns its rowcount.
+
+        A list of params runs the statement as executemany.
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_WriteJob(statement, params or {}, exclusive, future))
+        return await future
+
+    async def run(self, work: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+        """Run ``work(session)`` alone on the writer, in order with queued statements; returns its result"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_WriteJob("", None, True, future, work=work))
+        return await future
+
+    async def _next_batch(self) -> List[_WriteJob]:
+        first = self._carry or await self._queue.get()
+        self._carry = None
+        batch = [first]
+        if first.exclusive:
+            return batch
+
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                job = self._queue.get_nowait()
+            if job.exclusive:
+                # Keep arrival order: the exclusive job opens the next batch
+                self._carry = job
+                break
+            batch.append(job)
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._apply(batch)
+                self.generation += 1
+            except Exception as e:
+                self.generation += 1
+                logger.error("❌ Write batch of %d failed: %s", len(batch), e)
+                error = e if batch[0].work is not None else Exception(f"Error: {str(e)}")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(error)
+                self.jobs += len(batch)
+                self.failed += len(batch)
+
+    async def _apply(self, batch: List[_WriteJob]):
+        async with self.session_factory() as session:
+            if batch[0].work is not None:
+                results: List[Any] = [await batch[0].work(session)]
+            elif batch[0].exclusive:
+                # Autocommit: VACUUM and some PRAGMAs refuse to run inside a transaction
+                conn = await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+                result = await conn.execute(text(batch[0].statement), batch[0].params)
+                results = [result.rowcount]
+            else:
+                try:
+                    # Optimistic pass: no SAVEPOINT round trips while every job succeeds
+                    results = [
+                        (await session.execute(text(job.statement), job.params)).rowcount
+                        for job in batch
+                    ]
+                except Exception:
+                    # Something failed: replay the batch isolating each job in a SAVEPOINT
+                    await session.rollback()
+                    self.replays += 1
+                    results = []
+                    for job in batch:
+                        try:
+                            async with session.begin_nested():
+                                result = await session.execute(text(job.statement), job.params)
+                            results.append(result.rowcount)
+                        except Exception as e:
+                            results.append(Exception(f"Error: {str(e)}"))
+            await session.commit()
+
+        # Callers hear back only once their write is durable
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for job, outcome in zip(batch, results):
+            self.jobs += 1
+            if job.future.done():
+                continue
+            if isinstance(outcome, Exception):
+                self.failed += 1
+                job.future.set_exception(outcome)
+            else:
+                job.future.set_result(outcome)
+        logger.debug("✍️ Committed write batch: %d jobs", len(batch))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": self.jobs,
+            "failed": self.failed,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "replays": self.replays,
+            "generation": self.generation,
+            "avg_batch": round(self.jobs / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch": self.max_batch,
+            "window_ms": self.window * 1000.0
+        }
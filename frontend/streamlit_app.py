@@ -11,6 +11,8 @@ st.set_page_config(
 )
 
 API_BASE_URL = "http://localhost:8000"
+# Writes must name a configured database; the selected value is a table of this one
+WRITE_DATABASE = "default"
 
 if 'selected_database' not in st.session_state:
     st.session_state.selected_database = None
@@ -18,6 +20,9 @@ if 'query_history' not in st.session_state:
     st.session_state.query_history = []
 if 'dark_mode' not in st.session_state:
     st.session_state.dark_mode = False
+if 'table_cursors' not in st.session_state:
+    # Per table: cursors of the pages visited so far, first page has cursor None
+    st.session_state.table_cursors = {}
 
 # Toggle Dark Mode Function
 def toggle_dark_mode():
@@ -361,9 +366,11 @@ if not st.session_state.selected_database:
     st.warning("⚠️ Select a table from sidebar")
     st.stop()
 
-# Database Overview - ALL ROWS, NO SCHEMA
+# Database Overview - paginated rows, no schema
 st.markdown("## 📊 Database Tables")
 
+page_size = st.select_slider("Rows per page", options=[25, 50, 100, 250, 500, 1000], value=100)
+
 try:
     tables_response = requests.get(f"{API_BASE_URL}/databases", timeout=3)
     
@@ -376,37 +383,36 @@ try:
             for idx, table_name in enumerate(all_tables):
                 with tab_list[idx]:
                     try:
-                        # Fetch ALL data (no limit)
-                        all_data_query = {
-                            "prompt": f"SELECT * FROM {table_name}",
-                            "database_name": table_name,
-                            "execute": True
-                        }
+                        # One page of rows straight from the browse endpoint (no LLM call)
+                        cursors = st.session_state.table_cursors.setdefault(table_name, [None])
+                        params = {"limit": page_size}
+                        if cursors[-1] is not None:
+                            params["after"] = cursors[-1]
                         
-                        data_response = requests.post(
-                            f"{API_BASE_URL}/query",
-                            json=all_data_query,
+                        data_response = requests.get(
+                            f"{API_BASE_URL}/tables/{table_name}/rows",
+                            params=params,
                             timeout=10
                         )
                         
                         if data_response.status_code == 200:
                             result = data_response.json()
                             
-                            if result.get('success') and result.get('results'):
-                                df_all = pd.DataFrame(result['results'])
+                            if result.get('results'):
+                                df_all = pd.DataFrame(result['results'], columns=result['columns'])
                                 
                                 # Show metrics
                                 col1, col2, col3 = st.columns(3)
                                 with col1:
-                                    st.metric("📊 Total Records", f"{len(df_all):,}")
+                                    st.metric("📊 Rows Shown", f"{len(df_all):,}")
                                 with col2:
                                     st.metric("📋 Columns", len(df_all.columns))
                                 with col3:
-                                    st.metric("✅ Status", "Active")
+                                    st.metric("📄 Page", len(cursors))
                                 
                                 st.divider()
                                 
-                                # Display ALL data
+                                # Display current page
                                 st.dataframe(
                                     df_all,
                                     width='stretch',
@@ -414,14 +420,25 @@ try:
                                     height=500
                                 )
                                 
-                                # Download button
-                                csv = df_all.to_csv(index=False)
-                                st.download_button(
-                                    label=f"📥 Download {table_name} as CSV",
-                                    data=csv,
-                                    file_name=f"{table_name}_data.csv",
-                                    mime="text/csv"
-                                )
+                                nav1, nav2, nav3 = st.columns([1, 1, 2])
+                                with nav1:
+                                    if st.button("⬅️ Previous", key=f"prev_{table_name}", disabled=len(cursors) == 1):
+                                        cursors.pop()
+                                        st.rerun()
+                                with nav2:
+                                    if st.button("Next ➡️", key=f"next_{table_name}", disabled=not result.get('has_more')):
+                                        cursors.append(result['next_cursor'])
+                                        st.rerun()
+                                with nav3:
+                                    # Download button
+                                    csv = df_all.to_csv(index=False)
+                                    st.download_button(
+                                        label="📥 Download page as CSV",
+                                        data=csv,
+                                        file_name=f"{table_name}_page{len(cursors)}.csv",
+                                        mime="text/csv",
+                                        key=f"download_{table_name}"
+                                    )
                             else:
                                 st.warning("No data in this table")
                         else:
@@ -461,7 +478,8 @@ if generate_btn or execute_btn:
                 payload = {
                     "prompt": user_prompt,
                     "database_name": st.session_state.selected_database,
-                    "execute": execute_btn
+                    "execute": execute_btn,
+                    "result_format": "columns"
                 }
                 
                 response = requests.post(f"{API_BASE_URL}/query", json=payload, timeout=15)
@@ -480,10 +498,12 @@ if generate_btn or execute_btn:
                             'sql': result['sql_query']
                         })
                         
-                        if result.get('results'):
+                        if result.get('row_count'):
                             st.markdown("### 📊 Results")
                             
-                            df_results = pd.DataFrame(result['results'])
+                            # Column-major payload: one array per column, in result['columns'] order
+                            df_results = pd.DataFrame(dict(enumerate(result['data'])))
+                            df_results.columns = result['columns']
                             
                             col1, col2, col3 = st.columns(3)
                             with col1:
@@ -561,7 +581,7 @@ with col2:
                     
                     payload = {
                         "prompt": modification_prompt,
-                        "database_name": st.session_state.selected_database
+                        "database_name": WRITE_DATABASE
                     }
                     
                     response = requests.post(f"{API_BASE_URL}/execute", json=payload, timeout=20)